@@ -120,7 +120,7 @@ def send_accurate_notification():
             
             message += "\n🔗 Проверить: https://x19.spb.ru/bronirovanie/"
             
-            success = notifier.send_message(message)
+            success = notifier.send_message(message, wait=True)
             if success:
                 print("✅ Уведомление об отсутствии слотов отправлено")
                 return True
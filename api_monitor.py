@@ -11,6 +11,10 @@ from datetime import datetime, timedelta
 from typing import List, Dict, Optional
 import logging
 
+from schedule_client import get_schedule_client
+from initial_extractor import extract_initial, find_initial_offset
+from snapshot_store import get_snapshot_store
+
 # Настройка логирования
 logging.basicConfig(
     level=logging.INFO,
@@ -24,13 +28,8 @@ logging.basicConfig(
 class APITennisMonitor:
     def __init__(self):
         self.base_url = "https://x19.spb.ru"
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'application/json, text/javascript, */*; q=0.01',
-            'X-Requested-With': 'XMLHttpRequest',
-            'Referer': 'https://x19.spb.ru/bronirovanie/'
-        })
+        self.client = get_schedule_client()
+        self.session = self.client.session
         
     def get_initialize_data(self, date: str) -> Optional[Dict]:
         """
@@ -43,39 +42,20 @@ class APITennisMonitor:
             Словарь с данными или None при ошибке
         """
         try:
-            # Сначала получаем HTML страницу, чтобы получить правильный timestamp
-            page_url = f"{self.base_url}/bronirovanie/?date={date}"
-            page_response = self.session.get(page_url, timeout=10)
-            page_response.raise_for_status()
-            
-            # Извлекаем timestamp из JavaScript кода
-            timestamp_match = re.search(r'initialize\?date=[^&]+&_=(\d+)', page_response.text)
-            if not timestamp_match:
-                logging.warning("Не удалось найти timestamp в HTML")
-                timestamp = int(datetime.now().timestamp())
-            else:
-                timestamp = timestamp_match.group(1)
-            
-            # Запрашиваем данные инициализации
-            init_url = f"{self.base_url}/bronirovanie/initialize?date={date}&_={timestamp}"
-            logging.info(f"Запрос к API: {init_url}")
-            
-            response = self.session.get(init_url, timeout=10)
-            response.raise_for_status()
+            # Запрашиваем данные инициализации через общий клиент
+            content = self.client.get_initialize_text(date)
             
             # Пытаемся распарсить как JSON
             try:
-                data = response.json()
+                data = json.loads(content)
                 logging.info(f"Успешно получены данные инициализации для даты {date}")
                 return data
             except json.JSONDecodeError:
                 # Если не JSON, возможно это JavaScript код
-                content = response.text
                 logging.info(f"Получен JavaScript код, длина: {len(content)}")
                 
-                # Сохраняем для анализа
-                with open(f'api_response_{date}.js', 'w', encoding='utf-8') as f:
-                    f.write(content)
+                # Сохраняем для анализа (история снимков вместо api_response_{date}.js)
+                get_snapshot_store().put_text(date, 'js', content)
                 
                 return self._parse_javascript_data(content, date)
             
@@ -95,22 +75,16 @@ class APITennisMonitor:
             Словарь с данными или None
         """
         try:
-            # Ищем переменную window.$INITIAL
-            initial_match = re.search(r'window\.\$INITIAL\s*=\s*(\{.*?\});', js_content, re.DOTALL)
-            if initial_match:
-                initial_data = initial_match.group(1)
-                logging.info("Найдены данные window.$INITIAL")
+            # Ищем объект initial (var initial / window.$INITIAL)
+            if find_initial_offset(js_content) >= 0:
+                logging.info("Найдены данные initial")
+                data = extract_initial(js_content)
                 
                 # Сохраняем для анализа
-                with open(f'initial_data_{date}.json', 'w', encoding='utf-8') as f:
-                    f.write(initial_data)
+                if data is not None:
+                    get_snapshot_store().put(date, data)
                 
-                try:
-                    data = json.loads(initial_data)
-                    return data
-                except json.JSONDecodeError as e:
-                    logging.warning(f"Не удалось распарсить JSON: {e}")
-                    return None
+                return data
             
             # Ищем другие структуры данных
             time_map_match = re.search(r'time_map\s*:\s*(\[.*?\])', js_content, re.DOTALL)
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Параллельная загрузка расписания на много дат (asyncio)
+Недельный анализ и весь горизонт бронирования за время ~одного запроса
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+import logging
+
+from schedule_client import POOL_MAXSIZE, get_schedule_client
+
+logger = logging.getLogger(__name__)
+
+# Параллельность по умолчанию не превышает размер общего пула соединений,
+# иначе лишние соединения будут открываться и закрываться на каждый запрос
+DEFAULT_CONCURRENCY = 8
+
+
+class AsyncScheduleFetcher:
+    def __init__(self, source=None, concurrency: int = DEFAULT_CONCURRENCY):
+        """
+        Args:
+            source: Источник с методом get_schedule(date) (клиент или синхронизатор)
+            concurrency: Максимум одновременных запросов
+        """
+        self.source = source or get_schedule_client()
+        self.concurrency = max(1, min(concurrency, POOL_MAXSIZE))
+
+    async def fetch_many(self, dates: List[str]) -> Dict[str, Optional[Dict]]:
+        """
+        Загружает расписание для списка дат параллельно
+
+        Args:
+            dates: Даты в формате YYYY-MM-DD
+
+        Returns:
+            Словарь дата -> данные initialize (None при ошибке), в порядке dates
+        """
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            async def fetch_one(date: str) -> Optional[Dict]:
+                async with semaphore:
+                    return await loop.run_in_executor(executor, self.source.get_schedule, date)
+
+            results = await asyncio.gather(*(fetch_one(date) for date in dates), return_exceptions=True)
+
+        schedules = {}
+        for date, result in zip(dates, results):
+            if isinstance(result, Exception):
+                logger.error(f"Ошибка при параллельной загрузке даты {date}: {result}")
+                result = None
+            schedules[date] = result
+
+        return schedules
+
+
+def fetch_schedules(dates: List[str], concurrency: int = DEFAULT_CONCURRENCY,
+                    source=None) -> Dict[str, Optional[Dict]]:
+    """
+    Синхронная обертка над AsyncScheduleFetcher для обычного кода
+
+    Args:
+        dates: Даты в формате YYYY-MM-DD
+        concurrency: Максимум одновременных запросов
+        source: Источник с методом get_schedule(date)
+
+    Returns:
+        Словарь дата -> данные initialize
+    """
+    started = time.perf_counter()
+    fetcher = AsyncScheduleFetcher(source, concurrency)
+    schedules = asyncio.run(fetcher.fetch_many(dates))
+
+    elapsed = time.perf_counter() - started
+    loaded = sum(1 for data in schedules.values() if data)
+    logger.info(f"Параллельно загружено {loaded}/{len(dates)} дат за {elapsed:.2f} с "
+                f"(параллельность {fetcher.concurrency})")
+    return schedules
+
+
+def consecutive_dates(start_date: str, days: int) -> List[str]:
+    """Список из days дат подряд, начиная с start_date"""
+    start_dt = datetime.strptime(start_date, '%Y-%m-%d')
+    return [(start_dt + timedelta(days=i)).strftime('%Y-%m-%d') for i in range(days)]
+
+
+def horizon_dates(data: Dict) -> List[str]:
+    """
+    Извлекает даты горизонта бронирования из dateList ответа initialize
+
+    Args:
+        data: Данные initialize любой даты
+
+    Returns:
+        Список дат в формате YYYY-MM-DD
+    """
+    date_list = data.get('instructions', {}).get('set', {}).get('dateList', [])
+    return [item['date'][:10] for item in date_list if item.get('date')]
+
+
+def fetch_horizon(start_date: Optional[str] = None, concurrency: int = DEFAULT_CONCURRENCY,
+                  source=None) -> Dict[str, Optional[Dict]]:
+    """
+    Загружает все даты горизонта бронирования (dateList) параллельно
+
+    Args:
+        start_date: Дата, с которой берется dateList (по умолчанию сегодня)
+        concurrency: Максимум одновременных запросов
+        source: Источник с методом get_schedule(date)
+
+    Returns:
+        Словарь дата -> данные initialize
+    """
+    source = source or get_schedule_client()
+    start_date = start_date or datetime.now().strftime('%Y-%m-%d')
+
+    first = source.get_schedule(start_date)
+    if not first:
+        return {start_date: None}
+
+    dates = [date for date in horizon_dates(first) if date != start_date]
+    schedules = {start_date: first}
+    schedules.update(fetch_schedules(dates, concurrency, source))
+    return schedules
+
+
+def main():
+    """Сравнение последовательной и параллельной загрузки недели"""
+    print("🎾 ПАРАЛЛЕЛЬНАЯ ЗАГРУЗКА РАСПИСАНИЯ")
+    print("=" * 60)
+
+    dates = consecutive_dates(datetime.now().strftime('%Y-%m-%d'), 7)
+    client = get_schedule_client()
+    client.warm_up()
+
+    started = time.perf_counter()
+    for date in dates:
+        client.get_schedule(date)
+    sequential = time.perf_counter() - started
+
+    started = time.perf_counter()
+    fetch_schedules(dates, concurrency=len(dates))
+    parallel = time.perf_counter() - started
+
+    print(f"📅 Дат: {len(dates)}")
+    print(f"🐢 Последовательно: {sequential:.2f} с")
+    print(f"🚀 Параллельно:     {parallel:.2f} с")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
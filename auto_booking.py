@@ -5,7 +5,6 @@
 """
 
 import requests
-import json
 import time
 from datetime import datetime, timedelta
 from urllib.parse import urljoin, urlparse, parse_qs
@@ -13,6 +12,10 @@ import re
 from typing import Dict, List, Optional, Tuple
 import logging
 
+from schedule_client import create_session
+from initial_extractor import extract_initial
+from occupancy import OccupancyGrid
+
 # Настройка логирования
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -31,8 +34,7 @@ class AutoBooking:
             'payment_type': 'club'  # Оплата в клубе
         }
         
-        self.session = requests.Session()
-        self.session.headers.update({
+        self.session = create_session({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
             'Accept-Language': 'ru-RU,ru;q=0.8,en-US;q=0.5,en;q=0.3',
@@ -80,16 +82,10 @@ class AutoBooking:
         logger.info("Извлечение данных для бронирования...")
         
         # Ищем данные инициализации
-        init_data_pattern = r'window\.\$INITIAL\s*=\s*({.*?});'
-        matches = re.findall(init_data_pattern, html_content, re.DOTALL)
-        
-        if matches:
-            try:
-                init_data = json.loads(matches[0])
-                logger.info("Данные инициализации извлечены")
-                return init_data
-            except json.JSONDecodeError as e:
-                logger.error(f"Ошибка парсинга данных инициализации: {e}")
+        init_data = extract_initial(html_content)
+        if init_data:
+            logger.info("Данные инициализации извлечены")
+            return init_data
         
         return {}
     
@@ -119,6 +115,7 @@ class AutoBooking:
             return None
         
         logger.info(f"Найдено {len(ground_courts)} грунтовых кортов")
+        grid = OccupancyGrid(time_blocked)
         
         # Проверяем доступность каждого корта
         for court in ground_courts:
@@ -129,7 +126,7 @@ class AutoBooking:
                 continue
             
             # Проверяем, свободен ли корт в нужное время
-            if self._is_court_available(court_id, time_from, duration_hours, time_blocked):
+            if self._is_court_available(court_id, time_from, duration_hours, grid):
                 logger.info(f"Найден свободный корт №{court_number} (ID: {court_id})")
                 return {
                     'court_id': court_id,
@@ -144,20 +141,10 @@ class AutoBooking:
         return None
     
     def _is_court_available(self, court_id: int, time_from: int, duration_hours: int, 
-                          time_blocked: List[Dict]) -> bool:
+                          grid: OccupancyGrid) -> bool:
         """Проверка доступности корта в указанное время"""
-        # Преобразуем время в 30-минутные слоты
-        start_slot = time_from * 2  # 22:00 = 44-й слот
-        end_slot = start_slot + (duration_hours * 2)  # 2 часа = 4 слота
-        
-        # Проверяем блокировки для этого корта
-        for blocked in time_blocked:
-            if blocked.get('court_id') == court_id:
-                blocked_time = blocked.get('time')
-                if blocked_time and start_slot <= blocked_time < end_slot:
-                    return False
-        
-        return True
+        # Одна проверка маски вместо прохода по всем блокировкам
+        return grid.is_free_at(court_id, time_from, 0, duration_minutes=duration_hours * 60)
     
     def prepare_booking_form_data(self, court_data: Dict) -> Dict:
         """Подготовка данных формы для бронирования"""
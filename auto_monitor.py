@@ -5,11 +5,15 @@
 Запускается каждые N минут и уведомляет о новых свободных слотах
 """
 
-import time
-import schedule
-import json
 from datetime import datetime, timedelta
-from tennis_monitor import TennisMonitor
+from typing import Any, Callable, Dict, List, Optional
+from monitor_daemon import MonitorDaemon
+from schedule_client import get_schedule_client
+from schedule_sync import get_schedule_sync
+from schedule_diff import BOOKING_DELETED, BOOKING_MOVED, SLOT_FREED, ScheduleDiff, ScheduleEvent, cell_runs
+from snapshot_store import get_snapshot_store
+from notification_coalescer import NotificationCoalescer
+from telegram_notifier import TelegramNotifier, get_telegram_config
 import logging
 
 # Настройка логирования
@@ -22,121 +26,159 @@ logging.basicConfig(
     ]
 )
 
+# Наблюдение, под которым события монитора объединяются и сверяются с уже отправленными
+NOTIFY_WATCH = 'auto_monitor'
+
 class AutoTennisMonitor:
-    def __init__(self):
-        self.monitor = TennisMonitor()
-        self.last_known_slots = {}
-        self.notification_file = 'notifications.json'
+    def __init__(self, coalesce_window: float = 30.0, incremental: bool = True):
+        self.client = get_schedule_client()
+        # incremental=True: после первой загрузки даты - только изменения через polling,
+        # и события считаются по ним (O(изменений)), а не сравнением всего снимка
+        self.source = get_schedule_sync() if incremental else self.client
+        # События по (дата, корт, ячейка) вместо сравнения строк времени свободных слотов
+        self.diff = ScheduleDiff(changes=self.source if incremental else None)
+        # Освобождения за окно - одним сообщением; один и тот же слот не повторяется
+        self.coalescer = NotificationCoalescer(self.deliver, window=coalesce_window)
+        config = get_telegram_config()
+        self.notifier = TelegramNotifier(config['bot_token'], config['chat_id']) if config else None
         
     def load_last_slots(self):
-        """Загружает последние известные слоты из файла"""
+        """Восстанавливает последние известные расписания из истории снимков"""
         try:
-            with open(self.notification_file, 'r', encoding='utf-8') as f:
-                self.last_known_slots = json.load(f)
-        except FileNotFoundError:
-            self.last_known_slots = {}
-            logging.info("Файл с последними слотами не найден, начинаем с нуля")
+            restored = self.diff.restore(get_snapshot_store())
+            logging.info(f"Восстановлено расписаний из истории снимков: {restored}")
+        except Exception as e:
+            logging.warning(f"История снимков недоступна, начинаем с нуля: {e}")
     
-    def save_last_slots(self):
-        """Сохраняет текущие слоты в файл"""
+    def record_snapshot(self, date: str, data: Dict):
+        """Сохраняет загруженное расписание как базу для следующей проверки"""
         try:
-            with open(self.notification_file, 'w', encoding='utf-8') as f:
-                json.dump(self.last_known_slots, f, ensure_ascii=False, indent=2)
+            get_snapshot_store().put(date, data)
         except Exception as e:
-            logging.error(f"Ошибка при сохранении слотов: {e}")
+            logging.warning(f"Не удалось сохранить снимок {date}: {e}")
     
-    def get_new_slots(self, date: str, current_slots: list) -> list:
+    def send_notification(self, events: List[ScheduleEvent], date: str):
         """
-        Определяет новые свободные слоты по сравнению с последней проверкой
+        Передает события в пачку уведомлений даты (отправка - по окончании окна)
         
         Args:
+            events: События schedule_diff
             date: Дата в формате YYYY-MM-DD
-            current_slots: Текущие свободные слоты
-            
-        Returns:
-            Список новых слотов
         """
-        new_slots = []
-        
-        if date not in self.last_known_slots:
-            # Если это первая проверка для этой даты, все слоты считаются новыми
-            self.last_known_slots[date] = []
-            return current_slots
-        
-        last_slots = self.last_known_slots[date]
-        
-        # Создаем множества времени для быстрого сравнения
-        current_times = {slot['time'] for slot in current_slots}
-        last_times = {slot['time'] for slot in last_slots}
-        
-        # Находим новые слоты
-        new_times = current_times - last_times
-        for slot in current_slots:
-            if slot['time'] in new_times:
-                new_slots.append(slot)
-        
-        return new_slots
+        self.coalescer.add(NOTIFY_WATCH, date, events)
     
-    def send_notification(self, new_slots: list, date: str):
+    def deliver(self, watch: str, date: str, events: List[ScheduleEvent]):
         """
-        Отправляет уведомление о новых свободных слотах
+        Отправляет одно уведомление об освободившихся кортах за окно
         
         Args:
-            new_slots: Список новых слотов
+            watch: Наблюдение
             date: Дата в формате YYYY-MM-DD
+            events: События пачки, о которых еще не сообщалось
         """
-        if not new_slots:
+        freed = cell_runs(events, SLOT_FREED)
+        if not freed:
             return
         
-        print(f"\n🔔 УВЕДОМЛЕНИЕ! Найдены новые свободные слоты на {date}")
-        print("=" * 60)
-        
-        for slot in new_slots:
-            print(f"⏰ Время: {slot['time']}")
-            print(f"📝 Информация: {slot['element_text']}")
-            print("-" * 30)
-        
-        # Здесь можно добавить отправку email, telegram, SMS и т.д.
-        logging.info(f"Найдено {len(new_slots)} новых свободных слотов на {date}")
+        # Таймер пачки работает в своем потоке, пока демон может менять состояние даты
+        state = self.diff.state(date)
+        if state is None:
+            return
+        grid = state.grid
+        lines = [f"🔔 УВЕДОМЛЕНИЕ! Освободились корты на {date}", "=" * 60]
+        
+        for _, court_id, start, stop in freed:
+            lines.append(f"⏰ Время: {grid.cell_title(start)}-{grid.cell_title(stop)}")
+            lines.append(f"🏟️ Корт: {state.court_title(court_id)}")
+            lines.append("-" * 30)
+        
+        for event in events:
+            if event.kind == BOOKING_MOVED:
+                lines.append(f"↪️ Бронь перенесена ({event.at or 'время неизвестно'}): "
+                             f"{state.court_title(event.court_id)} {grid.cell_title(event.cell)}")
+            elif event.kind == BOOKING_DELETED:
+                lines.append(f"🗑️ Бронь удалена ({event.at or 'время неизвестно'}): "
+                             f"{state.court_title(event.court_id)} {grid.cell_title(event.cell)}")
+        
+        message = "\n".join(lines)
+        print("\n" + message)
+        logging.info(f"Освободилось {len(freed)} интервалов на {date}")
+        if self.notifier is not None:
+            # Future доставки: если Telegram не примет сообщение, пачка вернет ключи
+            return self.notifier.enqueue_message(message, parse_mode=None)
     
-    def check_date(self, date: str):
+    def check_date(self, date: str, data: Optional[Dict] = None):
         """
-        Проверяет свободные слоты для указанной даты
+        Проверяет изменения расписания для указанной даты
         
         Args:
             date: Дата в формате YYYY-MM-DD
+            data: Уже загруженные данные initialize (None - загрузить)
         """
         logging.info(f"Проверяем слоты для даты: {date}")
         
         try:
-            current_slots = self.monitor.get_slots_for_date(date)
-            new_slots = self.get_new_slots(date, current_slots)
-            
-            if new_slots:
-                self.send_notification(new_slots, date)
+            if data is None:
+                data = self.source.get_schedule(date)
+                if data is None:
+                    logging.error(f"Не удалось загрузить расписание на {date}")
+                    return
+                # Разовая проверка сама пишет снимок: следующая сравнит с ним
+                # (загрузки демона записывает MonitorDaemon)
+                self.record_snapshot(date, data)
             
-            # Обновляем последние известные слоты
-            self.last_known_slots[date] = current_slots
-            self.save_last_slots()
+            first = not self.diff.has_baseline(date)
+            events = self.diff.update(date, data)
+            if events:
+                self.send_notification(events, date)
             
             # Выводим общую статистику
+            grid = self.diff.grid(date)
+            free_hours = sum(len(grid.free_starts(court_id, 2)) for court_id in self.diff.states[date].courts)
             print(f"📊 Статистика для {date}:")
-            print(f"   Всего свободных слотов: {len(current_slots)}")
-            print(f"   Новых слотов: {len(new_slots)}")
+            print(f"   Свободных часовых окон: {free_hours}")
+            if first:
+                print(f"   Первая проверка даты - изменения будут видны со следующей")
+            else:
+                print(f"   Освободилось ячеек: {sum(1 for e in events if e.kind == SLOT_FREED)}, "
+                      f"событий всего: {len(events)}")
             
         except Exception as e:
             logging.error(f"Ошибка при проверке даты {date}: {e}")
     
+    def tomorrow(self) -> str:
+        """Завтрашняя дата в формате YYYY-MM-DD"""
+        return (datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d')
+    
     def check_tomorrow(self):
         """Проверяет свободные слоты на завтра"""
-        tomorrow = datetime.now() + timedelta(days=1)
-        tomorrow_str = tomorrow.strftime('%Y-%m-%d')
-        self.check_date(tomorrow_str)
+        self.check_date(self.tomorrow())
     
     def check_specific_date(self, date_str: str):
         """Проверяет свободные слоты на конкретную дату"""
         self.check_date(date_str)
     
+    def register_jobs(self, daemon: MonitorDaemon, check_interval_minutes: int = 10, policy=None,
+                      on_fetch: Optional[Callable[[str, Dict], Any]] = None):
+        """
+        Регистрирует проверку завтрашних слотов в демоне мониторинга
+        
+        Args:
+            daemon: Демон мониторинга
+            check_interval_minutes: Фиксированный интервал (без policy)
+            policy: PollPolicy - адаптивная частота; полная проверка только при изменении броней
+            on_fetch: Еще один получатель той же загрузки (например, WatchRegistry.on_fetch)
+        """
+        if policy is not None:
+            def on_change(date: str, data: Dict):
+                self.check_date(date, data)
+                if on_fetch is not None:
+                    on_fetch(date, data)
+
+            daemon.watch_adaptive('tomorrow', self.tomorrow, policy, on_change, source=self.diff.changes)
+        else:
+            daemon.add_job('tomorrow', self.check_tomorrow, interval=check_interval_minutes * 60)
+    
     def start_monitoring(self, check_interval_minutes: int = 10):
         """
         Запускает автоматический мониторинг
@@ -149,28 +191,16 @@ class AutoTennisMonitor:
         # Загружаем последние известные слоты
         self.load_last_slots()
         
-        # Планируем задачи
-        schedule.every(check_interval_minutes).minutes.do(self.check_tomorrow)
-        
-        # Первоначальная проверка
         print("🎾 Запуск теннисного монитора...")
         print(f"⏰ Интервал проверки: {check_interval_minutes} минут")
         print("📅 Проверяем свободные слоты на завтра")
         print("=" * 50)
-        
-        self.check_tomorrow()
-        
-        print(f"\n✅ Мониторинг запущен! Следующая проверка через {check_interval_minutes} минут.")
         print("💡 Для остановки нажмите Ctrl+C")
         
-        # Основной цикл
-        try:
-            while True:
-                schedule.run_pending()
-                time.sleep(1)
-        except KeyboardInterrupt:
-            print("\n🛑 Мониторинг остановлен пользователем")
-            logging.info("Мониторинг остановлен пользователем")
+        # Первая проверка сразу, дальше демон спит ровно до следующей
+        daemon = MonitorDaemon()
+        self.register_jobs(daemon, check_interval_minutes)
+        daemon.run_forever()
 
 
 def main():
@@ -12,6 +12,8 @@ from typing import List, Dict, Optional
 import logging
 from bs4 import BeautifulSoup
 
+from snapshot_store import get_snapshot_store
+
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -47,9 +49,8 @@ class AutomaticTennisAnalyzer:
         soup = BeautifulSoup(html_content, 'html.parser')
         
         # Сохраняем HTML для отладки
-        with open(f'html_schedule_{date}.html', 'w', encoding='utf-8') as f:
-            f.write(html_content)
-        print(f"💾 HTML сохранен в: html_schedule_{date}.html")
+        get_snapshot_store().put_text(date, 'html', html_content)
+        print(f"💾 HTML сохранен в историю снимков")
         
         # Ищем таблицу расписания
         schedule_table = soup.find('table') or soup.find('div', class_=re.compile(r'schedule|timetable|grid'))
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Поиск свободных кортов: любое начало, любая длительность, любое покрытие
+Один проход по заранее построенным сериям свободных ячеек каждого корта
+"""
+
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+import logging
+
+from async_fetcher import fetch_schedules
+from occupancy import CELL_SECONDS, OccupancyGrid, to_seconds
+from schedule_client import get_schedule_client
+
+logger = logging.getLogger(__name__)
+
+# Покрытия сайта: label -> название
+SURFACES = {
+    'hard': 'Хард',
+    'grunt': 'Грунт',
+    'grass': 'Трава',
+}
+
+
+def parse_time(value: Union[int, str]) -> int:
+    """Час (int) или 'HH:MM' -> секунды от начала дня ('00:00' и 24 - конец дня)"""
+    seconds = value * 3600 if isinstance(value, int) else to_seconds(value)
+    if seconds is None:
+        raise ValueError(f"Некорректное время: {value}")
+    return seconds or 24 * 3600
+
+
+def expand_dates(date_range: Union[Tuple[str, str], Iterable[str]]) -> List[str]:
+    """
+    Список дат запроса
+
+    Args:
+        date_range: Кортеж (первая, последняя) включительно или любой список дат
+    """
+    if isinstance(date_range, tuple) and len(date_range) == 2:
+        first = datetime.strptime(date_range[0], '%Y-%m-%d')
+        last = datetime.strptime(date_range[1], '%Y-%m-%d')
+        return [(first + timedelta(days=i)).strftime('%Y-%m-%d') for i in range((last - first).days + 1)]
+    return list(date_range)
+
+
+class DateIndex:
+    """
+    Индекс свободных серий одной даты
+
+    Для каждого корта хранится список серий (start_cell, end_cell) подряд идущих
+    свободных ячеек и длина самой длинной серии - по нему корты отсекаются
+    без просмотра серий.
+    """
+
+    def __init__(self, date: str, data: Dict):
+        self.date = date
+        set_data = data.get('instructions', {}).get('set', {})
+        self.grid = OccupancyGrid.from_data(data)
+        self.courts: List[Dict] = []
+        self.runs: Dict[int, List[Tuple[int, int]]] = {}
+        self.longest: Dict[int, int] = {}
+
+        for court_type in set_data.get('court_types', []):
+            for court in court_type.get('courts', []):
+                court_id = court.get('id')
+                self.courts.append({
+                    'court_id': court_id,
+                    'court_number': court.get('number'),
+                    'court_type': court_type.get('name'),
+                    'surface': court_type.get('label'),
+                    'inflate_id': court.get('inflate_id'),
+                })
+                runs = self._free_runs(self.grid.mask(court_id))
+                self.runs[court_id] = runs
+                self.longest[court_id] = max((end - start for start, end in runs), default=0)
+
+    def _free_runs(self, mask: int) -> List[Tuple[int, int]]:
+        """Серии свободных ячеек по маске занятости"""
+        runs = []
+        start = None
+        for cell in range(self.grid.cell_count):
+            if mask >> cell & 1:
+                if start is not None:
+                    runs.append((start, cell))
+                    start = None
+            elif start is None:
+                start = cell
+        if start is not None:
+            runs.append((start, self.grid.cell_count))
+        return runs
+
+
+class AvailabilityQuery:
+    def __init__(self, source=None):
+        """
+        Args:
+            source: Источник с методом get_schedule(date) (клиент или синхронизатор)
+        """
+        self.source = source or get_schedule_client()
+        self.indexes: Dict[str, Tuple[Dict, DateIndex]] = {}
+
+    def index(self, date: str, data: Dict) -> DateIndex:
+        """Индекс даты; перестраивается, только если данные изменились"""
+        cached = self.indexes.get(date)
+        if cached is not None and cached[0] is data:
+            return cached[1]
+
+        index = DateIndex(date, data)
+        self.indexes[date] = (data, index)
+        return index
+
+    def find(self, date_range: Union[Tuple[str, str], Iterable[str]],
+             surfaces: Optional[Iterable[str]] = None,
+             start_window: Optional[Tuple[Union[int, str], Union[int, str]]] = None,
+             min_duration: int = 60, max_duration: Optional[int] = None,
+             schedules: Optional[Dict[str, Optional[Dict]]] = None) -> List[Dict]:
+        """
+        Ищет свободные корты
+
+        Args:
+            date_range: Кортеж (первая, последняя дата) или список дат YYYY-MM-DD
+            surfaces: Покрытия ('grunt', 'hard', 'grass' или 'Грунт' ...), None - все
+            start_window: Допустимое начало (с, по) включительно: часы или 'HH:MM'
+            min_duration: Минимальная длительность в минутах
+            max_duration: Максимальная длительность в минутах (None - вся свободная серия)
+            schedules: Уже загруженные данные дата -> initialize (недостающие загружаются)
+
+        Returns:
+            Список вариантов (один на серию корта), самые длинные серии первыми
+        """
+        dates = expand_dates(date_range)
+        schedules = dict(schedules or {})
+        missing = [date for date in dates if date not in schedules]
+        if missing:
+            schedules.update(fetch_schedules(missing, source=self.source))
+
+        wanted = None
+        if surfaces is not None:
+            wanted = {surface.lower() for surface in surfaces}
+            wanted |= {label for label, name in SURFACES.items() if name.lower() in wanted}
+
+        min_cells = -(-min_duration * 60 // CELL_SECONDS)
+        max_cells = -(-max_duration * 60 // CELL_SECONDS) if max_duration else None
+
+        results = []
+        for date in dates:
+            data = schedules.get(date)
+            if not data:
+                continue
+
+            index = self.index(date, data)
+            grid = index.grid
+            if start_window:
+                first_start = grid.cell_at(parse_time(start_window[0]))
+                last_start = grid.cell_at(parse_time(start_window[1]))
+            else:
+                first_start, last_start = 0, grid.cell_count - 1
+
+            for court in index.courts:
+                if wanted is not None and (court['surface'] or '').lower() not in wanted:
+                    continue
+                court_id = court['court_id']
+                if index.longest[court_id] < min_cells:
+                    continue
+
+                for run_start, run_end in index.runs[court_id]:
+                    start = max(run_start, first_start)
+                    if start > last_start or run_end - start < min_cells:
+                        continue
+                    end = min(run_end, start + max_cells) if max_cells else run_end
+
+                    results.append({
+                        **court,
+                        'date': date,
+                        'start_cell': start,
+                        'end_cell': end,
+                        'time_from': grid.cell_title(start),
+                        'time_to': grid.cell_title(end),
+                        'time_display': f"{grid.cell_title(start)}-{grid.cell_title(end)}",
+                        'duration_minutes': (end - start) * CELL_SECONDS // 60,
+                        'run_minutes': (run_end - run_start) * CELL_SECONDS // 60,
+                    })
+
+        results.sort(key=lambda item: (-item['run_minutes'], item['date'], item['start_cell'],
+                                       item['court_number'] or 0))
+        return results
+
+
+_shared_query = None
+
+
+def get_availability_query() -> AvailabilityQuery:
+    """Возвращает общий для процесса движок поиска"""
+    global _shared_query
+    if _shared_query is None:
+        _shared_query = AvailabilityQuery()
+    return _shared_query
+
+
+def main():
+    """Поиск 2-часовых грунтовых окон с 20:00 до 22:00 на неделю вперед"""
+    print("🎾 ПОИСК СВОБОДНЫХ КОРТОВ")
+    print("=" * 60)
+
+    today = datetime.now()
+    date_range = (today.strftime('%Y-%m-%d'), (today + timedelta(days=6)).strftime('%Y-%m-%d'))
+
+    started = time.perf_counter()
+    results = get_availability_query().find(date_range, surfaces=['grunt'], start_window=('20:00', '22:00'),
+                                            min_duration=120, max_duration=120)
+    elapsed = time.perf_counter() - started
+
+    print(f"📅 {date_range[0]} - {date_range[1]}: найдено {len(results)} вариантов за {elapsed:.2f} с")
+    for item in results[:20]:
+        print(f"  • {item['date']} Корт №{item['court_number']} ({item['court_type']}) "
+              f"{item['time_display']} (свободен {item['run_minutes'] // 60}ч {item['run_minutes'] % 60}м)")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -7,34 +7,32 @@
 
 import sys
 import os
-from datetime import datetime, timedelta
-import time
+from datetime import datetime
 
 # Добавляем текущую директорию в путь
 sys.path.insert(0, '/root/tennis-monitor')
 
+from booking_sniper import BookingSniper
 from integrated_monitor_booking import IntegratedMonitorBooking
 
-def wait_until_23h():
-    """Ожидание до 23:00"""
-    while True:
-        now = datetime.now()
-        if now.hour >= 23:
-            print(f"✅ Время пришло! Текущее время: {now.strftime('%H:%M:%S')}")
-            break
-        
-        next_23h = now.replace(hour=23, minute=0, second=0, microsecond=0)
-        if now.hour >= 23:
-            next_23h += timedelta(days=1)
-        
-        wait_seconds = (next_23h - now).total_seconds()
-        wait_hours = wait_seconds / 3600
-        
-        print(f"⏰ Ожидание до 23:00... Осталось: {wait_hours:.1f} часов")
-        print(f"📅 Текущее время: {now.strftime('%H:%M:%S')}")
-        
-        # Ждем 5 минут
-        time.sleep(300)
+def snipe_at_23h():
+    """Бронирование точно в 23:00 по часам сервера"""
+    release_at = datetime.now().replace(hour=23, minute=0, second=0, microsecond=0)
+    print(f"🎯 Корт будет выбран заранее, запрос уйдет в {release_at.strftime('%H:%M:%S')} по часам сервера")
+
+    sniper = BookingSniper()
+    success, message = sniper.snipe(
+        release_at=release_at,
+        date="2025-09-24",
+        time_from=20,
+        duration_hours=2,
+        test_mode=False  # Реальное бронирование!
+    )
+
+    if sniper.attempts:
+        attempt = sniper.attempts[-1]
+        print(f"⚡ Отправлено через {attempt['late_ms']:+.1f} мс после открытия, ответ за {attempt['latency_ms']:.0f} мс")
+    return success, message
 
 def book_sept24_20h():
     """Бронирование корта на 24.09 в 20:00"""
@@ -91,8 +89,7 @@ def main():
         success, message = book_sept24_20h()
     else:
         print("⏳ Ожидание до 23:00...")
-        wait_until_23h()
-        success, message = book_sept24_20h()
+        success, message = snipe_at_23h()
     
     # Итоговый результат
     print("\n" + "=" * 60)
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Подготовленный конвейер бронирования
+CSRF токен и cookies сессии обновляются в фоне, тела заявок для кортов-кандидатов
+закодированы заранее - в момент бронирования остается один POST
+"""
+
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+import logging
+
+from final_auto_booking import FinalAutoBooking
+from booking_race import Prepared
+
+logger = logging.getLogger(__name__)
+
+# Токен и cookies обновляются заметно раньше, чем истекает сессия сайта
+TOKEN_REFRESH_SECONDS = 600
+
+
+class BookingPipeline:
+    """
+    Держит сессию бронирования готовой к отправке
+
+    Токен хранится на дату (страница бронирования загружается с ?date=);
+    загрузка страницы заодно обновляет cookies сессии. Фоновый поток
+    обновляет токены отслеживаемых дат каждые refresh_interval секунд и
+    перекодирует подготовленные тела заявок с новым токеном.
+    """
+
+    def __init__(self, booking: Optional[FinalAutoBooking] = None,
+                 refresh_interval: float = TOKEN_REFRESH_SECONDS):
+        self.booking = booking or FinalAutoBooking()
+        self.refresh_interval = refresh_interval
+        self.tokens: Dict[str, Tuple[str, float]] = {}
+        self.dates = set()
+        self.orders: Dict[Tuple[str, int], Tuple[Dict, bool]] = {}
+        self.encoded: Dict[Tuple[str, int], Prepared] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def token(self, date: str) -> Optional[str]:
+        """CSRF токен даты (загружается, если его нет, он устарел или прошлая загрузка не удалась)"""
+        with self._lock:
+            cached = self.tokens.get(date)
+        if cached and time.time() - cached[1] < self.refresh_interval:
+            return cached[0]
+        return self.refresh(date)
+
+    def refresh(self, date: str) -> Optional[str]:
+        """
+        Загружает страницу бронирования: новый токен и cookies; перекодирует заявки даты
+
+        Если токен получить не удалось, остается последний полученный (заявки
+        не перекодируются), а следующий вызов token() пробует снова.
+        """
+        token = self.booking.get_csrf_token(date)
+        with self._lock:
+            self.dates.add(date)
+            if not token:
+                cached = self.tokens.get(date)
+                logger.warning(f"CSRF токен на {date} не получен, "
+                               f"{'остается прежний' if cached else 'повтор при следующем обращении'}")
+                return cached[0] if cached else None
+            self.tokens[date] = (token, time.time())
+            keys = [key for key in self.orders if key[0] == date]
+        for key in keys:
+            self._encode(key)
+        return token
+
+    def watch(self, date: str):
+        """Добавляет дату в фоновое обновление"""
+        self.token(date)
+
+    def _encode(self, key: Tuple[str, int]):
+        """Кодирует тело заявки с текущим токеном даты (RuntimeError, если токена нет)"""
+        with self._lock:
+            court, test_mode = self.orders[key]
+            token = self.tokens.get(court['date'], (None, 0))[0]
+        if not token:
+            # Заявку без _token сайт отклоняет: загружаем страницу сразу, refresh
+            # перекодирует заявки даты
+            if not self.refresh(court['date']):
+                raise RuntimeError(f"CSRF токен на {court['date']} не получен, заявка не подготовлена")
+            return
+        url, form_data, headers = self.booking.prepare_submission(court, test_mode, token)
+        body = urlencode(form_data).encode('utf-8')
+        with self._lock:
+            self.encoded[key] = (court, (url, body, headers))
+
+    def prebuild(self, courts: List[Dict], test_mode: bool = True) -> List[Prepared]:
+        """
+        Кодирует тела заявок для кортов-кандидатов
+
+        Args:
+            courts: Корты из find_available_courts (в порядке предпочтения)
+            test_mode: Тестовый режим оплаты
+
+        Returns:
+            Подготовленные запросы (для send_submission, BookingRace.run, BookingSniper.fire);
+            RuntimeError, если токен на дату получить не удалось
+        """
+        for court in courts:
+            self.token(court['date'])
+            key = (court['date'], court['court_id'])
+            with self._lock:
+                self.orders[key] = (court, test_mode)
+            self._encode(key)
+        return self.prepared(courts)
+
+    def prepared(self, courts: List[Dict]) -> List[Prepared]:
+        """Текущие подготовленные запросы (после фонового обновления - с новым токеном)"""
+        with self._lock:
+            return [self.encoded[(court['date'], court['court_id'])] for court in courts
+                    if (court['date'], court['court_id']) in self.encoded]
+
+    def submit(self, court: Dict) -> Tuple[bool, str]:
+        """Горячий путь: один POST с заранее закодированным телом"""
+        with self._lock:
+            prepared = self.encoded.get((court['date'], court['court_id']))
+        if prepared is None:
+            prepared = self.prebuild([court])[0]
+        return self.booking.send_submission(*prepared[1])
+
+    def _run(self):
+        while not self._stop.wait(self.refresh_interval):
+            with self._lock:
+                dates = list(self.dates)
+            for date in dates:
+                try:
+                    self.refresh(date)
+                except Exception as e:
+                    logger.warning(f"Не удалось обновить токен на {date}: {e}")
+
+    def start(self) -> 'BookingPipeline':
+        """Запускает фоновое обновление токенов"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='booking-pipeline', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def measure_hot_path(repeats: int = 20) -> Dict[str, float]:
+    """
+    Сравнивает горячий путь на локальном сервере: submit_booking (страница,
+    форма, POST) против одного POST конвейера
+
+    Returns:
+        Медианы в мс: serial_ms, pipeline_ms
+    """
+    from booking_race import StandInOrderServer
+
+    def median(values: List[float]) -> float:
+        return sorted(values)[len(values) // 2]
+
+    serial, pipelined = [], []
+    with StandInOrderServer(delay=0.02) as server:
+        booking = server.attach(FinalAutoBooking())
+        with BookingPipeline(booking) as pipeline:
+            for index in range(repeats):
+                court = {'court_id': 4, 'court_number': 4, 'time_from': 22, 'time_to': 0,
+                         'date': f"2025-10-{index + 1:02d}"}
+                started = time.perf_counter()
+                booking.submit_booking(dict(court, court_id=5))
+                serial.append((time.perf_counter() - started) * 1000)
+
+                pipeline.prebuild([court])
+                started = time.perf_counter()
+                pipeline.submit(court)
+                pipelined.append((time.perf_counter() - started) * 1000)
+
+    return {'serial_ms': median(serial), 'pipeline_ms': median(pipelined)}
+
+
+def main():
+    """Замер горячего пути на локальном сервере"""
+    print("🎾 КОНВЕЙЕР БРОНИРОВАНИЯ: ГОРЯЧИЙ ПУТЬ")
+    print("=" * 60)
+
+    logging.getLogger('final_auto_booking').setLevel(logging.WARNING)
+    for name, value in measure_hot_path().items():
+        print(f"  {name:<15} {value:8.2f} мс")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    main()
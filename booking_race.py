@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Бронирование нескольких кортов-кандидатов по порядку предпочтения
+Если выбранный корт забирают в ту же секунду, заявка на следующий
+по предпочтению корт уходит сразу после отказа и спасает вечер
+"""
+
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qs
+import logging
+
+import requests
+
+from final_auto_booking import FinalAutoBooking
+
+logger = logging.getLogger(__name__)
+
+# Подготовленный запрос: (корт, (url, form_data, headers))
+Prepared = Tuple[Dict, Tuple[str, Dict, Dict]]
+
+# Пауза между заявками по порядку предпочтения: при отказе следующая уходит сразу
+STAGGER_SECONDS = 0.05
+
+
+def rank_candidates(courts: Iterable[Dict], preferred_courts: Sequence[int] = (),
+                    preferred_dome: Optional[int] = None) -> List[Dict]:
+    """
+    Упорядочивает свободные корты по предпочтению
+
+    Сначала корты из preferred_courts (в указанном порядке), затем корты
+    того же купола (inflate_id) - preferred_dome или купола первого
+    предпочтительного корта, затем остальные по номеру.
+
+    Args:
+        courts: Свободные корты (find_available_courts)
+        preferred_courts: Номера кортов в порядке предпочтения
+        preferred_dome: inflate_id предпочтительного купола
+    """
+    courts = list(courts)
+    if preferred_dome is None:
+        for number in preferred_courts:
+            dome = next((court.get('inflate_id') for court in courts if court['court_number'] == number), None)
+            if dome is not None:
+                preferred_dome = dome
+                break
+
+    def key(court: Dict):
+        number = court['court_number']
+        if number in preferred_courts:
+            return (0, preferred_courts.index(number))
+        if preferred_dome is not None and court.get('inflate_id') == preferred_dome:
+            return (1, number)
+        return (2, number)
+
+    return sorted(courts, key=key)
+
+
+class BookingRace:
+    """
+    Заявки на несколько кортов по порядку предпочтения
+
+    Заявки уходят с интервалом stagger; после первого подтверждения еще не
+    отправленные пропускаются. У сайта нет API отмены, поэтому без cancel
+    следующая заявка отправляется только после отказа по всем предыдущим -
+    подтвержденным может оказаться не больше одного корта. С cancel заявки
+    перекрываются (хедж), а подтвержденные сверх одной отменяются.
+    Победитель - лучший по rank_candidates из подтвержденных, а не тот,
+    чей ответ пришел первым.
+    """
+
+    def __init__(self, booking: Optional[FinalAutoBooking] = None, top_n: int = 3,
+                 stagger: float = STAGGER_SECONDS, cancel: Optional[Callable[[Dict], bool]] = None,
+                 pipeline=None):
+        """
+        Args:
+            booking: Модуль бронирования (сессия, форма, разбор ответа)
+            pipeline: BookingPipeline - токен из фонового обновления и закодированные тела
+            top_n: Сколько кортов-кандидатов готовить
+            stagger: Минимальная пауза между отправками по порядку предпочтения
+            cancel: Отмена лишней подтвержденной заявки; возвращает успех
+                    (None - заявки не перекрываются)
+        """
+        self.booking = booking or FinalAutoBooking()
+        self.top_n = top_n
+        self.stagger = stagger
+        self.cancel = cancel
+        self.pipeline = pipeline
+        self.results: List[Dict] = []
+
+    def prepare(self, date: str, time_from: int = 22, duration_hours: int = 2, test_mode: bool = True,
+                preferred_courts: Sequence[int] = (), preferred_dome: Optional[int] = None,
+                courts: Optional[List[Dict]] = None) -> List[Prepared]:
+        """
+        Выбирает top_n кортов и готовит запросы (один CSRF токен на дату)
+
+        Returns:
+            Список подготовленных запросов в порядке предпочтения
+        """
+        if courts is None:
+            courts = self.booking.find_available_courts(date, 'ground', time_from, duration_hours)
+        candidates = rank_candidates(courts, preferred_courts, preferred_dome)[:self.top_n]
+        if not candidates:
+            return []
+
+        logger.info(f"Кандидаты: {', '.join('№' + str(court['court_number']) for court in candidates)}")
+        if self.pipeline is not None:
+            return self.pipeline.prebuild(candidates, test_mode)
+
+        csrf_token = self.booking.get_csrf_token(date)
+        return [(court, self.booking.prepare_submission(court, test_mode, csrf_token)) for court in candidates]
+
+    def run(self, prepared: List[Prepared]) -> Tuple[bool, str, Optional[Dict]]:
+        """
+        Отправляет подготовленные заявки (в порядке предпочтения)
+
+        Returns:
+            (успех, сообщение, корт-победитель)
+        """
+        self.results = [{'court_number': court['court_number'], 'status': 'pending'} for court, _ in prepared]
+        if not prepared:
+            return False, "Свободных кортов не найдено", None
+
+        changed = threading.Condition()
+        confirmed: List[int] = []
+        start = time.perf_counter()
+
+        def waiting(index: int) -> bool:
+            if time.perf_counter() < start + index * self.stagger:
+                return True
+            # Без отмены нельзя отправлять, пока более предпочтительная заявка может быть подтверждена
+            return self.cancel is None and any(result['status'] in ('pending', 'sent')
+                                               for result in self.results[:index])
+
+        def attempt(index: int):
+            court, request = prepared[index]
+            result = self.results[index]
+            with changed:
+                while not confirmed and waiting(index):
+                    remaining = start + index * self.stagger - time.perf_counter()
+                    changed.wait(remaining if remaining > 0 else None)
+                if confirmed:
+                    result['status'] = 'skipped'
+                    changed.notify_all()
+                    return
+                result['status'] = 'sent'
+
+            success = False
+            sent = time.perf_counter()
+            try:
+                success, message = self.booking.send_submission(*request)
+                result['message'] = message
+            finally:
+                result['latency_ms'] = (time.perf_counter() - sent) * 1000
+                with changed:
+                    result['status'] = 'confirmed' if success else 'lost'
+                    if success:
+                        confirmed.append(index)
+                    changed.notify_all()
+
+        with ThreadPoolExecutor(max_workers=len(prepared)) as executor:
+            list(executor.map(attempt, range(len(prepared))))
+
+        if not confirmed:
+            return False, "Ни одна заявка не подтверждена", None
+
+        best = min(confirmed)
+        self.results[best]['status'] = 'won'
+        for index in sorted(confirmed):
+            if index == best:
+                continue
+            court = prepared[index][0]
+            if self.cancel is not None and self.cancel(court):
+                self.results[index]['status'] = 'cancelled'
+                logger.info(f"Лишняя заявка на корт №{court['court_number']} отменена")
+            else:
+                self.results[index]['status'] = 'surplus'
+                logger.warning(f"⚠️ Корт №{court['court_number']} тоже забронирован - отмените заявку вручную")
+
+        court = prepared[best][0]
+        return True, (f"Корт №{court['court_number']} успешно забронирован на "
+                      f"{court['time_from']}:00-{court['time_to']}:00"), court
+
+    def book(self, date: str, time_from: int = 22, duration_hours: int = 2, test_mode: bool = True,
+             preferred_courts: Sequence[int] = (), preferred_dome: Optional[int] = None) -> Tuple[bool, str]:
+        """Поиск кортов и одновременное бронирование (аналог auto_book_court)"""
+        prepared = self.prepare(date, time_from, duration_hours, test_mode, preferred_courts, preferred_dome)
+        success, message, _ = self.run(prepared)
+        return success, message
+
+
+class StandInOrderServer:
+    """
+    Локальная замена сайта для проверки гонки без реальных бронирований
+
+    /bronirovanie/ отдает CSRF токен, /bronirovanie/time_now/ - время,
+    /bronirovanie/order/add подтверждает только первую заявку на корт и время,
+    /bronirovanie/order/cancel освобождает корт.
+    """
+
+    def __init__(self, port: int = 0, delay: float = 0.02, taken: Iterable[int] = ()):
+        """
+        Args:
+            port: Порт (0 - любой свободный)
+            delay: Время обработки заявки и страницы бронирования сервером
+            taken: ID кортов, которые уже забрали другие игроки
+        """
+        self.delay = delay
+        self.orders: Dict[Tuple[str, str, str], int] = {}
+        self.taken = set(taken)
+        self.received: List[Dict] = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def attach(self, booking: FinalAutoBooking) -> FinalAutoBooking:
+        """Направляет модуль бронирования на этот сервер"""
+        booking.base_url = self.base_url
+        booking.booking_url = f"{self.base_url}/bronirovanie"
+        booking.order_url = f"{self.base_url}/bronirovanie/order/add"
+        return booking
+
+    def cancel(self, court: Dict) -> bool:
+        """Отмена заявки через /order/cancel (для параметра cancel у BookingRace)"""
+        response = requests.post(f"{self.base_url}/bronirovanie/order/cancel",
+                                 data={'date': court['date'], 'court_id': court['court_id'],
+                                       'time_from': f"{court['time_from']:02d}:00:00"}, timeout=5)
+        return 'success' in response.text
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, body: str, content_type: str = 'application/json'):
+                payload = body.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                if self.path.startswith('/bronirovanie/time_now'):
+                    self._send(json.dumps({'server_time': time.time(), 'tz': 'Europe/Moscow'}))
+                else:
+                    time.sleep(server.delay)
+                    self._send('<meta name="csrf-token" content="stand-in-token">', 'text/html')
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                form = {name: values[0] for name, values in parse_qs(self.rfile.read(length).decode()).items()}
+                time.sleep(server.delay)
+
+                if self.path.startswith('/bronirovanie/order/cancel'):
+                    key = (form.get('date'), form.get('court_id'), form.get('time_from'))
+                    with server._lock:
+                        removed = server.orders.pop(key, None)
+                    self._send(json.dumps({'status': 'success' if removed else 'not_found'}))
+                    return
+
+                court_id = form.get('ordertime[0][court_id]')
+                key = (form.get('date'), court_id, form.get('ordertime[0][time_from]'))
+                with server._lock:
+                    server.received.append(form)
+                    accepted = key not in server.orders and int(court_id or 0) not in server.taken
+                    if accepted:
+                        server.orders[key] = len(server.orders) + 1
+                if accepted:
+                    self._send(json.dumps({'status': 'success', 'order_id': server.orders[key]}))
+                else:
+                    self._send(json.dumps({'status': 'error', 'message': 'Время уже занято'}))
+
+        return Handler
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def main():
+    """Демонстрация гонки на локальном сервере: первый корт уже забрал другой игрок"""
+    print("🎾 БРОНИРОВАНИЕ ПО ПРЕДПОЧТЕНИЮ (локальный сервер)")
+    print("=" * 60)
+
+    courts = [
+        {'court_id': court_id, 'court_number': court_id, 'court_type': 'Грунт', 'inflate_id': dome,
+         'time_from': 22, 'time_to': 0, 'date': '2025-09-22'}
+        for court_id, dome in ((4, 2), (7, 3), (8, 3), (10, 4), (11, 4))
+    ]
+
+    with StandInOrderServer(taken={7}) as server:
+        race = BookingRace(server.attach(FinalAutoBooking()), top_n=3, cancel=server.cancel)
+        prepared = race.prepare('2025-09-22', courts=courts, preferred_courts=(7,))
+        success, message, _ = race.run(prepared)
+
+    print(f"{'✅' if success else '❌'} {message}")
+    for result in race.results:
+        latency = f"{result['latency_ms']:.0f} мс" if 'latency_ms' in result else '-'
+        print(f"  • Корт №{result['court_number']}: {result['status']} ({latency})")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    main()
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Бронирование точно в момент открытия слота
+Часы выравниваются по серверу (/bronirovanie/time_now/, как в app.js), сессия,
+CSRF токен и форма готовятся заранее, запрос уходит в T-0 с точностью до миллисекунд
+"""
+
+import json
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import logging
+
+import requests
+
+from schedule_client import BASE_URL
+from final_auto_booking import FinalAutoBooking
+from booking_race import BookingRace, Prepared
+from booking_pipeline import BookingPipeline
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:
+    ZoneInfo = None
+
+logger = logging.getLogger(__name__)
+
+# За сколько секунд до открытия готовить сессию, токен и форму
+PREWARM_SECONDS = 10
+# Последняя синхронизация часов (она же держит keep-alive соединение открытым)
+FINAL_SYNC_SECONDS = 2
+# Последний отрезок ожидания - активное ожидание вместо sleep
+SPIN_SECONDS = 0.02
+
+LATENCY_LOG = 'booking_latency.jsonl'
+
+
+class ServerClock:
+    """
+    Часы сервера по /bronirovanie/time_now/
+
+    server_time приходит с точностью до секунды, поэтому одного замера мало.
+    Каждый замер ограничивает смещение интервалом
+    [server - t_after, server + 1 - t_before]; пересечение интервалов замеров,
+    разнесенных по долям секунды, сужает смещение до величины RTT. Границы
+    сохраняются между синхронизациями, поэтому короткая повторная
+    синхронизация только уточняет смещение.
+    """
+
+    def __init__(self, session: Optional[requests.Session] = None, base_url: str = BASE_URL,
+                 timeout: int = 5):
+        self.session = session or requests.Session()
+        self.url = f"{base_url}/bronirovanie/time_now/"
+        self.timeout = timeout
+        self.offset = 0.0
+        self.uncertainty = None
+        self.tz = None
+        self._bounds = (float('-inf'), float('inf'))
+
+    def _sample(self) -> Tuple[float, float]:
+        """Один замер: границы смещения (сервер - локальные часы)"""
+        before = time.time()
+        response = self.session.get(self.url, timeout=self.timeout)
+        after = time.time()
+        response.raise_for_status()
+
+        data = response.json()
+        self.tz = data.get('tz', self.tz)
+        server_time = float(data['server_time'])
+        resolution = 1.0 if server_time == int(server_time) else 0.0
+        return server_time - after, server_time + resolution - before
+
+    def sync(self, samples: int = 8, spacing: float = 0.13) -> float:
+        """
+        Синхронизирует часы
+
+        Args:
+            samples: Количество замеров
+            spacing: Пауза между замерами (не кратна секунде, чтобы попадать в разные доли)
+
+        Returns:
+            Смещение серверных часов относительно локальных в секундах
+        """
+        lower, upper = self._bounds
+        for index in range(samples):
+            try:
+                sample_lower, sample_upper = self._sample()
+            except (requests.RequestException, ValueError, KeyError) as e:
+                logger.warning(f"Ошибка замера времени сервера: {e}")
+                continue
+
+            if sample_lower > upper or sample_upper < lower:
+                # Замеры противоречат друг другу (скачок часов) - начинаем заново
+                lower, upper = sample_lower, sample_upper
+            else:
+                lower, upper = max(lower, sample_lower), min(upper, sample_upper)
+
+            if index + 1 < samples:
+                time.sleep(spacing)
+
+        if lower == float('-inf'):
+            logger.warning("Время сервера недоступно, используем локальные часы")
+            return self.offset
+
+        self._bounds = (lower, upper)
+        self.offset = (lower + upper) / 2
+        self.uncertainty = (upper - lower) / 2
+        logger.info(f"Часы сервера: смещение {self.offset * 1000:+.0f} мс (±{self.uncertainty * 1000:.0f} мс)")
+        return self.offset
+
+    def now(self) -> float:
+        """Текущее время сервера (unix timestamp)"""
+        return time.time() + self.offset
+
+    def timestamp(self, moment: datetime) -> float:
+        """Unix timestamp момента; время без зоны считается временем сервера (tz)"""
+        if moment.tzinfo is None and self.tz and ZoneInfo is not None:
+            try:
+                moment = moment.replace(tzinfo=ZoneInfo(self.tz))
+            except (KeyError, ValueError):
+                logger.warning(f"Неизвестная временная зона сервера: {self.tz}")
+        return moment.timestamp()
+
+
+class BookingSniper:
+    def __init__(self, booking: Optional[FinalAutoBooking] = None, clock: Optional[ServerClock] = None,
+                 prewarm_seconds: float = PREWARM_SECONDS, latency_log: Optional[str] = LATENCY_LOG,
+                 top_n: int = 1):
+        """
+        Args:
+            booking: Модуль бронирования
+            clock: Часы сервера
+            prewarm_seconds: За сколько секунд до открытия готовить запросы
+            latency_log: JSONL файл для задержек (None - не записывать)
+            top_n: Сколько кортов-кандидатов (больше 1 - BookingRace: после отказа сразу следующий)
+        """
+        self.booking = booking or FinalAutoBooking()
+        # CSRF токен и cookies обновляются в фоне, тела заявок кодируются заранее
+        self.pipeline = BookingPipeline(self.booking)
+        self.race = BookingRace(self.booking, top_n, pipeline=self.pipeline) if top_n > 1 else None
+        # Часы ходят через сессию бронирования: замеры заодно держат ее соединение открытым
+        self.clock = clock or ServerClock(self.booking.session, self.booking.base_url)
+        self.prewarm_seconds = prewarm_seconds
+        self.latency_log = latency_log
+        self.attempts: List[Dict] = []
+
+    def sleep_until(self, target: float, status_every: float = 300):
+        """
+        Ждет момента target по часам сервера
+
+        Длинное ожидание - sleep кусками (с периодическим статусом), последние
+        SPIN_SECONDS - активное ожидание по perf_counter.
+        """
+        while True:
+            remaining = target - self.clock.now()
+            if remaining <= 0.5:
+                break
+            if remaining > status_every:
+                logger.info(f"⏰ До открытия: {remaining / 3600:.2f} ч")
+            time.sleep(min(remaining - 0.5, status_every))
+
+        deadline = time.perf_counter() + (target - self.clock.now())
+        remaining = deadline - time.perf_counter()
+        if remaining > SPIN_SECONDS:
+            time.sleep(remaining - SPIN_SECONDS)
+        while time.perf_counter() < deadline:
+            pass
+
+    def prepare(self, date: str, time_from: int, duration_hours: int, test_mode: bool,
+                court_data: Optional[Dict] = None) -> List[Prepared]:
+        """Выбирает корт (или top_n кортов для гонки) и готовит запросы (CSRF, форма, заголовки)"""
+        if court_data is None and self.race is not None:
+            return self.race.prepare(date, time_from, duration_hours, test_mode)
+        if court_data is None:
+            court_data = self.booking.find_available_court(date, 'ground', time_from, duration_hours)
+        if court_data is None:
+            return []
+        return self.pipeline.prebuild([court_data], test_mode)
+
+    def fire(self, target: float, prepared: List[Prepared]) -> Tuple[bool, str]:
+        """Отправляет подготовленные запросы и записывает задержку"""
+        fired_at = self.clock.now()
+        started = time.perf_counter()
+        if len(prepared) == 1:
+            court_data = prepared[0][0]
+            success, message = self.booking.send_submission(*prepared[0][1])
+        else:
+            success, message, court_data = self.race.run(prepared)
+            court_data = court_data or prepared[0][0]
+        latency_ms = (time.perf_counter() - started) * 1000
+
+        attempt = {
+            'date': court_data['date'],
+            'court_number': court_data['court_number'],
+            'candidates': len(prepared),
+            'target': target,
+            'fired_at': fired_at,
+            'late_ms': (fired_at - target) * 1000,
+            'latency_ms': latency_ms,
+            'clock_uncertainty_ms': self.clock.uncertainty * 1000 if self.clock.uncertainty is not None else None,
+            'success': success,
+            'message': message,
+        }
+        self.attempts.append(attempt)
+        logger.info(f"🎯 Запрос отправлен через {attempt['late_ms']:+.1f} мс после открытия, "
+                    f"ответ за {latency_ms:.0f} мс")
+
+        if self.latency_log:
+            with open(self.latency_log, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(attempt, ensure_ascii=False) + '\n')
+
+        return success, message
+
+    def snipe(self, release_at: datetime, date: str, time_from: int = 22, duration_hours: int = 2,
+              test_mode: bool = True, court_data: Optional[Dict] = None) -> Tuple[bool, str]:
+        """
+        Бронирует корт в момент открытия слота
+
+        Args:
+            release_at: Момент открытия бронирования (без зоны - время сервера)
+            date: Дата бронирования YYYY-MM-DD
+            time_from: Час начала
+            duration_hours: Длительность в часах
+            test_mode: Тестовый режим оплаты (test_payment=1)
+            court_data: Конкретный корт (по умолчанию выбирается перед открытием)
+
+        Returns:
+            (успех, сообщение)
+        """
+        self.clock.sync()
+        target = self.clock.timestamp(release_at)
+        logger.info(f"🎾 Открытие бронирования: {release_at.strftime('%d.%m.%Y %H:%M:%S')}")
+
+        with self.pipeline:
+            # Токен и cookies поддерживаются свежими все время ожидания
+            self.pipeline.watch(date)
+
+            # Подготовка за prewarm_seconds: корт и закодированные тела заявок
+            self.sleep_until(target - self.prewarm_seconds)
+            try:
+                prepared = self.prepare(date, time_from, duration_hours, test_mode, court_data)
+            except RuntimeError as e:
+                logger.warning(f"Заявки не подготовлены заранее: {e}")
+                prepared = []
+
+            self.sleep_until(target - FINAL_SYNC_SECONDS)
+            self.clock.sync(samples=3, spacing=0.11)
+            self.sleep_until(target)
+
+            if not prepared:
+                # До открытия корт выбрать не удалось - ищем сразу после открытия
+                logger.warning("Корт не выбран заранее, ищем после открытия")
+                prepared = self.prepare(date, time_from, duration_hours, test_mode)
+                if not prepared:
+                    return False, "Свободных кортов не найдено"
+
+            return self.fire(target, prepared)
+
+
+def main():
+    """Проверка синхронизации часов с сервером"""
+    print("🎾 СИНХРОНИЗАЦИЯ С ЧАСАМИ СЕРВЕРА")
+    print("=" * 60)
+
+    clock = ServerClock()
+    offset = clock.sync()
+    print(f"🕐 Смещение: {offset * 1000:+.0f} мс")
+    if clock.uncertainty is not None:
+        print(f"📏 Точность: ±{clock.uncertainty * 1000:.0f} мс")
+    print(f"🌍 Зона сервера: {clock.tz}")
+    print(f"📅 Время сервера: {datetime.fromtimestamp(clock.now()).strftime('%H:%M:%S.%f')[:-3]}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    main()
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Хранилище отложенных запросов на бронирование (SQLite, WAL)
+Вместо перезаписи booking_requests.json целиком: индексы по статусу и дате,
+атомарные переходы статусов, безопасная работа нескольких процессов
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_FILE = 'booking_requests.db'
+LEGACY_JSON_FILE = 'booking_requests.json'
+
+ACTIVE_STATUSES = ('pending', 'waiting')
+# Запрос в обработке дольше этого считается брошенным (процесс упал) и забирается снова
+STALE_PROCESSING = timedelta(minutes=30)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS requests (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    date TEXT NOT NULL,
+    time_from INTEGER NOT NULL,
+    duration_hours INTEGER NOT NULL,
+    description TEXT NOT NULL DEFAULT '',
+    status TEXT NOT NULL DEFAULT 'pending',
+    created_at TEXT NOT NULL,
+    last_check TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_requests_status_date ON requests (status, date);
+CREATE INDEX IF NOT EXISTS idx_requests_date ON requests (date);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+COLUMNS = ('id', 'date', 'time_from', 'duration_hours', 'description', 'status',
+           'created_at', 'last_check', 'attempts', 'result', 'error')
+
+
+class BookingStore:
+    """
+    Запросы на бронирование в SQLite
+
+    WAL позволяет меню и демону мониторинга читать, пока другой процесс
+    пишет; записи идут короткими транзакциями BEGIN IMMEDIATE. ID выдает
+    AUTOINCREMENT и после удалений не повторяется. Обработку запроса
+    процесс начинает с claim() - условного UPDATE, который удается только
+    одному процессу.
+    """
+
+    def __init__(self, path: str = DEFAULT_DB_FILE, legacy_json: Optional[str] = LEGACY_JSON_FILE):
+        self.path = path
+        self._local = threading.local()
+        # executescript сам завершает транзакции, поэтому схема создается вне transaction()
+        self._connection().executescript(SCHEMA)
+        if legacy_json:
+            self.import_json(legacy_json)
+
+    def _connection(self) -> sqlite3.Connection:
+        """Соединение текущего потока (sqlite3 не разделяет соединения между потоками)"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            connection.row_factory = sqlite3.Row
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    @contextmanager
+    def transaction(self):
+        """Транзакция с блокировкой записи с самого начала (BEGIN IMMEDIATE)"""
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    @staticmethod
+    def _to_dict(row: Optional[sqlite3.Row]) -> Optional[Dict]:
+        return dict(row) if row is not None else None
+
+    def import_json(self, path: str) -> int:
+        """
+        Однократный импорт booking_requests.json (ID сохраняются)
+
+        Returns:
+            Количество импортированных запросов (0, если импорт уже был)
+        """
+        if not os.path.exists(path):
+            return 0
+
+        with self.transaction() as connection:
+            if connection.execute("SELECT 1 FROM meta WHERE key = 'json_imported'").fetchone():
+                return 0
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    requests = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.error(f"Не удалось прочитать {path}: {e}")
+                return 0
+
+            for request in requests:
+                row = {column: request.get(column) for column in COLUMNS}
+                row['description'] = row['description'] or ''
+                row['status'] = row['status'] or 'pending'
+                row['created_at'] = row['created_at'] or datetime.now().isoformat()
+                row['attempts'] = row['attempts'] or 0
+                connection.execute(
+                    f"INSERT OR IGNORE INTO requests ({', '.join(COLUMNS)}) "
+                    f"VALUES ({', '.join('?' * len(COLUMNS))})",
+                    [row[column] for column in COLUMNS])
+            connection.execute("INSERT INTO meta (key, value) VALUES ('json_imported', ?)",
+                               (datetime.now().isoformat(),))
+
+        logger.info(f"Импортировано {len(requests)} запросов из {path}")
+        return len(requests)
+
+    def add(self, date: str, time_from: int, duration_hours: int, description: str = '') -> int:
+        """Добавляет запрос и возвращает его ID"""
+        with self.transaction() as connection:
+            cursor = connection.execute(
+                "INSERT INTO requests (date, time_from, duration_hours, description, status, created_at) "
+                "VALUES (?, ?, ?, ?, 'pending', ?)",
+                (date, time_from, duration_hours, description or '', datetime.now().isoformat()))
+            return cursor.lastrowid
+
+    def get(self, request_id: int) -> Optional[Dict]:
+        row = self._connection().execute("SELECT * FROM requests WHERE id = ?", (request_id,)).fetchone()
+        return self._to_dict(row)
+
+    def list(self, statuses: Optional[Iterable[str]] = None, date: Optional[str] = None) -> List[Dict]:
+        """
+        Запросы с фильтром по статусам и дате (оба фильтра идут по индексам)
+
+        Args:
+            statuses: Допустимые статусы (None - любые)
+            date: Дата YYYY-MM-DD (None - любые)
+        """
+        conditions, params = [], []
+        if statuses is not None:
+            statuses = list(statuses)
+            conditions.append(f"status IN ({', '.join('?' * len(statuses))})")
+            params.extend(statuses)
+        if date is not None:
+            conditions.append("date = ?")
+            params.append(date)
+
+        query = "SELECT * FROM requests"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY date, id"
+        return [dict(row) for row in self._connection().execute(query, params)]
+
+    def active(self, date: Optional[str] = None) -> List[Dict]:
+        """Запросы, ожидающие обработки"""
+        return self.list(ACTIVE_STATUSES, date)
+
+    def counts(self) -> Dict[str, int]:
+        """Количество запросов по статусам"""
+        rows = self._connection().execute("SELECT status, COUNT(*) FROM requests GROUP BY status")
+        return {status: count for status, count in rows}
+
+    def claim(self, request_id: int) -> Optional[Dict]:
+        """
+        Атомарно берет запрос в обработку (статус processing, попытка +1)
+
+        Returns:
+            Запрос или None, если его уже обрабатывает другой процесс или он завершен
+        """
+        now = datetime.now()
+        stale = (now - STALE_PROCESSING).isoformat()
+        with self.transaction() as connection:
+            cursor = connection.execute(
+                f"UPDATE requests SET status = 'processing', attempts = attempts + 1, last_check = ? "
+                f"WHERE id = ? AND (status IN ({', '.join('?' * len(ACTIVE_STATUSES))}) "
+                f"OR (status = 'processing' AND last_check < ?))",
+                (now.isoformat(), request_id, *ACTIVE_STATUSES, stale))
+            if cursor.rowcount != 1:
+                return None
+            return self._to_dict(connection.execute("SELECT * FROM requests WHERE id = ?", (request_id,)).fetchone())
+
+    def transition(self, request_id: int, to_status: str, from_statuses: Iterable[str] = ('processing',),
+                   result: Optional[str] = None, error: Optional[str] = None) -> bool:
+        """
+        Атомарный переход статуса
+
+        Returns:
+            True, если запрос был в одном из from_statuses и переведен в to_status
+        """
+        from_statuses = list(from_statuses)
+        with self.transaction() as connection:
+            cursor = connection.execute(
+                f"UPDATE requests SET status = ?, result = COALESCE(?, result), error = COALESCE(?, error) "
+                f"WHERE id = ? AND status IN ({', '.join('?' * len(from_statuses))})",
+                (to_status, result, error, request_id, *from_statuses))
+            return cursor.rowcount == 1
+
+    def delete(self, request_id: int) -> bool:
+        with self.transaction() as connection:
+            return connection.execute("DELETE FROM requests WHERE id = ?", (request_id,)).rowcount == 1
+
+
+_shared_store = None
+_store_lock = threading.Lock()
+
+
+def get_booking_store() -> BookingStore:
+    """Возвращает общее для процесса хранилище запросов"""
+    global _shared_store
+    with _store_lock:
+        if _shared_store is None:
+            _shared_store = BookingStore()
+        return _shared_store
+
+
+def main():
+    """Импорт booking_requests.json и сводка по запросам"""
+    print("🎾 ХРАНИЛИЩЕ ЗАПРОСОВ НА БРОНИРОВАНИЕ")
+    print("=" * 60)
+
+    store = get_booking_store()
+    print(f"🗄️ База: {store.path}")
+    for status, count in sorted(store.counts().items()):
+        print(f"  {status:<12} {count}")
+    for request in store.active():
+        print(f"  ⏳ #{request['id']} {request['date']} {request['time_from']}:00 ({request['status']})")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -6,12 +6,14 @@
 
 import sys
 import os
-from datetime import datetime, timedelta
+from datetime import datetime
 
 # Добавляем текущую директорию в путь
 sys.path.insert(0, '/root/tennis-monitor')
 
 from corrected_30min_analyzer import Corrected30MinAnalyzer
+from async_fetcher import consecutive_dates, fetch_schedules
+from availability_query import AvailabilityQuery
 
 def check_available_dates():
     """Проверка доступных дат"""
@@ -19,25 +21,27 @@ def check_available_dates():
     print("=" * 50)
     
     analyzer = Corrected30MinAnalyzer()
+    query = AvailabilityQuery(analyzer.source)
     
-    # Проверяем даты на неделю вперед
+    # Загружаем 10 дней вперед параллельно
     today = datetime.now()
+    schedules = fetch_schedules(consecutive_dates(today.strftime('%Y-%m-%d'), 10), source=analyzer.source)
     
-    for i in range(10):  # 10 дней вперед
-        check_date = (today + timedelta(days=i)).strftime('%Y-%m-%d')
-        date_display = (today + timedelta(days=i)).strftime('%d.%m.%Y')
+    for check_date, data in schedules.items():
+        date_display = datetime.strptime(check_date, '%Y-%m-%d').strftime('%d.%m.%Y')
         
         print(f"\n🔍 Проверяем {date_display} ({check_date})...")
         
         try:
-            free_courts = analyzer.analyze_ground_courts_22h_corrected(check_date)
+            free_courts = analyzer.analyze_ground_courts_22h_corrected(check_date, data) if data else []
             
             if free_courts:
                 print(f"  ✅ Доступно: {len(free_courts)} кортов")
                 
-                # Проверяем доступность в 20:00
-                target_duration = "20:00-22:00"
-                available_20h = [court for court in free_courts if court['time_display'] == target_duration]
+                # Проверяем доступность в 20:00 (анализ 22:00 не содержит окна 20:00-22:00)
+                available_20h = query.find([check_date], surfaces=['grunt'], start_window=('20:00', '20:00'),
+                                           min_duration=120, max_duration=120,
+                                           schedules={check_date: data})
                 
                 if available_20h:
                     print(f"  🎯 В 20:00-22:00: {len(available_20h)} кортов")
@@ -4,66 +4,44 @@
 Исправленный анализатор с учетом 30-минутных ячеек
 """
 
-import requests
-import json
-import re
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional
 import logging
 
+from schedule_client import get_schedule_client
+from schedule_sync import get_schedule_sync
+from occupancy import OccupancyGrid
+
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class Corrected30MinAnalyzer:
-    def __init__(self):
+    def __init__(self, incremental: bool = False):
         self.base_url = "https://x19.spb.ru"
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
+        self.client = get_schedule_client()
+        self.session = self.client.session
+        # incremental=True: полный initialize один раз, далее только изменения через polling
+        self.source = get_schedule_sync() if incremental else self.client
     
     def get_real_api_data(self, date: str) -> Optional[Dict]:
         """Получает реальные данные от API"""
-        try:
-            # Получаем HTML страницу для timestamp
-            page_url = f"{self.base_url}/bronirovanie/?date={date}"
-            page_response = self.session.get(page_url, timeout=10)
-            page_response.raise_for_status()
-            
-            # Извлекаем timestamp
-            timestamp_match = re.search(r'initialize\?date=[^&]+&_=(\d+)', page_response.text)
-            timestamp = timestamp_match.group(1) if timestamp_match else str(int(datetime.now().timestamp()))
-            
-            # Запрашиваем данные API
-            api_url = f"{self.base_url}/bronirovanie/initialize?date={date}&_={timestamp}"
-            response = self.session.get(api_url, timeout=10)
-            response.raise_for_status()
-            
-            # Парсим JavaScript код
-            content = response.text
-            initial_match = re.search(r'var initial = ({.*?});', content, re.DOTALL)
-            
-            if initial_match:
-                json_str = initial_match.group(1)
-                data = json.loads(json_str)
-                return data
-            
-            return None
-                
-        except Exception as e:
-            logger.error(f"Ошибка при получении данных для даты {date}: {e}")
-            return None
+        return self.source.get_schedule(date)
     
-    def analyze_ground_courts_22h_corrected(self, date: str) -> List[Dict]:
+    def analyze_ground_courts_22h_corrected(self, date: str, data: Optional[Dict] = None) -> List[Dict]:
         """
         Правильно анализирует свободные грунтовые корты с учетом 30-минутных ячеек
+        
+        Args:
+            date: Дата в формате YYYY-MM-DD
+            data: Уже загруженные данные API (если None - загружаются)
         """
         print(f"🔍 Исправленный анализ грунтовых кортов на {date}")
         print("📊 Учитываем 30-минутные ячейки")
         
         # Получаем данные от API
-        data = self.get_real_api_data(date)
+        if data is None:
+            data = self.get_real_api_data(date)
         if not data:
             print(f"❌ Не удалось получить данные для {date}")
             return []
@@ -92,14 +70,13 @@ class Corrected30MinAnalyzer:
         time_blocked = set_data.get('time_blocked', [])
         print(f"🚫 Найдено {len(time_blocked)} занятых слотов в time_blocked")
         
-        # Определяем 30-минутные слоты для 22:00-00:00
+        # Занятость по ячейкам: одна битовая маска на корт
+        grid = OccupancyGrid(time_blocked, set_data.get('time_list'))
+        
+        # 30-минутные слоты для 22:00-00:00
         # 22:00-22:30, 22:30-23:00, 23:00-23:30, 23:30-00:00
-        target_slots = [
-            {'start_hour': 22, 'start_min': 0, 'end_hour': 22, 'end_min': 30},   # 22:00-22:30
-            {'start_hour': 22, 'start_min': 30, 'end_hour': 23, 'end_min': 0},   # 22:30-23:00
-            {'start_hour': 23, 'start_min': 0, 'end_hour': 23, 'end_min': 30},   # 23:00-23:30
-            {'start_hour': 23, 'start_min': 30, 'end_hour': 0, 'end_min': 0},    # 23:30-00:00
-        ]
+        first_cell = grid.cell_index(22, 0)
+        last_cell = grid.cell_index(0, 0)
         
         free_courts = []
         
@@ -109,30 +86,9 @@ class Corrected30MinAnalyzer:
             
             # Проверяем каждый 30-минутный слот
             slot_status = {}
-            for i, slot in enumerate(target_slots):
-                slot_name = f"{slot['start_hour']:02d}:{slot['start_min']:02d}-{slot['end_hour']:02d}:{slot['end_min']:02d}"
-                slot_status[slot_name] = True  # По умолчанию свободен
-                
-                # Проверяем, не занят ли этот слот
-                for blocked in time_blocked:
-                    if blocked.get('court_id') == court_id:
-                        time_from = blocked.get('time_from', {})
-                        time_to = blocked.get('time_to', {})
-                        
-                        from_hours = time_from.get('hours', 0)
-                        from_minutes = time_from.get('minutes', 0)
-                        to_hours = time_to.get('hours', 0)
-                        to_minutes = time_to.get('minutes', 0)
-                        
-                        # Проверяем пересечение с нашим слотом
-                        if self.slots_overlap(
-                            slot['start_hour'], slot['start_min'],
-                            slot['end_hour'], slot['end_min'],
-                            from_hours, from_minutes,
-                            to_hours, to_minutes
-                        ):
-                            slot_status[slot_name] = False
-                            break
+            for cell in range(first_cell, last_cell):
+                slot_name = f"{grid.cell_title(cell)}-{grid.cell_title(cell + 1)}"
+                slot_status[slot_name] = grid.is_free(court_id, cell, cell + 1)
             
             # Определяем доступные слоты
             available_slots = []
@@ -4,13 +4,14 @@
 Исправленный монитор теннисного сайта с правильным определением свободных слотов
 """
 
-import requests
 import json
 import re
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional
 import logging
 
+from schedule_client import get_schedule_client
+
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -18,42 +19,12 @@ logger = logging.getLogger(__name__)
 class CorrectedTennisMonitor:
     def __init__(self):
         self.base_url = "https://x19.spb.ru"
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
+        self.client = get_schedule_client()
+        self.session = self.client.session
         
     def get_api_data(self, date: str) -> Optional[Dict]:
         """Получает данные от API"""
-        try:
-            # Получаем HTML страницу для timestamp
-            page_url = f"{self.base_url}/bronirovanie/?date={date}"
-            page_response = self.session.get(page_url, timeout=10)
-            page_response.raise_for_status()
-            
-            # Извлекаем timestamp
-            timestamp_match = re.search(r'initialize\?date=[^&]+&_=(\d+)', page_response.text)
-            timestamp = timestamp_match.group(1) if timestamp_match else str(int(datetime.now().timestamp()))
-            
-            # Запрашиваем данные API
-            api_url = f"{self.base_url}/bronirovanie/initialize?date={date}&_={timestamp}"
-            response = self.session.get(api_url, timeout=10)
-            response.raise_for_status()
-            
-            # Парсим JavaScript код
-            content = response.text
-            initial_match = re.search(r'var initial = ({.*?});', content, re.DOTALL)
-            
-            if initial_match:
-                json_str = initial_match.group(1)
-                data = json.loads(json_str)
-                return data
-            
-            return None
-                
-        except Exception as e:
-            logger.error(f"Ошибка при получении данных для даты {date}: {e}")
-            return None
+        return self.client.get_schedule(date)
     
     def get_real_occupied_slots(self, date: str) -> List[Dict]:
         """
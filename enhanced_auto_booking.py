@@ -6,7 +6,6 @@
 """
 
 import requests
-import json
 import time
 from datetime import datetime, timedelta
 from urllib.parse import urljoin, urlparse, parse_qs
@@ -14,6 +13,9 @@ import re
 from typing import Dict, List, Optional, Tuple
 import logging
 
+from schedule_client import create_session, get_schedule_client
+from occupancy import OccupancyGrid
+
 # Настройка логирования
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -33,8 +35,7 @@ class EnhancedAutoBooking:
             'payment_type': 'club'  # Оплата в клубе
         }
         
-        self.session = requests.Session()
-        self.session.headers.update({
+        self.session = create_session({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
             'Accept': 'application/json, text/plain, */*',
             'Accept-Language': 'ru-RU,ru;q=0.8,en-US;q=0.5,en;q=0.3',
@@ -43,34 +44,18 @@ class EnhancedAutoBooking:
             'Referer': 'https://x19.spb.ru/bronirovanie/',
             'X-Requested-With': 'XMLHttpRequest'
         })
+        self.client = get_schedule_client()
         
     def get_initialize_data(self, date: str) -> Optional[Dict]:
-        """Получение данных инициализации через API"""
-        url = f"{self.initialize_url}?date={date}"
-        logger.info(f"Загружаем данные инициализации: {url}")
+        """Получение данных инициализации через общий клиент расписания"""
+        logger.info(f"Загружаем данные инициализации на {date}")
         
-        try:
-            response = self.session.get(url)
-            response.raise_for_status()
-            
-            # Проверяем, что это JavaScript код с данными
-            if 'window.$INITIAL' in response.text:
-                # Извлекаем JSON из JavaScript
-                json_match = re.search(r'window\.\$INITIAL\s*=\s*({.*?});', response.text, re.DOTALL)
-                if json_match:
-                    json_str = json_match.group(1)
-                    data = json.loads(json_str)
-                    logger.info("Данные инициализации успешно извлечены")
-                    return data
-            else:
-                logger.error("Данные инициализации не найдены в ответе")
-                
-        except requests.RequestException as e:
-            logger.error(f"Ошибка загрузки данных инициализации: {e}")
-        except json.JSONDecodeError as e:
-            logger.error(f"Ошибка парсинга JSON: {e}")
-            
-        return None
+        init_data = self.client.get_schedule(date, fresh=True)
+        if init_data:
+            logger.info("Данные инициализации успешно извлечены")
+        else:
+            logger.error("Данные инициализации не найдены в ответе")
+        return init_data
     
     def find_available_court(self, date: str, court_type: str = 'ground', 
                            time_from: int = 22, duration_hours: int = 2) -> Optional[Dict]:
@@ -99,6 +84,7 @@ class EnhancedAutoBooking:
         
         logger.info(f"Найдено {len(ground_courts)} грунтовых кортов")
         logger.info(f"Найдено {len(time_blocked)} занятых слотов")
+        grid = OccupancyGrid(time_blocked)
         
         # Проверяем доступность каждого корта
         for court in ground_courts:
@@ -109,7 +95,7 @@ class EnhancedAutoBooking:
                 continue
             
             # Проверяем, свободен ли корт в нужное время
-            if self._is_court_available(court_id, time_from, duration_hours, time_blocked):
+            if self._is_court_available(court_id, time_from, duration_hours, grid):
                 logger.info(f"Найден свободный корт №{court_number} (ID: {court_id})")
                 return {
                     'court_id': court_id,
@@ -124,23 +110,10 @@ class EnhancedAutoBooking:
         return None
     
     def _is_court_available(self, court_id: int, time_from: int, duration_hours: int, 
-                          time_blocked: List[Dict]) -> bool:
+                          grid: OccupancyGrid) -> bool:
         """Проверка доступности корта в указанное время"""
-        # Преобразуем время в секунды от начала дня
-        start_time = time_from * 3600  # 22:00 = 79200 секунд
-        end_time = start_time + (duration_hours * 3600)  # 2 часа = 7200 секунд
-        
-        # Проверяем блокировки для этого корта
-        for blocked in time_blocked:
-            if blocked.get('court_id') == court_id:
-                blocked_start = blocked.get('time_from', {}).get('totalSeconds', 0)
-                blocked_end = blocked.get('time_to', {}).get('totalSeconds', 0)
-                
-                # Проверяем пересечение временных интервалов
-                if not (end_time <= blocked_start or start_time >= blocked_end):
-                    return False
-        
-        return True
+        # Одна проверка маски вместо прохода по всем блокировкам
+        return grid.is_free_at(court_id, time_from, 0, duration_minutes=duration_hours * 60)
     
     def get_csrf_token(self, date: str) -> Optional[str]:
         """Получение CSRF токена"""
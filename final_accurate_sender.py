@@ -59,7 +59,7 @@ def send_accurate_notification():
             message = f"❌ Свободных грунтовых кортов в 22:00-00:00 на {today_str} не найдено\n\n"
             message += "🔗 Проверить: https://x19.spb.ru/bronirovanie/"
             
-            success = notifier.send_message(message)
+            success = notifier.send_message(message, wait=True)
             if success:
                 print("✅ Уведомление об отсутствии слотов отправлено")
                 return True
@@ -108,7 +108,7 @@ def send_accurate_notification():
         
         message += "\n🔗 <a href='https://x19.spb.ru/bronirovanie/'>Забронировать</a>"
         
-        success = notifier.send_message(message)
+        success = notifier.send_message(message, wait=True)
         
         if success:
             print("✅ Уведомление успешно отправлено в Telegram!")
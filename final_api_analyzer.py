@@ -4,13 +4,15 @@
 Финальный API анализатор с расширенным парсингом данных
 """
 
-import requests
 import json
-import re
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import List, Dict, Optional
 import logging
 
+from schedule_client import get_schedule_client
+from async_fetcher import consecutive_dates, fetch_schedules
+from snapshot_store import get_snapshot_store
+
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -18,45 +20,18 @@ logger = logging.getLogger(__name__)
 class FinalAPIAnalyzer:
     def __init__(self):
         self.base_url = "https://x19.spb.ru"
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
+        self.client = get_schedule_client(cached=True)
+        self.session = self.client.session
     
-    def get_enhanced_api_data(self, date: str) -> Optional[Dict]:
+    def get_enhanced_api_data(self, date: str, data: Optional[Dict] = None) -> Optional[Dict]:
         """Получает расширенные данные от API с дополнительным парсингом"""
-        try:
-            # Получаем HTML страницу для timestamp
-            page_url = f"{self.base_url}/bronirovanie/?date={date}"
-            page_response = self.session.get(page_url, timeout=10)
-            page_response.raise_for_status()
-            
-            # Извлекаем timestamp
-            timestamp_match = re.search(r'initialize\?date=[^&]+&_=(\d+)', page_response.text)
-            timestamp = timestamp_match.group(1) if timestamp_match else str(int(datetime.now().timestamp()))
-            
-            # Запрашиваем данные API
-            api_url = f"{self.base_url}/bronirovanie/initialize?date={date}&_={timestamp}"
-            response = self.session.get(api_url, timeout=10)
-            response.raise_for_status()
-            
-            # Парсим JavaScript код
-            content = response.text
-            initial_match = re.search(r'var initial = ({.*?});', content, re.DOTALL)
-            
-            if initial_match:
-                json_str = initial_match.group(1)
-                data = json.loads(json_str)
-                
-                # Дополнительный анализ данных
-                enhanced_data = self.enhance_api_data(data, date)
-                return enhanced_data
-            
-            return None
-                
-        except Exception as e:
-            logger.error(f"Ошибка при получении данных для даты {date}: {e}")
+        if data is None:
+            data = self.client.get_schedule(date)
+        if not data:
             return None
+        
+        # Дополнительный анализ данных
+        return self.enhance_api_data(data, date)
     
     def enhance_api_data(self, data: Dict, date: str) -> Dict:
         """Усиливает данные API дополнительным анализом"""
@@ -112,9 +87,9 @@ class FinalAPIAnalyzer:
         
         return enhanced
     
-    def analyze_ground_courts_from_api(self, date: str) -> List[Dict]:
+    def analyze_ground_courts_from_api(self, date: str, raw_data: Optional[Dict] = None) -> List[Dict]:
         """Анализирует грунтовые корты на основе API данных"""
-        data = self.get_enhanced_api_data(date)
+        data = self.get_enhanced_api_data(date, raw_data)
         if not data:
             return []
         
@@ -150,18 +125,16 @@ class FinalAPIAnalyzer:
         print(f"🚫 Найдено {len(occupied_slots)} занятых слотов во всех полях")
         
         # Сохраняем детальную информацию для анализа
-        analysis_file = f'detailed_analysis_{date}.json'
-        with open(analysis_file, 'w', encoding='utf-8') as f:
-            json.dump({
-                'date': date,
-                'ground_courts': ground_courts,
-                'occupied_slots': occupied_slots,
-                'occupied_fields': occupied_fields,
-                'time_fields': data.get('time_fields', []),
-                'court_analysis': data.get('court_analysis', {})
-            }, f, ensure_ascii=False, indent=2)
-        
-        print(f"💾 Детальный анализ сохранен в: {analysis_file}")
+        get_snapshot_store().put_json(date, 'analysis', {
+            'date': date,
+            'ground_courts': ground_courts,
+            'occupied_slots': occupied_slots,
+            'occupied_fields': occupied_fields,
+            'time_fields': data.get('time_fields', []),
+            'court_analysis': data.get('court_analysis', {})
+        })
+        
+        print(f"💾 Детальный анализ сохранен в историю снимков (python snapshot_store.py)")
         
         # Пока что возвращаем пустой список, так как нужно проанализировать структуру
         return []
@@ -175,17 +148,17 @@ class FinalAPIAnalyzer:
         print("=" * 70)
         
         results = {}
-        start_dt = datetime.strptime(start_date, '%Y-%m-%d')
         
-        for i in range(7):  # Анализируем 7 дней
-            current_date = start_dt + timedelta(days=i)
-            date_str = current_date.strftime('%Y-%m-%d')
-            date_display = current_date.strftime('%d.%m.%Y (%A)')
+        # Загружаем все 7 дней параллельно
+        schedules = fetch_schedules(consecutive_dates(start_date, 7), source=self.client)
+        
+        for date_str, raw_data in schedules.items():
+            date_display = datetime.strptime(date_str, '%Y-%m-%d').strftime('%d.%m.%Y (%A)')
             
             print(f"\n📅 {date_display}")
             print("-" * 40)
             
-            free_courts = self.analyze_ground_courts_from_api(date_str)
+            free_courts = self.analyze_ground_courts_from_api(date_str, raw_data) if raw_data else []
             results[date_str] = {
                 'date_display': date_display,
                 'free_courts': free_courts
@@ -5,14 +5,16 @@
 """
 
 import requests
-import json
 import time
 from datetime import datetime, timedelta
 from urllib.parse import urljoin, urlparse, parse_qs
 import re
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple, Union
 import logging
 
+from schedule_client import create_session, get_schedule_client
+from occupancy import OccupancyGrid
+
 # Настройка логирования
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -32,8 +34,7 @@ class FinalAutoBooking:
             'payment_type': 'club'  # Оплата в клубе
         }
         
-        self.session = requests.Session()
-        self.session.headers.update({
+        self.session = create_session({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
             'Accept': 'application/json, text/plain, */*',
             'Accept-Language': 'ru-RU,ru;q=0.8,en-US;q=0.5,en;q=0.3',
@@ -42,32 +43,16 @@ class FinalAutoBooking:
             'Referer': 'https://x19.spb.ru/bronirovanie/',
             'X-Requested-With': 'XMLHttpRequest'
         })
+        self.client = get_schedule_client()
         
-    def get_initialize_data_raw(self, date: str) -> Optional[str]:
-        """Получение сырых данных инициализации"""
-        url = f"{self.initialize_url}?date={date}"
-        logger.info(f"Загружаем данные инициализации: {url}")
-        
-        try:
-            response = self.session.get(url)
-            response.raise_for_status()
-            
-            if 'window.$INITIAL' in response.text:
-                # Извлекаем JSON из JavaScript
-                json_match = re.search(r'window\.\$INITIAL\s*=\s*({.*?});', response.text, re.DOTALL)
-                if json_match:
-                    return json_match.group(1)
-                    
-        except requests.RequestException as e:
-            logger.error(f"Ошибка загрузки данных инициализации: {e}")
-            
-        return None
+    def get_initialize_data(self, date: str) -> Optional[Dict]:
+        """Получение данных инициализации через общий клиент расписания"""
+        logger.info(f"Загружаем данные инициализации на {date}")
+        return self.client.get_schedule(date, fresh=True)
     
-    def parse_court_data(self, json_str: str) -> Dict:
-        """Парсинг данных кортов из JSON строки"""
+    def parse_court_data(self, data: Dict) -> Dict:
+        """Парсинг данных кортов из данных инициализации"""
         try:
-            data = json.loads(json_str)
-            
             # Извлекаем корты и блокировки
             instructions = data.get('instructions', {})
             set_data = instructions.get('set', {})
@@ -86,74 +71,74 @@ class FinalAutoBooking:
                 'time_blocked': time_blocked
             }
             
-        except json.JSONDecodeError as e:
-            logger.error(f"Ошибка парсинга JSON: {e}")
+        except AttributeError as e:
+            logger.error(f"Ошибка разбора данных инициализации: {e}")
             return {'ground_courts': [], 'time_blocked': []}
     
     def find_available_court(self, date: str, court_type: str = 'ground', 
                            time_from: int = 22, duration_hours: int = 2) -> Optional[Dict]:
         """Поиск доступного корта для бронирования"""
+        courts = self.find_available_courts(date, court_type, time_from, duration_hours)
+        if not courts:
+            return None
+        
+        court = courts[0]
+        logger.info(f"Найден свободный корт №{court['court_number']} (ID: {court['court_id']})")
+        return court
+    
+    def find_available_courts(self, date: str, court_type: str = 'ground', 
+                            time_from: int = 22, duration_hours: int = 2) -> List[Dict]:
+        """Все свободные корты в указанное время (в порядке сайта)"""
         logger.info(f"Поиск доступного корта на {date} в {time_from}:00 ({duration_hours}ч)")
         
-        # Получаем сырые данные
-        json_str = self.get_initialize_data_raw(date)
-        if not json_str:
+        # Получаем данные инициализации
+        init_data = self.get_initialize_data(date)
+        if not init_data:
             logger.error("Не удалось получить данные инициализации")
-            return None
+            return []
         
         # Парсим данные кортов
-        court_data = self.parse_court_data(json_str)
+        court_data = self.parse_court_data(init_data)
         ground_courts = court_data['ground_courts']
         time_blocked = court_data['time_blocked']
         
         if not ground_courts:
             logger.warning("Грунтовые корты не найдены")
-            return None
+            return []
         
         logger.info(f"Найдено {len(ground_courts)} грунтовых кортов")
         logger.info(f"Найдено {len(time_blocked)} занятых слотов")
+        grid = OccupancyGrid(time_blocked)
         
         # Проверяем доступность каждого корта
+        available = []
         for court in ground_courts:
             court_id = court.get('id')
-            court_number = court.get('number')
             
             if not court_id:
                 continue
             
             # Проверяем, свободен ли корт в нужное время
-            if self._is_court_available(court_id, time_from, duration_hours, time_blocked):
-                logger.info(f"Найден свободный корт №{court_number} (ID: {court_id})")
-                return {
+            if self._is_court_available(court_id, time_from, duration_hours, grid):
+                available.append({
                     'court_id': court_id,
-                    'court_number': court_number,
+                    'court_number': court.get('number'),
                     'court_type': 'Грунт',
+                    'inflate_id': court.get('inflate_id'),
                     'time_from': time_from,
                     'time_to': (time_from + duration_hours) % 24,
                     'date': date
-                }
+                })
         
-        logger.warning("Свободных кортов не найдено")
-        return None
+        if not available:
+            logger.warning("Свободных кортов не найдено")
+        return available
     
     def _is_court_available(self, court_id: int, time_from: int, duration_hours: int, 
-                          time_blocked: List[Dict]) -> bool:
+                          grid: OccupancyGrid) -> bool:
         """Проверка доступности корта в указанное время"""
-        # Преобразуем время в секунды от начала дня
-        start_time = time_from * 3600  # 22:00 = 79200 секунд
-        end_time = start_time + (duration_hours * 3600)  # 2 часа = 7200 секунд
-        
-        # Проверяем блокировки для этого корта
-        for blocked in time_blocked:
-            if blocked.get('court_id') == court_id:
-                blocked_start = blocked.get('time_from', {}).get('totalSeconds', 0)
-                blocked_end = blocked.get('time_to', {}).get('totalSeconds', 0)
-                
-                # Проверяем пересечение временных интервалов
-                if not (end_time <= blocked_start or start_time >= blocked_end):
-                    return False
-        
-        return True
+        # Одна проверка маски вместо прохода по всем блокировкам
+        return grid.is_free_at(court_id, time_from, 0, duration_minutes=duration_hours * 60)
     
     def get_csrf_token(self, date: str) -> Optional[str]:
         """Получение CSRF токена"""
@@ -206,8 +191,25 @@ class FinalAutoBooking:
         """Отправка заявки на бронирование"""
         logger.info(f"Отправка заявки на бронирование корта №{court_data['court_number']}")
         
+        url, form_data, headers = self.prepare_submission(court_data, test_mode)
+        return self.send_submission(url, form_data, headers)
+    
+    def prepare_submission(self, court_data: Dict, test_mode: bool = True,
+                           csrf_token: Optional[str] = None) -> Tuple[str, Dict, Dict]:
+        """
+        Готовит запрос бронирования заранее (CSRF токен, форма, заголовки)
+        
+        Args:
+            court_data: Корт из find_available_court
+            test_mode: Тестовый режим оплаты
+            csrf_token: Уже полученный токен (при подготовке нескольких кортов на одну дату)
+        
+        Returns:
+            (url, form_data, headers) для send_submission
+        """
         # Получаем CSRF токен
-        csrf_token = self.get_csrf_token(court_data['date'])
+        if csrf_token is None:
+            csrf_token = self.get_csrf_token(court_data['date'])
         
         # Подготавливаем данные формы
         form_data = self.prepare_booking_form_data(court_data)
@@ -233,6 +235,10 @@ class FinalAutoBooking:
         if test_mode:
             url += "?test_payment=1"
         
+        return url, form_data, headers
+    
+    def send_submission(self, url: str, form_data: Union[Dict, bytes], headers: Dict) -> Tuple[bool, str]:
+        """Отправляет подготовленный запрос бронирования и разбирает ответ (форма или закодированное тело)"""
         logger.info(f"Отправляем POST запрос на {url}")
         
         try:
@@ -59,7 +59,7 @@ def send_corrected_notification():
             message = f"❌ Свободных грунтовых кортов в 22:00-23:00 на {tomorrow_str} не найдено\n\n"
             message += "🔗 Проверить: https://x19.spb.ru/bronirovanie/"
             
-            success = notifier.send_message(message)
+            success = notifier.send_message(message, wait=True)
             if success:
                 print("✅ Уведомление об отсутствии слотов отправлено")
                 return True
@@ -85,7 +85,7 @@ def send_corrected_notification():
         
         message += "\n🔗 <a href='https://x19.spb.ru/bronirovanie/'>Забронировать</a>"
         
-        success = notifier.send_message(message)
+        success = notifier.send_message(message, wait=True)
         
         if success:
             print("✅ Уведомление успешно отправлено в Telegram!")
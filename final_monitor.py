@@ -5,13 +5,16 @@
 Анализирует данные из API и находит свободные слоты
 """
 
-import requests
 import json
-import re
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional, Set, Tuple
 import logging
 
+from schedule_client import get_schedule_client
+from schedule_sync import get_schedule_sync
+from occupancy import is_blocking, window_mask
+from slot_records import CourtInfo, SlotRecord, to_dicts
+
 # Настройка логирования
 logging.basicConfig(
     level=logging.INFO,
@@ -23,15 +26,12 @@ logging.basicConfig(
 )
 
 class FinalTennisMonitor:
-    def __init__(self):
+    def __init__(self, incremental: bool = False):
         self.base_url = "https://x19.spb.ru"
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'application/json, text/javascript, */*; q=0.01',
-            'X-Requested-With': 'XMLHttpRequest',
-            'Referer': 'https://x19.spb.ru/bronirovanie/'
-        })
+        self.client = get_schedule_client()
+        self.session = self.client.session
+        # incremental=True: полный initialize один раз, далее только изменения через polling
+        self.source = get_schedule_sync() if incremental else self.client
         
     def get_api_data(self, date: str) -> Optional[Dict]:
         """
@@ -43,39 +43,10 @@ class FinalTennisMonitor:
         Returns:
             Словарь с данными или None при ошибке
         """
-        try:
-            # Получаем HTML страницу для timestamp
-            page_url = f"{self.base_url}/bronirovanie/?date={date}"
-            page_response = self.session.get(page_url, timeout=10)
-            page_response.raise_for_status()
-            
-            # Извлекаем timestamp
-            timestamp_match = re.search(r'initialize\?date=[^&]+&_=(\d+)', page_response.text)
-            timestamp = timestamp_match.group(1) if timestamp_match else str(int(datetime.now().timestamp()))
-            
-            # Запрашиваем данные API
-            api_url = f"{self.base_url}/bronirovanie/initialize?date={date}&_={timestamp}"
-            logging.info(f"Запрос к API: {api_url}")
-            
-            response = self.session.get(api_url, timeout=10)
-            response.raise_for_status()
-            
-            # Парсим JavaScript код
-            content = response.text
-            initial_match = re.search(r'var initial = ({.*?});', content, re.DOTALL)
-            
-            if initial_match:
-                json_str = initial_match.group(1)
-                data = json.loads(json_str)
-                logging.info(f"Успешно получены данные для даты {date}")
-                return data
-            else:
-                logging.error("Не удалось найти данные initial в ответе API")
-                return None
-                
-        except Exception as e:
-            logging.error(f"Ошибка при получении данных для даты {date}: {e}")
-            return None
+        data = self.source.get_schedule(date)
+        if data:
+            logging.info(f"Успешно получены данные для даты {date}")
+        return data
     
     def extract_time_slots(self, data: Dict) -> List[Dict]:
         """
@@ -146,95 +117,142 @@ class FinalTennisMonitor:
         
         return court_types
     
-    def extract_occupied_slots(self, data: Dict) -> Set[Tuple[int, int]]:
+    def build_time_index(self, time_list: List[Dict]) -> Tuple[Dict[str, int], Dict[str, int]]:
         """
-        Извлекает информацию о занятых слотах
+        Строит словари значение времени -> индекс ячейки time_list
+        
+        Args:
+            time_list: Ячейки time_list из данных API
+            
+        Returns:
+            (начало ячейки -> индекс, конец ячейки -> индекс + 1)
+        """
+        starts = {}
+        ends = {}
+        for i, time_item in enumerate(time_list):
+            starts[time_item.get('time_from', {}).get('value')] = i
+            ends[time_item.get('time_to', {}).get('value')] = i + 1
+        return starts, ends
+    
+    def extract_occupied_ranges(self, data: Dict) -> List[Tuple[int, int, int]]:
+        """
+        Извлекает занятые интервалы в компактном виде
         
         Args:
             data: Данные от API
             
         Returns:
-            Множество кортежей (court_id, time_index) занятых слотов
+            Список кортежей (court_id, start_cell, end_cell), end_cell не включается
         """
-        occupied_slots = set()
+        occupied_ranges = []
         
         try:
-            instructions = data.get('instructions', {})
-            occupied_data = instructions.get('set', {}).get('occupied', [])
+            set_data = data.get('instructions', {}).get('set', {})
+            starts, ends = self.build_time_index(set_data.get('time_list', []))
             
-            for slot in occupied_data:
-                court_id = slot.get('court_id')
-                time_from = slot.get('time_from', {})
+            for slot in set_data.get('time_blocked', []):
+                if not is_blocking(slot):
+                    continue
+                start_cell = starts.get(slot.get('time_from', {}).get('value'))
+                end_cell = ends.get(slot.get('time_to', {}).get('value'))
                 
-                # Находим индекс времени
-                time_list = instructions.get('set', {}).get('time_list', [])
-                time_value = time_from.get('value', '')
+                if start_cell is None or end_cell is None or end_cell <= start_cell:
+                    logging.debug(f"Интервал вне сетки time_list: {slot.get('id')}")
+                    continue
                 
-                for i, time_item in enumerate(time_list):
-                    if time_item.get('time_from', {}).get('value') == time_value:
-                        occupied_slots.add((court_id, i))
-                        break
-            
-            logging.info(f"Найдено {len(occupied_slots)} занятых слотов")
+                occupied_ranges.append((slot.get('court_id'), start_cell, end_cell))
             
         except Exception as e:
-            logging.error(f"Ошибка при извлечении занятых слотов: {e}")
+            logging.error(f"Ошибка при извлечении занятых интервалов: {e}")
+        
+        return occupied_ranges
+    
+    def extract_occupied_slots(self, data: Dict) -> Set[Tuple[int, int]]:
+        """
+        Извлекает информацию о занятых слотах
+        
+        Args:
+            data: Данные от API
+            
+        Returns:
+            Множество кортежей (court_id, time_index) занятых слотов
+        """
+        occupied_slots = set()
+        
+        # Бронь 16:00-17:00 занимает обе 30-минутные ячейки, а не только первую
+        for court_id, start_cell, end_cell in self.extract_occupied_ranges(data):
+            for time_index in range(start_cell, end_cell):
+                occupied_slots.add((court_id, time_index))
+        
+        logging.info(f"Найдено {len(occupied_slots)} занятых слотов")
         
         return occupied_slots
     
-    def find_available_slots(self, date: str) -> List[Dict]:
+    def find_available_records(self, date: str, data: Optional[Dict] = None) -> List[SlotRecord]:
         """
-        Находит все свободные слоты для указанной даты
+        Находит все свободные слоты для указанной даты в компактном виде
         
         Args:
             date: Дата в формате YYYY-MM-DD
+            data: Уже загруженные данные API (если None - загружаются)
             
         Returns:
-            Список свободных слотов
+            Список SlotRecord (данные корта общие для всех его слотов)
         """
-        available_slots = []
+        records = []
         
         try:
             # Получаем данные от API
-            data = self.get_api_data(date)
+            if data is None:
+                data = self.get_api_data(date)
             if not data:
-                return available_slots
+                return records
             
             # Извлекаем компоненты
             time_slots = self.extract_time_slots(data)
             court_types = self.extract_court_types(data)
-            occupied_slots = self.extract_occupied_slots(data)
             
-            # Генерируем все возможные комбинации корт-время
+            # Маска занятых ячеек по корту: часовой слот с индексом i занимает ячейки i и i+1
+            occupied_masks = {}
+            for court_id, start_cell, end_cell in self.extract_occupied_ranges(data):
+                occupied_masks[court_id] = occupied_masks.get(court_id, 0) | window_mask(start_cell, end_cell)
+            
             for court_type_id, court_type_info in court_types.items():
                 for court in court_type_info['courts']:
                     court_id = court.get('id')
-                    court_number = court.get('number', '')
+                    court_info = CourtInfo.intern(court_id, court.get('number', ''),
+                                                  court_type_info['name'], court_type_info['short'])
+                    occupied_mask = occupied_masks.get(court_id, 0)
                     
                     for time_slot in time_slots:
-                        time_index = time_slot['index']
-                        
                         # Проверяем, не занят ли слот
-                        if (court_id, time_index) not in occupied_slots:
-                            available_slots.append({
-                                'date': date,
-                                'court_id': court_id,
-                                'court_number': court_number,
-                                'court_type': court_type_info['name'],
-                                'court_type_short': court_type_info['short'],
-                                'time_from': time_slot['time_from'],
-                                'time_to': time_slot['time_to'],
-                                'time_from_value': time_slot['time_from_value'],
-                                'time_to_value': time_slot['time_to_value'],
-                                'status': 'available'
-                            })
+                        if occupied_mask & window_mask(time_slot['index'], time_slot['index'] + 2):
+                            continue
+                        
+                        records.append(SlotRecord(
+                            date, court_info,
+                            time_slot['time_from'], time_slot['time_to'],
+                            time_slot['time_from_value'], time_slot['time_to_value']
+                        ))
             
-            logging.info(f"Найдено {len(available_slots)} свободных слотов для даты {date}")
+            logging.info(f"Найдено {len(records)} свободных слотов для даты {date}")
             
         except Exception as e:
             logging.error(f"Ошибка при поиске свободных слотов для даты {date}: {e}")
         
-        return available_slots
+        return records
+    
+    def find_available_slots(self, date: str) -> List[Dict]:
+        """
+        Находит все свободные слоты для указанной даты
+        
+        Args:
+            date: Дата в формате YYYY-MM-DD
+            
+        Returns:
+            Список свободных слотов
+        """
+        return to_dicts(self.find_available_records(date))
     
     def get_tomorrow_slots(self) -> List[Dict]:
         """
@@ -298,7 +316,7 @@ class FinalTennisMonitor:
         Сохраняет найденные слоты в файл
         
         Args:
-            slots: Список слотов для сохранения
+            slots: Список слотов для сохранения (словари или SlotRecord)
             filename: Имя файла (по умолчанию auto-generated)
         """
         if not filename:
@@ -307,7 +325,7 @@ class FinalTennisMonitor:
         
         try:
             with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(slots, f, ensure_ascii=False, indent=2)
+                json.dump(to_dicts(slots), f, ensure_ascii=False, indent=2)
             
             logging.info(f"Слоты сохранены в файл: {filename}")
             
@@ -11,6 +11,8 @@ from datetime import datetime, timedelta
 from typing import List, Dict, Optional
 import logging
 
+from snapshot_store import get_snapshot_store
+
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -115,15 +117,11 @@ class HTMLTennisAnalyzer:
         # Извлекаем данные
         extracted_data = self.extract_booking_data_from_html(html_content, date)
         
-        # Сохраняем HTML для анализа
-        with open(f'html_debug_{date}.html', 'w', encoding='utf-8') as f:
-            f.write(html_content)
-        print(f"💾 HTML сохранен в: html_debug_{date}.html")
-        
-        # Сохраняем извлеченные данные
-        with open(f'extracted_data_{date}.json', 'w', encoding='utf-8') as f:
-            json.dump(extracted_data, f, ensure_ascii=False, indent=2)
-        print(f"💾 Данные сохранены в: extracted_data_{date}.json")
+        # Сохраняем HTML и извлеченные данные для анализа (одинаковые HTML хранятся один раз)
+        store = get_snapshot_store()
+        store.put_text(date, 'html', html_content)
+        store.put_json(date, 'extracted', extracted_data)
+        print(f"💾 HTML и данные сохранены в историю снимков: {store.path}")
         
         # Пока что возвращаем пустой список, так как нужно проанализировать структуру данных
         return []
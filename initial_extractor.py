@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Извлечение объекта `var initial = {...};` из ответа initialize
+Литерал находится один раз, затем ровно один JSON объект разбирается с этой позиции
+"""
+
+import json
+import re
+import time
+from typing import Any, Dict, Optional
+import logging
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# Начало присваивания объекта; без DOTALL и без захвата тела - поиск линейный
+INITIAL_START = re.compile(r'(?:var\s+initial|window\.\$INITIAL)\s*=\s*(?=\{)')
+
+_decoder = json.JSONDecoder()
+
+# Сколько вариантов конца объекта (`};`) проверять orjson, прежде чем разобрать json
+ORJSON_ATTEMPTS = 3
+
+
+def find_initial_offset(content: str) -> int:
+    """
+    Находит позицию открывающей скобки объекта initial
+
+    Args:
+        content: Текст ответа initialize
+
+    Returns:
+        Позиция символа '{' или -1, если объект не найден
+    """
+    match = INITIAL_START.search(content)
+    return match.end() if match else -1
+
+
+def decode_object(content: str, offset: int) -> Any:
+    """
+    Разбирает один JSON объект, начинающийся в позиции offset
+
+    С orjson объект вырезается до ближайшего `};` (или до конца текста) и
+    разбирается целиком; если `};` оказался внутри строки, срез невалиден и
+    берется следующий. Валидный срез от `{` до `}` - всегда весь объект.
+    Без orjson (или если конец не найден) - json raw_decode с позиции.
+    """
+    if orjson is not None:
+        end = offset
+        for _ in range(ORJSON_ATTEMPTS):
+            end = content.find('};', end)
+            if end < 0:
+                # Чистый JSON (сохраненный ответ): объект идет до конца текста
+                tail = content[offset:].rstrip()
+                if tail.endswith('}'):
+                    try:
+                        return orjson.loads(tail)
+                    except orjson.JSONDecodeError:
+                        pass
+                break
+            end += 1
+            try:
+                return orjson.loads(content[offset:end])
+            except orjson.JSONDecodeError:
+                continue
+    value, _ = _decoder.raw_decode(content, offset)
+    return value
+
+
+def extract_initial(content: str) -> Optional[Dict]:
+    """
+    Извлекает объект initial из JavaScript ответа initialize
+
+    В отличие от re.search(r'var initial = ({.*?});', ..., re.DOTALL) не
+    останавливается на первом `};` внутри строки и не делает откатов по
+    всему ответу: JSON декодер разбирает ровно один объект с найденной позиции.
+
+    Args:
+        content: Текст ответа
+
+    Returns:
+        Словарь с данными или None
+    """
+    offset = find_initial_offset(content)
+    if offset < 0:
+        return None
+
+    try:
+        data = decode_object(content, offset)
+    except json.JSONDecodeError as e:
+        logger.error(f"Ошибка разбора объекта initial: {e}")
+        return None
+
+    return data if isinstance(data, dict) else None
+
+
+def extract_initial_regex(content: str) -> Optional[Dict]:
+    """Прежний способ извлечения (для сравнения)"""
+    initial_match = re.search(r'var initial = ({.*?});', content, re.DOTALL)
+    return json.loads(initial_match.group(1)) if initial_match else None
+
+
+def benchmark(path: str = 'api_response_2025-09-16.js', repeats: int = 50) -> Dict[str, float]:
+    """
+    Сравнивает скорость извлечения на сохраненном ответе initialize
+
+    Args:
+        path: Файл с ответом initialize
+        repeats: Количество повторов
+
+    Returns:
+        Словарь {'regex_ms', 'extractor_ms'} - среднее время одного извлечения
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        content = f.read()
+
+    if extract_initial(content) != extract_initial_regex(content):
+        logger.warning("Результаты извлечения различаются")
+
+    results = {}
+    for name, func in (('regex_ms', extract_initial_regex), ('extractor_ms', extract_initial)):
+        started = time.perf_counter()
+        for _ in range(repeats):
+            func(content)
+        results[name] = (time.perf_counter() - started) * 1000 / repeats
+
+    return results
+
+
+def main():
+    """Бенчмарк извлечения на сохраненном ответе"""
+    print("🎾 ИЗВЛЕЧЕНИЕ var initial: regex против разбора с позиции")
+    print("=" * 60)
+
+    results = benchmark()
+    print(f"🐢 re.search(DOTALL): {results['regex_ms']:.2f} мс")
+    print(f"🚀 decode_object:     {results['extractor_ms']:.2f} мс")
+    print(f"📊 Ускорение: x{results['regex_ms'] / results['extractor_ms']:.1f}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -16,22 +16,28 @@ sys.path.insert(0, '/root/tennis-monitor')
 from corrected_30min_analyzer import Corrected30MinAnalyzer
 from telegram_notifier import TelegramNotifier, get_telegram_config
 from simple_auto_booking import SimpleAutoBooking
+from availability_query import AvailabilityQuery
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 class IntegratedMonitorBooking:
-    def __init__(self):
+    def __init__(self, live_digest: Optional[bool] = None):
         self.analyzer = Corrected30MinAnalyzer()
         self.booking = SimpleAutoBooking()
+        self.query = AvailabilityQuery(self.analyzer.source)
         
         # Telegram конфигурация
         self.telegram_config = get_telegram_config()
         if self.telegram_config:
+            # Живая сводка: одно закрепленное сообщение на дату вместо нового на каждую проверку
+            if live_digest is None:
+                live_digest = bool(self.telegram_config.get('live_digest', False))
             self.notifier = TelegramNotifier(
                 self.telegram_config['bot_token'], 
-                self.telegram_config['chat_id']
+                self.telegram_config['chat_id'],
+                live_digest=live_digest
             )
         else:
             self.notifier = None
@@ -41,37 +47,34 @@ class IntegratedMonitorBooking:
                         auto_book: bool = False, simulation: bool = True) -> Tuple[bool, str]:
         """Мониторинг и автоматическое бронирование"""
         logger.info(f"🎾 Интегрированный мониторинг и бронирование на {date}")
+        watch = f"monitor:{date}:{time_from}:{duration_hours}"
         
-        # 1. Анализируем доступные корты
-        free_courts = self.analyzer.analyze_ground_courts_22h_corrected(date)
-        
-        if not free_courts:
-            message = f"❌ На {date} нет свободных грунтовых кортов в {time_from}:00"
+        # 1. Загружаем расписание даты
+        data = self.analyzer.get_real_api_data(date)
+        if not data:
+            message = f"❌ Не удалось загрузить расписание на {date}"
             logger.info(message)
-            
-            # Отправляем уведомление об отсутствии кортов
-            if self.notifier:
-                self.notifier.send_message(message)
-            
             return False, message
         
-        # 2. Ищем корт с нужной длительностью
-        target_duration = f"{time_from:02d}:00-{(time_from + duration_hours) % 24:02d}:00"
-        target_court = None
-        
-        for court in free_courts:
-            if court['time_display'] == target_duration:
-                target_court = court
-                break
+        # 2. Ищем корт, свободный ровно с time_from на duration_hours
+        matches = self.query.find([date], surfaces=['grunt'], start_window=(time_from, time_from),
+                                  min_duration=duration_hours * 60, max_duration=duration_hours * 60,
+                                  schedules={date: data})
+        target_court = matches[0] if matches else None
         
         if not target_court:
-            message = f"⚠️ На {date} нет кортов с полным {duration_hours}-часовым слотом в {time_from}:00"
+            # Частичные слоты: грунт, начинающийся в time_from, но короче запрошенного
+            free_courts = self.query.find([date], surfaces=['grunt'], start_window=(time_from, time_from),
+                                          min_duration=30, schedules={date: data})
+            if not free_courts:
+                message = f"❌ На {date} нет свободных грунтовых кортов в {time_from}:00"
+            else:
+                message = f"⚠️ На {date} нет кортов с полным {duration_hours}-часовым слотом в {time_from}:00"
             logger.info(message)
             
-            # Отправляем уведомление о частичных слотах
             if self.notifier:
-                partial_message = self._format_partial_slots_message(date, free_courts)
-                self.notifier.send_message(partial_message)
+                self.notifier.publish(self._format_partial_slots_message(date, free_courts)
+                                      if free_courts else message, watch)
             
             return False, message
         
@@ -80,7 +83,7 @@ class IntegratedMonitorBooking:
         logger.info(f"✅ Найден свободный корт: {target_court['court_number']}")
         
         if self.notifier:
-            self.notifier.send_message(message)
+            self.notifier.publish(message, watch)
         
         # 4. Автоматическое бронирование (если включено)
         if auto_book:
@@ -152,7 +155,8 @@ class IntegratedMonitorBooking:
         for physical_court, courts_info in court_groups.items():
             message += f"🏟️ <b>{physical_court}</b>\n"
             for court_info in courts_info:
-                duration = '2 часа' if court_info['time_display'] == '22:00-00:00' else '1.5 часа' if court_info['time_display'] == '22:30-00:00' else '1 час' if court_info['time_display'] == '23:00-00:00' else '30 мин'
+                minutes = court_info['duration_minutes']
+                duration = f"{minutes // 60} ч {minutes % 60} мин" if minutes % 60 else f"{minutes // 60} ч"
                 message += f"  • Корт №{court_info['court_number']} - {court_info['time_display']} ({duration})\n"
             message += "\n"
         
@@ -190,7 +190,8 @@ class ManualWeeklyAnalyzer:
             print("❌ Конфигурация Telegram не найдена!")
             return False
         
-        notifier = TelegramNotifier(config['bot_token'], config['chat_id'])
+        notifier = TelegramNotifier(config['bot_token'], config['chat_id'],
+                                    live_digest=bool(config.get('live_digest', False)))
         
         # Проверяем соединение
         if not notifier.test_connection():
@@ -232,7 +233,7 @@ class ManualWeeklyAnalyzer:
         message += f"  • Среднее количество кортов в день: {total_free_courts/7:.1f}\n\n"
         message += "🔗 <a href='https://x19.spb.ru/bronirovanie/'>Забронировать</a>"
         
-        success = notifier.send_message(message)
+        success = notifier.publish(message, 'weekly_report', wait=True)
         return success
 
 
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Единый демон мониторинга на asyncio
+Очередь таймеров (heapq) задач по датам и наблюдениям: демон спит ровно до
+ближайшей задачи и выполняет проверки разных дат одновременно
+"""
+
+import asyncio
+import heapq
+import itertools
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+import logging
+
+from async_fetcher import DEFAULT_CONCURRENCY
+from schedule_client import get_schedule_client
+
+logger = logging.getLogger(__name__)
+
+# Интервал: секунды или функция, возвращающая секунды до следующего запуска
+Interval = Union[float, Callable[[], float]]
+
+
+class Job:
+    """Периодическая задача демона"""
+
+    __slots__ = ('name', 'func', 'interval', 'retry_interval', 'due', 'runs', 'errors',
+                 'last_result', 'cancelled', 'running')
+
+    def __init__(self, name: str, func: Callable[[], Any], interval: Interval,
+                 retry_interval: Optional[Interval] = None):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.retry_interval = retry_interval
+        self.due = 0.0
+        self.runs = 0
+        self.errors = 0
+        self.last_result = None
+        self.cancelled = False
+        self.running = False
+
+    def next_delay(self, failed: bool) -> float:
+        interval = self.retry_interval if failed and self.retry_interval is not None else self.interval
+        return float(interval() if callable(interval) else interval)
+
+
+class MonitorDaemon:
+    """
+    Планировщик задач на одной очереди таймеров
+
+    Задачи хранятся в куче по времени запуска (loop.time()); отмена
+    ленивая - отмененная задача выбрасывается при извлечении. Корутины
+    выполняются в цикле событий, блокирующие функции (requests) - в
+    ограниченном пуле, чтобы долгая проверка одной даты не задерживала другие.
+    """
+
+    def __init__(self, concurrency: int = DEFAULT_CONCURRENCY, snapshots=None):
+        self.concurrency = concurrency
+        # SnapshotStore: каждая загрузка адаптивных задач записывается в историю (None - не записывать)
+        self.snapshots = snapshots
+        self.jobs: Dict[str, Job] = {}
+        self._queue: List[Tuple[float, int, Job]] = []
+        self._counter = itertools.count()
+        # Очередь пополняют и другие потоки (add_job, задачи в пуле), а разбирает цикл
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+
+    def add_job(self, name: str, func: Callable[[], Any], interval: Interval,
+                retry_interval: Optional[Interval] = None, delay: float = 0.0) -> Job:
+        """
+        Добавляет (или заменяет) задачу
+
+        Args:
+            name: Уникальное имя (например, 'date:2025-09-22')
+            func: Функция или корутинная функция без аргументов
+            interval: Секунды между запусками или функция, вычисляющая их после каждого запуска
+            retry_interval: Пауза после ошибки (по умолчанию interval)
+            delay: Через сколько секунд первый запуск
+        """
+        job = Job(name, func, interval, retry_interval)
+        with self._lock:
+            previous = self.jobs.get(name)
+            if previous is not None:
+                previous.cancelled = True
+            self.jobs[name] = job
+        self._schedule(job, delay)
+        return job
+
+    def watch_date(self, date: str, check: Callable[[str], Any], interval: Interval,
+                   retry_interval: Optional[Interval] = None, delay: float = 0.0) -> Job:
+        """Задача проверки одной даты"""
+        return self.add_job(f"date:{date}", lambda: check(date), interval, retry_interval, delay)
+
+    def watch_adaptive(self, name: str, date: Union[str, Callable[[], str]], policy,
+                       on_change: Callable[[str, Dict], Any], source=None) -> Job:
+        """
+        Задача опроса даты с адаптивной частотой (PollPolicy)
+
+        Каждый запуск загружает initialize, записывает снимок в историю
+        (если задано хранилище), передает его политике и вызывает
+        on_change(date, data) только если брони изменились; интервал
+        пересчитывается политикой после каждого запуска.
+
+        Args:
+            name: Имя задачи
+            date: Дата или функция, возвращающая дату (например, завтра)
+            policy: PollPolicy
+            on_change: Обработчик изменения с уже загруженными данными (например, AutoTennisMonitor.check_date)
+            source: Источник с методом get_schedule(date) (по умолчанию - сайт напрямую, без кэша)
+        """
+        resolve = date if callable(date) else (lambda: date)
+        if source is None:
+            # Ответ из кэша старше интервала политики: ускорение у открытия бронирования
+            # терялось бы, а повторный снимок занижал бы оценку изменчивости
+            client = get_schedule_client()
+            fetch = lambda day: client.get_schedule(day, fresh=True)
+        else:
+            fetch = source.get_schedule
+
+        def poll():
+            current = resolve()
+            data = fetch(current)
+            if data is None:
+                raise ValueError(f"Не удалось загрузить расписание на {current}")
+            if self.snapshots is not None:
+                self.snapshots.put(current, data)
+            if policy.observe(current, data):
+                on_change(current, data)
+
+        return self.add_job(name, poll, interval=lambda: policy.interval(resolve()),
+                            retry_interval=policy.min_interval)
+
+    def cancel_job(self, name: str):
+        with self._lock:
+            job = self.jobs.pop(name, None)
+        if job is not None:
+            job.cancelled = True
+
+    def _now(self) -> float:
+        return self._loop.time() if self._loop is not None else time.monotonic()
+
+    def _schedule(self, job: Job, delay: float):
+        with self._lock:
+            job.due = self._now() + max(0.0, delay)
+            heapq.heappush(self._queue, (job.due, next(self._counter), job))
+        if self._wakeup is not None:
+            # Новая задача может оказаться раньше той, до которой спит цикл
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def _run_job(self, job: Job, executor: ThreadPoolExecutor, semaphore: asyncio.Semaphore):
+        failed = False
+        async with semaphore:
+            job.running = True
+            try:
+                if asyncio.iscoroutinefunction(job.func):
+                    job.last_result = await job.func()
+                else:
+                    job.last_result = await self._loop.run_in_executor(executor, job.func)
+            except Exception as e:
+                failed = True
+                job.errors += 1
+                logger.error(f"Ошибка в задаче {job.name}: {e}")
+            finally:
+                job.running = False
+                job.runs += 1
+
+        if not job.cancelled and not self._stopping:
+            delay = job.next_delay(failed)
+            self._schedule(job, delay)
+            logger.info(f"Задача {job.name}: следующий запуск через {delay / 60:.1f} мин")
+
+    async def run(self):
+        """Основной цикл: сон до ближайшей задачи, запуск всех созревших"""
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        semaphore = asyncio.Semaphore(self.concurrency)
+        tasks = set()
+
+        # Задачи, добавленные до запуска, отсчитывались по time.monotonic()
+        with self._lock:
+            self._queue = [(self._now() + max(0.0, due - time.monotonic()), order, job)
+                           for due, order, job in self._queue]
+            heapq.heapify(self._queue)
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            while not self._stopping:
+                job = None
+                with self._lock:
+                    while self._queue and self._queue[0][2].cancelled:
+                        heapq.heappop(self._queue)
+                    timeout = self._queue[0][0] - self._now() if self._queue else None
+                    if timeout is not None and timeout <= 0:
+                        _, _, job = heapq.heappop(self._queue)
+
+                if job is None:
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+                task = asyncio.ensure_future(self._run_job(job, executor, semaphore))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stop(self):
+        """Останавливает цикл (можно вызывать из другого потока или задачи)"""
+        self._stopping = True
+        if self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def run_forever(self):
+        """Синхронный запуск до Ctrl+C"""
+        try:
+            asyncio.run(self.run())
+        except KeyboardInterrupt:
+            print("\n🛑 Мониторинг остановлен пользователем")
+            logger.info("Мониторинг остановлен пользователем")
+
+    def status(self) -> List[Dict]:
+        """Состояние задач (имя, секунд до запуска, запусков, ошибок)"""
+        now = self._now()
+        with self._lock:
+            jobs = list(self.jobs.values())
+        return [{'name': job.name, 'due_in': max(0.0, job.due - now), 'runs': job.runs,
+                 'errors': job.errors, 'running': job.running}
+                for job in sorted(jobs, key=lambda job: job.due)]
+
+
+def main():
+    """
+    Один процесс вместо auto_monitor.py и auto_monitor_requests.py
+
+    Использование: python monitor_daemon.py [запросов_в_час] [дата ...]
+    """
+    from auto_monitor import AutoTennisMonitor
+    from auto_monitor_requests import check_requests
+    from booking_sniper import ServerClock
+    from poll_policy import DEFAULT_BUDGET, PollPolicy
+    from snapshot_store import get_snapshot_store
+    from watch_registry import get_watch_registry
+
+    budget = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_BUDGET
+    dates = sys.argv[2:]
+
+    print("🎾 ДЕМОН МОНИТОРИНГА")
+    print("=" * 60)
+    print(f"📅 Запуск: {datetime.now().strftime('%d.%m.%Y %H:%M:%S')}")
+
+    monitor = AutoTennisMonitor()
+    monitor.load_last_slots()
+    # Открытие бронирования и время суток - по часам сервера
+    clock = ServerClock()
+    clock.sync()
+    policy = PollPolicy(budget_per_hour=budget, clock=clock)
+    registry = get_watch_registry()
+    registry.restore()
+    # Даты опрашиваются через polling: монитор и реестр получают события из его дельт
+    sync = monitor.source
+    registry.diff.changes = sync
+
+    def fan_out(date: str, data: Dict):
+        # Одна загрузка даты - и монитор, и все наблюдения реестра
+        if date in dates:
+            monitor.check_date(date, data)
+        registry.on_fetch(date, data)
+
+    daemon = MonitorDaemon(snapshots=get_snapshot_store())
+    monitor.register_jobs(daemon, policy=policy, on_fetch=registry.on_fetch)
+    daemon.add_job('requests', check_requests, interval=2 * 60 * 60, retry_interval=30 * 60)
+    for date in sorted(set(dates) | set(registry.dates())):
+        if date != monitor.tomorrow():
+            daemon.watch_adaptive(f"date:{date}", date, policy, fan_out, source=sync)
+
+    print(f"💰 Бюджет опроса: {budget} запросов в час на все даты")
+    print("⏰ Слоты на завтра и указанные даты: частота по близости, времени суток и изменчивости")
+    print(f"👀 Наблюдений в реестре: {len(registry.watches)} (python watch_registry.py list)")
+    print("📸 Загрузки записываются в историю снимков (python snapshot_store.py)")
+    print("📋 Отложенные запросы: каждые 2 часа (после ошибки - через 30 минут)")
+    print("💡 Для остановки нажмите Ctrl+C")
+
+    try:
+        daemon.run_forever()
+    finally:
+        policy.save()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    main()
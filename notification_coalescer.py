@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Объединение уведомлений и защита от повторов
+События одного наблюдения и даты копятся в окне и уходят одним сообщением;
+уже отправленные ячейки запоминаются на диске и не повторяются до истечения срока
+"""
+
+import atexit
+import os
+from concurrent.futures import Future
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import logging
+
+from schedule_diff import SLOT_FREED, SLOT_TAKEN, ScheduleEvent
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INDEX_FILE = os.environ.get(
+    'TENNIS_NOTIFIED_FILE',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'notified.db')
+)
+
+# Окно объединения: отмена групповой брони освобождает корты за несколько секунд
+DEFAULT_WINDOW = 30.0
+# Сколько помнить отправленное: несколько интервалов опроса ближайших дат.
+# Слот, который занимают и освобождают между соседними опросами, не уведомляет
+# повторно, а настоящее повторное освобождение через час - уведомляет
+DEFAULT_TTL = 15 * 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS notified (
+    key TEXT PRIMARY KEY,
+    notified_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_notified_expires ON notified (expires_at);
+"""
+
+# Отправка пачки: (наблюдение, дата, события). Исключение или False - не отправлено;
+# Future - доставка еще идет, результат None означает, что она не удалась
+Sender = Callable[[str, str, List[ScheduleEvent]], Any]
+
+
+class NotifiedIndex:
+    """Ключи уже отправленных событий со сроком действия (SQLite, общий для процессов)"""
+
+    def __init__(self, path: str = DEFAULT_INDEX_FILE):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connection().executescript(SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    def claim(self, keys: Iterable[str], ttl: float, now: Optional[float] = None) -> List[str]:
+        """
+        Отмечает ключи отправленными
+
+        Returns:
+            Ключи, которых еще не было (или срок которых истек) - только о них и нужно сообщать
+        """
+        now = now or time.time()
+        fresh = []
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            connection.execute("DELETE FROM notified WHERE expires_at <= ?", (now,))
+            for key in keys:
+                cursor = connection.execute(
+                    "INSERT OR IGNORE INTO notified (key, notified_at, expires_at) VALUES (?, ?, ?)",
+                    (key, now, now + ttl))
+                if cursor.rowcount == 1:
+                    fresh.append(key)
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+        return fresh
+
+    def release(self, keys: Iterable[str]):
+        """Снимает отметку с ключей (отправка не удалась - сообщить нужно снова)"""
+        connection = self._connection()
+        connection.executemany("DELETE FROM notified WHERE key = ?", [(key,) for key in keys])
+
+    def count(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM notified").fetchone()[0]
+
+
+def event_key(watch: str, event: ScheduleEvent) -> str:
+    date, court_id, cell = event.key
+    return f"{watch}|{event.kind}|{date}|{court_id}|{cell}"
+
+
+class NotificationCoalescer:
+    """
+    Пачки событий по (наблюдение, дата)
+
+    Первое событие пачки запускает таймер на window секунд; все события,
+    пришедшие до его срабатывания, уходят одним вызовом send. Ячейка,
+    освободившаяся и снова занятая внутри окна, выпадает из пачки. Перед
+    отправкой события сверяются с NotifiedIndex: уже отправленные за
+    последние ttl секунд отбрасываются, поэтому «мигающий» слот не
+    повторяет уведомление, а дата с частыми изменениями дает одно сообщение
+    на окно.
+    """
+
+    def __init__(self, send: Sender, window: float = DEFAULT_WINDOW, ttl: float = DEFAULT_TTL,
+                 index: Optional[NotifiedIndex] = None):
+        self.send = send
+        self.window = window
+        self.ttl = ttl
+        self.index = index if index is not None else NotifiedIndex()
+        self._batches: Dict[Tuple[str, str], Dict[Tuple[str, Tuple], ScheduleEvent]] = {}
+        self._timers: Dict[Tuple[str, str], threading.Timer] = {}
+        self._lock = threading.Lock()
+        self.sent_batches = 0
+        self.suppressed = 0
+        atexit.register(self.flush_all)
+
+    def add(self, watch: str, date: str, events: Iterable[ScheduleEvent]):
+        """Добавляет события в пачку наблюдения и даты (не блокирует)"""
+        batch_key = (watch, date)
+        with self._lock:
+            batch = self._batches.setdefault(batch_key, {})
+            for event in events:
+                opposite = SLOT_TAKEN if event.kind == SLOT_FREED else SLOT_FREED if event.kind == SLOT_TAKEN else None
+                if opposite is not None and batch.pop((opposite, event.key), None) is not None:
+                    # Освободилась и снова занята (или наоборот) внутри окна - сообщать нечего
+                    continue
+                batch[(event.kind, event.key)] = event
+
+            if not batch:
+                del self._batches[batch_key]
+                return
+            if batch_key not in self._timers:
+                timer = threading.Timer(self.window, self.flush, args=batch_key)
+                timer.daemon = True
+                self._timers[batch_key] = timer
+                timer.start()
+
+    def flush(self, watch: str, date: str) -> int:
+        """
+        Отправляет пачку сейчас
+
+        Returns:
+            Количество отправленных событий
+        """
+        with self._lock:
+            timer = self._timers.pop((watch, date), None)
+            batch = self._batches.pop((watch, date), None)
+        if timer is not None:
+            timer.cancel()
+        if not batch:
+            return 0
+
+        events = sorted(batch.values(), key=lambda event: (event.kind, event.key))
+        keys = {event_key(watch, event): event for event in events}
+        fresh = set(self.index.claim(keys, self.ttl))
+        events = [event for key, event in keys.items() if key in fresh]
+        self.suppressed += len(keys) - len(events)
+        if not events:
+            logger.info(f"Пачка {watch} {date}: все {len(keys)} событий уже отправлялись")
+            return 0
+
+        # Ключи заняты до отправки (так два процесса не отправят одно и то же),
+        # поэтому при неудаче их нужно вернуть - иначе слот молчал бы весь ttl
+        try:
+            result = self.send(watch, date, events)
+        except Exception as e:
+            self.index.release(fresh)
+            logger.error(f"Ошибка отправки пачки {watch} {date}: {e}")
+            return 0
+        if result is False:
+            self.index.release(fresh)
+            logger.error(f"Пачка {watch} {date} не отправлена")
+            return 0
+        if isinstance(result, Future):
+            result.add_done_callback(lambda future: self._settle(watch, date, fresh, future))
+        self.sent_batches += 1
+        return len(events)
+
+    def _settle(self, watch: str, date: str, keys: Iterable[str], future: Future):
+        """Возвращает ключи, если фоновая доставка пачки не удалась"""
+        if future.cancelled() or future.exception() is not None or future.result() is None:
+            self.index.release(keys)
+            logger.error(f"Пачка {watch} {date} не доставлена, ее события будут отправлены снова")
+
+    def flush_all(self):
+        """Отправляет все накопленные пачки (при завершении процесса)"""
+        with self._lock:
+            pending = list(self._batches)
+        for watch, date in pending:
+            self.flush(watch, date)
+
+
+def main():
+    """Демонстрация: отмена групповой брони и «мигающий» слот"""
+    import tempfile
+
+    print("🎾 ОБЪЕДИНЕНИЕ УВЕДОМЛЕНИЙ")
+    print("=" * 60)
+
+    sent = []
+    with tempfile.TemporaryDirectory() as directory:
+        coalescer = NotificationCoalescer(lambda watch, date, events: sent.append(len(events)), window=0.2,
+                                          index=NotifiedIndex(os.path.join(directory, 'notified.db')))
+        date = '2025-09-22'
+        # Отмена групповой брони: три корта дутика за несколько опросов
+        for court_id in (4, 5, 6):
+            coalescer.add('demo', date, [ScheduleEvent(SLOT_FREED, date, court_id, cell) for cell in (30, 31)])
+        time.sleep(0.4)
+        # Тот же слот заняли и снова освободили
+        coalescer.add('demo', date, [ScheduleEvent(SLOT_FREED, date, 4, 30)])
+        time.sleep(0.4)
+
+    print(f"📨 Сообщений: {coalescer.sent_batches} (событий в них: {sent})")
+    print(f"🔇 Повторов подавлено: {coalescer.suppressed}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
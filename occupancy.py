@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Сетка занятости кортов на битовых масках
+Один int на корт: бит i = занята 30-минутная ячейка i сетки time_list (07:00-24:00)
+"""
+
+import time
+from typing import Dict, Iterable, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Сетка по умолчанию совпадает с time_list сайта: 34 ячейки по 30 минут с 07:00
+DAY_START_SECONDS = 7 * 3600
+CELL_SECONDS = 30 * 60
+CELL_COUNT = 34
+DAY_END_SECONDS = 24 * 3600
+
+
+def to_seconds(value) -> Optional[int]:
+    """
+    Переводит время из формата API в секунды от начала дня
+
+    Args:
+        value: Словарь time_from/time_to ({'totalSeconds'} или {'hours', 'minutes'}),
+               число секунд или строка 'HH:MM[:SS]'
+
+    Returns:
+        Секунды от начала дня или None
+    """
+    if isinstance(value, dict):
+        if value.get('totalSeconds') is not None:
+            return int(value['totalSeconds'])
+        if value.get('hours') is not None:
+            return int(value['hours']) * 3600 + int(value.get('minutes') or 0) * 60
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str) and ':' in value:
+        parts = value.split(':')
+        return int(parts[0]) * 3600 + int(parts[1]) * 60
+    return None
+
+
+def is_blocking(blocked: Dict) -> bool:
+    """
+    Занимает ли запись time_blocked время
+
+    Как в app.js (delete_sharing || !deleted_at): удаленная бронь освобождает
+    время, если только это не удаленная доля совместной брони.
+    """
+    return bool(blocked.get('delete_sharing')) or not blocked.get('deleted_at')
+
+
+def window_mask(start_cell: int, end_cell: int) -> int:
+    """Маска ячеек [start_cell, end_cell)"""
+    if end_cell <= start_cell:
+        return 0
+    return ((1 << (end_cell - start_cell)) - 1) << start_cell
+
+
+class OccupancyGrid:
+    """
+    Занятость кортов одной даты
+
+    Проверка окна любой длины - одна операция AND вместо прохода по всему
+    time_blocked для каждого корта и каждого слота.
+    """
+
+    def __init__(self, time_blocked: Iterable[Dict], time_list: Optional[List[Dict]] = None):
+        self.day_start = DAY_START_SECONDS
+        self.cell_count = CELL_COUNT
+        if time_list:
+            first = to_seconds(time_list[0].get('time_from', {}))
+            if first is not None:
+                self.day_start = first
+            self.cell_count = len(time_list)
+
+        self.masks: Dict[int, int] = {}
+        for blocked in time_blocked:
+            self.block(blocked)
+
+    @classmethod
+    def from_data(cls, data: Dict) -> 'OccupancyGrid':
+        """Строит сетку из ответа initialize"""
+        set_data = data.get('instructions', {}).get('set', {})
+        return cls(set_data.get('time_blocked', []), set_data.get('time_list'))
+
+    @property
+    def full_mask(self) -> int:
+        return (1 << self.cell_count) - 1
+
+    def cell_at(self, seconds: int) -> int:
+        """Индекс ячейки, содержащей момент seconds"""
+        return (seconds - self.day_start) // CELL_SECONDS
+
+    def cell_index(self, hours: int, minutes: int = 0) -> int:
+        """Индекс ячейки, начинающейся в hours:minutes (00:00 конца дня = cell_count)"""
+        seconds = hours * 3600 + minutes * 60
+        if seconds == 0:
+            seconds = DAY_END_SECONDS
+        return self.cell_at(seconds)
+
+    def cells_for(self, time_from, time_to) -> Optional[range]:
+        """
+        Ячейки, пересекающиеся с интервалом [time_from, time_to)
+
+        Конец 00:00 трактуется как 24:00. Интервал обрезается границами сетки.
+        """
+        start = to_seconds(time_from)
+        end = to_seconds(time_to)
+        if start is None or end is None:
+            return None
+        if end <= start:
+            end = DAY_END_SECONDS
+
+        start_cell = max(0, self.cell_at(start))
+        end_cell = min(self.cell_count, -((self.day_start - end) // CELL_SECONDS))
+        if end_cell <= start_cell:
+            return None
+        return range(start_cell, end_cell)
+
+    def block(self, blocked: Dict):
+        """Отмечает запись time_blocked как занятую (если она занимает время - is_blocking)"""
+        if not is_blocking(blocked):
+            return
+        court_id = blocked.get('court_id')
+        cells = self.cells_for(blocked.get('time_from', {}), blocked.get('time_to', {}))
+        if court_id is None or cells is None:
+            return
+        self.masks[court_id] = self.masks.get(court_id, 0) | window_mask(cells.start, cells.stop)
+
+    def mask(self, court_id: int) -> int:
+        """Маска занятых ячеек корта (0 - корт полностью свободен)"""
+        return self.masks.get(court_id, 0)
+
+    def is_free(self, court_id: int, start_cell: int, end_cell: int) -> bool:
+        """Свободен ли корт во всех ячейках [start_cell, end_cell)"""
+        if start_cell < 0 or end_cell > self.cell_count or end_cell <= start_cell:
+            return False
+        return not self.masks.get(court_id, 0) & window_mask(start_cell, end_cell)
+
+    def is_free_at(self, court_id: int, hours: int, minutes: int = 0, duration_minutes: int = 60) -> bool:
+        """Свободен ли корт с hours:minutes в течение duration_minutes"""
+        start_cell = self.cell_index(hours, minutes)
+        end_cell = start_cell + -(-duration_minutes * 60 // CELL_SECONDS)
+        return self.is_free(court_id, start_cell, end_cell)
+
+    def free_starts(self, court_id: int, cells: int) -> List[int]:
+        """
+        Все ячейки, с которых корт свободен cells ячеек подряд
+
+        Свободные серии длины cells находятся сдвигами маски: free & (free >> 1) & ...
+        """
+        if cells <= 0 or cells > self.cell_count:
+            return []
+        free = ~self.masks.get(court_id, 0) & self.full_mask
+        runs = free
+        for shift in range(1, cells):
+            runs &= free >> shift
+        runs &= window_mask(0, self.cell_count - cells + 1)
+
+        starts = []
+        while runs:
+            low = runs & -runs
+            starts.append(low.bit_length() - 1)
+            runs ^= low
+        return starts
+
+    def free_courts(self, court_ids: Iterable[int], start_cell: int, end_cell: int) -> List[int]:
+        """Корты из court_ids, свободные во всем окне [start_cell, end_cell)"""
+        return [court_id for court_id in court_ids if self.is_free(court_id, start_cell, end_cell)]
+
+    def cell_title(self, cell: int) -> str:
+        """Время начала ячейки в формате HH:MM (конец дня - 00:00)"""
+        seconds = (self.day_start + cell * CELL_SECONDS) % DAY_END_SECONDS
+        return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}"
+
+
+def benchmark(path: str = 'api_response_2025-09-16.js', repeats: int = 200) -> Dict[str, float]:
+    """
+    Сравнивает полный перебор time_blocked и сетку на всех кортах и стартах
+
+    Returns:
+        Словарь {'loops_us', 'grid_build_us', 'grid_scan_us'} - среднее время в мкс
+    """
+    from initial_extractor import extract_initial
+
+    with open(path, 'r', encoding='utf-8') as f:
+        data = extract_initial(f.read())
+
+    set_data = data['instructions']['set']
+    time_blocked = set_data['time_blocked']
+    court_ids = [court['id'] for court_type in set_data['court_types'] for court in court_type['courts']]
+    grid = OccupancyGrid.from_data(data)
+
+    def loops():
+        free = 0
+        for court_id in court_ids:
+            for start_cell in range(CELL_COUNT - 3):
+                start = DAY_START_SECONDS + start_cell * CELL_SECONDS
+                end = start + 4 * CELL_SECONDS
+                for blocked in time_blocked:
+                    if blocked['court_id'] == court_id and not (
+                            end <= blocked['time_from']['totalSeconds'] or
+                            start >= blocked['time_to']['totalSeconds']):
+                        break
+                else:
+                    free += 1
+        return free
+
+    def scan():
+        return sum(len(grid.free_starts(court_id, 4)) for court_id in court_ids)
+
+    if loops() != scan():
+        logger.warning("Результаты перебора и сетки различаются")
+
+    results = {}
+    for name, func in (('loops_us', loops), ('grid_build_us', lambda: OccupancyGrid.from_data(data)),
+                       ('grid_scan_us', scan)):
+        started = time.perf_counter()
+        for _ in range(repeats):
+            func()
+        results[name] = (time.perf_counter() - started) * 1e6 / repeats
+
+    return results
+
+
+def main():
+    """Бенчмарк: все корты x все старты 2-часового окна"""
+    print("🎾 СЕТКА ЗАНЯТОСТИ НА БИТОВЫХ МАСКАХ")
+    print("=" * 60)
+
+    results = benchmark()
+    print(f"🐢 Перебор time_blocked: {results['loops_us']:8.1f} мкс")
+    print(f"🧱 Построение сетки:     {results['grid_build_us']:8.1f} мкс")
+    print(f"🚀 Поиск по маскам:      {results['grid_scan_us']:8.1f} мкс")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Куб занятости: даты x корты x 30-минутные ячейки
+Вопросы по всему горизонту ("в какие вечера месяца свободны два соседних
+грунтовых корта 20:00-22:00") решаются скользящими окнами над всем массивом сразу.
+NumPy необязателен: без него используется та же логика на битовых масках.
+"""
+
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple, Union
+import logging
+
+from occupancy import CELL_COUNT, CELL_SECONDS, DAY_START_SECONDS, OccupancyGrid, is_blocking, to_seconds, window_mask
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+
+class OccupancyCube:
+    """
+    Занятость всех кортов на множестве дат
+
+    Бэкенд 'numpy' хранит булев массив (даты, корты, ячейки); бэкенд 'python' -
+    битовую маску на каждую пару (дата, корт). Ответы обоих бэкендов совпадают.
+    """
+
+    def __init__(self, schedules: Dict[str, Optional[Dict]], backend: Optional[str] = None):
+        """
+        Args:
+            schedules: Словарь дата -> данные initialize (None пропускаются)
+            backend: 'numpy' или 'python' (по умолчанию numpy, если установлен)
+        """
+        if backend is None:
+            backend = 'numpy' if np is not None else 'python'
+        if backend == 'numpy' and np is None:
+            raise ImportError("Для бэкенда 'numpy' нужен пакет numpy")
+        self.backend = backend
+
+        self.dates = sorted(date for date, data in schedules.items() if data)
+        self.courts: List[Dict] = []
+        self.court_index: Dict[int, int] = {}
+        self.grid = OccupancyGrid([])
+
+        for date in self.dates:
+            set_data = schedules[date].get('instructions', {}).get('set', {})
+            if not self.courts:
+                self.grid = OccupancyGrid([], set_data.get('time_list'))
+            for court_type in set_data.get('court_types', []):
+                for court in court_type.get('courts', []):
+                    if court.get('id') in self.court_index:
+                        continue
+                    self.court_index[court.get('id')] = len(self.courts)
+                    self.courts.append({
+                        'court_id': court.get('id'),
+                        'court_number': court.get('number'),
+                        'surface': court_type.get('label'),
+                        'inflate_id': court.get('inflate_id'),
+                    })
+
+        self.cell_count = self.grid.cell_count
+        shape = (len(self.dates), len(self.courts), self.cell_count)
+        if backend == 'numpy':
+            self.occupied = np.zeros(shape, dtype=bool)
+        else:
+            self.masks = [[0] * len(self.courts) for _ in self.dates]
+
+        for date_index, date in enumerate(self.dates):
+            set_data = schedules[date].get('instructions', {}).get('set', {})
+            for blocked in set_data.get('time_blocked', []):
+                if not is_blocking(blocked):
+                    continue
+                court_index = self.court_index.get(blocked.get('court_id'))
+                cells = self.grid.cells_for(blocked.get('time_from', {}), blocked.get('time_to', {}))
+                if court_index is None or cells is None:
+                    continue
+                if backend == 'numpy':
+                    self.occupied[date_index, court_index, cells.start:cells.stop] = True
+                else:
+                    self.masks[date_index][court_index] |= window_mask(cells.start, cells.stop)
+
+    def adjacent_pairs(self, surface: Optional[str] = None) -> List[Tuple[int, int]]:
+        """
+        Пары соседних кортов: один купол (inflate_id) и соседние номера
+
+        Args:
+            surface: label покрытия ('grunt', 'hard', 'grass'), None - любые
+
+        Returns:
+            Список пар индексов кортов в кубе
+        """
+        candidates = [
+            (index, court) for index, court in enumerate(self.courts)
+            if court['inflate_id'] and (surface is None or court['surface'] == surface)
+        ]
+        pairs = []
+        for position, (first_index, first) in enumerate(candidates):
+            for second_index, second in candidates[position + 1:]:
+                if (first['inflate_id'] == second['inflate_id'] and
+                        abs((first['court_number'] or 0) - (second['court_number'] or 0)) == 1):
+                    pairs.append((first_index, second_index))
+        return pairs
+
+    def free_starts(self, cells: int):
+        """
+        Стартовые ячейки, с которых корт свободен cells ячеек подряд
+
+        numpy: массив (даты, корты, cell_count - cells + 1) через скользящую сумму;
+        python: маски стартов [дата][корт] через сдвиги маски свободных ячеек.
+        """
+        if self.backend == 'numpy':
+            busy = np.zeros(self.occupied.shape[:2] + (self.cell_count + 1,), dtype=np.int16)
+            np.cumsum(self.occupied, axis=2, dtype=np.int16, out=busy[:, :, 1:])
+            return (busy[:, :, cells:] - busy[:, :, :-cells]) == 0
+
+        full = window_mask(0, self.cell_count)
+        valid = window_mask(0, self.cell_count - cells + 1)
+        starts = []
+        for row in self.masks:
+            row_starts = []
+            for mask in row:
+                free = ~mask & full
+                runs = free
+                for shift in range(1, cells):
+                    runs &= free >> shift
+                row_starts.append(runs & valid)
+            starts.append(row_starts)
+        return starts
+
+    def find_adjacent(self, start: Union[int, str], duration_minutes: int, surface: Optional[str] = 'grunt',
+                      latest_start: Union[int, str, None] = None) -> Dict[str, List[Dict]]:
+        """
+        Даты, когда свободна хотя бы одна пара соседних кортов
+
+        Args:
+            start: Начало окна (час или 'HH:MM')
+            duration_minutes: Длительность в минутах
+            surface: label покрытия, None - любые
+            latest_start: Самое позднее допустимое начало (по умолчанию = start)
+
+        Returns:
+            Словарь дата -> список {'courts': (№, №), 'time_from': 'HH:MM'} (раннее начало)
+        """
+        cells = -(-duration_minutes * 60 // CELL_SECONDS)
+        first = self._cell(start)
+        last = self._cell(latest_start) if latest_start is not None else first
+        last = min(last, self.cell_count - cells)
+        if cells <= 0 or first < 0 or last < first:
+            return {}
+
+        starts = self.free_starts(cells)
+        results: Dict[str, List[Dict]] = {}
+
+        for first_court, second_court in self.adjacent_pairs(surface):
+            numbers = (self.courts[first_court]['court_number'], self.courts[second_court]['court_number'])
+
+            if self.backend == 'numpy':
+                both = starts[:, first_court, first:last + 1] & starts[:, second_court, first:last + 1]
+                for date_index in np.flatnonzero(both.any(axis=1)):
+                    start_cell = first + int(np.argmax(both[date_index]))
+                    results.setdefault(self.dates[date_index], []).append(
+                        {'courts': numbers, 'time_from': self.grid.cell_title(start_cell)})
+            else:
+                window = window_mask(first, last + 1)
+                for date_index, row in enumerate(starts):
+                    both = row[first_court] & row[second_court] & window
+                    if both:
+                        start_cell = (both & -both).bit_length() - 1
+                        results.setdefault(self.dates[date_index], []).append(
+                            {'courts': numbers, 'time_from': self.grid.cell_title(start_cell)})
+
+        return dict(sorted(results.items()))
+
+    def _cell(self, value: Union[int, str]) -> int:
+        seconds = value * 3600 if isinstance(value, int) else to_seconds(value)
+        return self.grid.cell_at(seconds)
+
+
+def synthetic_horizon(days: int = 90, start_date: str = '2025-09-16', seed: int = 42,
+                      template: Optional[Dict] = None) -> Dict[str, Dict]:
+    """
+    Синтетический горизонт: структура кортов сайта и случайные брони по 1-2 часа
+
+    Args:
+        days: Количество дат
+        start_date: Первая дата
+        seed: Зерно генератора
+        template: Данные initialize, из которых берутся court_types и time_list
+    """
+    rng = random.Random(seed)
+    if template is None:
+        from initial_extractor import extract_initial
+        with open('api_response_2025-09-16.js', 'r', encoding='utf-8') as f:
+            template = extract_initial(f.read())
+
+    set_data = template['instructions']['set']
+    court_ids = [court['id'] for court_type in set_data['court_types'] for court in court_type['courts']]
+    start_dt = datetime.strptime(start_date, '%Y-%m-%d')
+
+    def time_value(seconds: int) -> Dict:
+        return {'hours': seconds // 3600, 'minutes': seconds % 3600 // 60, 'totalSeconds': seconds}
+
+    schedules = {}
+    for day in range(days):
+        time_blocked = []
+        for court_id in court_ids:
+            cell = rng.randrange(0, 4)
+            while cell < CELL_COUNT:
+                length = rng.choice((2, 2, 3, 4))
+                if rng.random() < 0.6 and cell + length <= CELL_COUNT:
+                    begin = DAY_START_SECONDS + cell * CELL_SECONDS
+                    time_blocked.append({
+                        'court_id': court_id,
+                        'time_from': time_value(begin),
+                        'time_to': time_value(begin + length * CELL_SECONDS),
+                    })
+                cell += length
+        date = (start_dt + timedelta(days=day)).strftime('%Y-%m-%d')
+        schedules[date] = {'instructions': {'set': dict(set_data, time_blocked=time_blocked)}}
+
+    return schedules
+
+
+def find_adjacent_loops(schedules: Dict[str, Dict], start_hour: int, duration_minutes: int,
+                        surface: str = 'grunt') -> Dict[str, List[Tuple[int, int]]]:
+    """Тот же вопрос перебором словарей time_blocked (как в анализаторах)"""
+    results = {}
+    begin = start_hour * 3600
+    end = begin + duration_minutes * 60
+
+    for date, data in sorted(schedules.items()):
+        set_data = data['instructions']['set']
+        courts = [court for court_type in set_data['court_types'] if court_type.get('label') == surface
+                  for court in court_type['courts']]
+
+        free = {}
+        for court in courts:
+            free[court['id']] = True
+            for blocked in set_data['time_blocked']:
+                if blocked['court_id'] == court['id'] and is_blocking(blocked) and not (
+                        end <= blocked['time_from']['totalSeconds'] or begin >= blocked['time_to']['totalSeconds']):
+                    free[court['id']] = False
+                    break
+
+        for position, first in enumerate(courts):
+            for second in courts[position + 1:]:
+                if (first['inflate_id'] == second['inflate_id'] and abs(first['number'] - second['number']) == 1
+                        and free[first['id']] and free[second['id']]):
+                    results.setdefault(date, []).append((first['number'], second['number']))
+
+    return results
+
+
+def benchmark(days: int = 90, repeats: int = 5) -> Dict[str, float]:
+    """
+    Сравнивает перебор словарей и куб на синтетических days x 14 кортов
+
+    Returns:
+        Словарь с временем в мс: loops_ms, <backend>_build_ms, <backend>_query_ms
+    """
+    schedules = synthetic_horizon(days)
+    expected = find_adjacent_loops(schedules, 20, 120)
+
+    def timed(func) -> float:
+        started = time.perf_counter()
+        for _ in range(repeats):
+            func()
+        return (time.perf_counter() - started) * 1000 / repeats
+
+    results = {'loops_ms': timed(lambda: find_adjacent_loops(schedules, 20, 120))}
+
+    for backend in ('python', 'numpy'):
+        if backend == 'numpy' and np is None:
+            continue
+        cube = OccupancyCube(schedules, backend)
+        found = {date: [item['courts'] for item in items] for date, items in cube.find_adjacent(20, 120).items()}
+        if found != expected:
+            raise RuntimeError(f"Бэкенд {backend}: результат отличается от перебора")
+
+        results[f'{backend}_build_ms'] = timed(lambda: OccupancyCube(schedules, backend))
+        results[f'{backend}_query_ms'] = timed(lambda: cube.find_adjacent(20, 120))
+
+    return results
+
+
+def main():
+    """Бенчмарк на синтетических 90 днях x 14 кортов"""
+    print("🎾 КУБ ЗАНЯТОСТИ: ДАТЫ x КОРТЫ x ЯЧЕЙКИ")
+    print("=" * 60)
+    print(f"🧮 NumPy: {'установлен' if np is not None else 'не установлен (только бэкенд python)'}")
+
+    for name, value in benchmark().items():
+        print(f"  {name:<20} {value:9.2f} мс")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
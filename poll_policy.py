@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Адаптивная частота опроса дат
+Частота зависит от близости даты, времени суток, момента открытия бронирования
+и наблюдаемой изменчивости time_blocked; общий бюджет запросов в час постоянен.
+Время суток и открытие бронирования считаются по часам сервера (ServerClock)
+"""
+
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+import logging
+
+from booking_sniper import ServerClock
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:
+    ZoneInfo = None
+
+logger = logging.getLogger(__name__)
+
+HISTORY_FILE = 'poll_history.json'
+# История пишется не чаще раза в SAVE_INTERVAL секунд (и при остановке - save())
+SAVE_INTERVAL = 300
+
+# Запросов в час на все отслеживаемые даты
+DEFAULT_BUDGET = 60
+MIN_INTERVAL = 60
+MAX_INTERVAL = 2 * 60 * 60
+
+# Постоянная времени скользящего среднего изменчивости (часы)
+CHURN_TAU_HOURS = 6.0
+# Изменчивость по умолчанию (изменений в час), пока нет истории
+DEFAULT_CHURN = 0.2
+# Нижняя граница изменчивости: статичные даты тоже изредка опрашиваются
+MIN_CHURN = 0.02
+
+# Открытие бронирования новых дат (время сервера)
+# Зона сервера, пока ServerClock ее не сообщил
+SERVER_TZ = 'Europe/Moscow'
+RELEASE_HOUR = 23
+RELEASE_WINDOW_MINUTES = 30
+EVENING_HOURS = range(17, 23)
+
+# Множители важности: (дней вперед не больше, множитель)
+PROXIMITY_FACTORS = ((1, 4.0), (3, 2.0), (7, 1.0))
+FAR_FACTOR = 0.5
+RELEASE_FACTOR = 8.0
+EVENING_FACTOR = 2.0
+
+
+def block_keys(data: Optional[Dict]) -> List[str]:
+    """Брони даты в виде строк 'court_id:from:to' (для сравнения снимков)"""
+    if not data:
+        return []
+    keys = []
+    for blocked in data.get('instructions', {}).get('set', {}).get('time_blocked', []):
+        time_from = blocked.get('time_from', {})
+        time_to = blocked.get('time_to', {})
+        if isinstance(time_from, dict):
+            time_from = time_from.get('totalSeconds')
+        if isinstance(time_to, dict):
+            time_to = time_to.get('totalSeconds')
+        keys.append(f"{blocked.get('court_id')}:{time_from}:{time_to}")
+    return sorted(keys)
+
+
+class PollPolicy:
+    """
+    Интервал опроса каждой даты
+
+    Изменчивость (изменений time_blocked в час) оценивается скользящим
+    средним с учетом времени между наблюдениями - отдельно для даты и
+    для пары (дней вперед, час суток), которая служит оценкой для новых дат.
+    Вес даты = изменчивость x множители (близость, вечер, открытие
+    бронирования); бюджет запросов делится между датами пропорционально весу.
+    История сохраняется в JSON файл раз в save_interval секунд и переживает
+    перезапуск (при остановке вызывается save()).
+    """
+
+    def __init__(self, history_file: Optional[str] = HISTORY_FILE, budget_per_hour: float = DEFAULT_BUDGET,
+                 min_interval: float = MIN_INTERVAL, max_interval: float = MAX_INTERVAL,
+                 clock: Optional[ServerClock] = None, save_interval: float = SAVE_INTERVAL):
+        self.history_file = history_file
+        self.budget_per_hour = budget_per_hour
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.clock = clock or ServerClock()
+        self.save_interval = save_interval
+        self.dates: Dict[str, Dict] = {}
+        self.prior: Dict[str, float] = {}
+        self.watched: Dict[str, float] = {}
+        self._saved_at = time.monotonic()
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        if not self.history_file:
+            return
+        try:
+            with open(self.history_file, 'r', encoding='utf-8') as f:
+                history = json.load(f)
+            self.dates = history.get('dates', {})
+            self.prior = history.get('prior', {})
+        except FileNotFoundError:
+            logger.info("История опроса не найдена, начинаем с нуля")
+        except (OSError, ValueError) as e:
+            logger.warning(f"Поврежденная история опроса: {e}")
+
+    def save(self):
+        """Атомарно сохраняет историю (прошедшие даты удаляются)"""
+        if not self.history_file:
+            return
+        today = self.moment().strftime('%Y-%m-%d')
+        with self._lock:
+            self._saved_at = time.monotonic()
+            self.dates = {date: state for date, state in self.dates.items() if date >= today}
+            history = {'dates': self.dates, 'prior': self.prior}
+            directory = os.path.dirname(os.path.abspath(self.history_file))
+            descriptor, temp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix='.json')
+            try:
+                with os.fdopen(descriptor, 'w', encoding='utf-8') as f:
+                    json.dump(history, f, ensure_ascii=False)
+                os.replace(temp_path, self.history_file)
+            except BaseException:
+                if os.path.exists(temp_path):
+                    os.unlink(temp_path)
+                raise
+
+    def moment(self, now: Optional[float] = None) -> datetime:
+        """Время сервера (без зоны) для unix timestamp (по умолчанию - текущее)"""
+        now = now or self.clock.now()
+        if ZoneInfo is not None:
+            try:
+                return datetime.fromtimestamp(now, ZoneInfo(self.clock.tz or SERVER_TZ)).replace(tzinfo=None)
+            except (KeyError, ValueError):
+                pass
+        return datetime.fromtimestamp(now)
+
+    @staticmethod
+    def _days_ahead(date: str, now: datetime) -> int:
+        try:
+            return (datetime.strptime(date, '%Y-%m-%d').date() - now.date()).days
+        except ValueError:
+            return 0
+
+    def _prior_key(self, date: str, now: datetime) -> str:
+        return f"{min(max(self._days_ahead(date, now), 0), 14)}:{now.hour}"
+
+    @staticmethod
+    def _ewma(previous: Optional[float], sample: float, elapsed_hours: float) -> float:
+        if previous is None:
+            return sample
+        alpha = 1 - math.exp(-elapsed_hours / CHURN_TAU_HOURS)
+        return previous + alpha * (sample - previous)
+
+    def observe(self, date: str, data: Optional[Dict], now: Optional[float] = None) -> bool:
+        """
+        Учитывает новый снимок даты
+
+        Args:
+            date: Дата в формате YYYY-MM-DD
+            data: Данные initialize (None - загрузка не удалась, снимок не учитывается)
+            now: Время наблюдения (unix timestamp)
+
+        Returns:
+            True, если брони изменились (или это первое наблюдение даты)
+        """
+        if data is None:
+            return False
+        now = now or self.clock.now()
+        moment = self.moment(now)
+        keys = block_keys(data)
+
+        with self._lock:
+            state = self.dates.get(date)
+            if state is None:
+                self.dates[date] = {'blocks': keys, 'seen': now, 'changed': now, 'churn': None}
+                changed = True
+            else:
+                changes = len(set(keys) ^ set(state['blocks']))
+                elapsed_hours = max((now - state['seen']) / 3600, 1 / 3600)
+                sample = changes / elapsed_hours
+                state['churn'] = self._ewma(state['churn'], sample, elapsed_hours)
+                prior_key = self._prior_key(date, moment)
+                self.prior[prior_key] = self._ewma(self.prior.get(prior_key), sample, elapsed_hours)
+                state['blocks'] = keys
+                state['seen'] = now
+                changed = changes > 0
+                if changed:
+                    state['changed'] = now
+            due = time.monotonic() - self._saved_at >= self.save_interval
+
+        if due:
+            self.save()
+        return changed
+
+    def churn(self, date: str, now: Optional[float] = None) -> float:
+        """Оценка изменений в час: история даты, иначе история похожих дат, иначе по умолчанию"""
+        moment = self.moment(now)
+        state = self.dates.get(date)
+        if state and state.get('churn') is not None:
+            rate = state['churn']
+        else:
+            rate = self.prior.get(self._prior_key(date, moment), DEFAULT_CHURN)
+        return max(rate, MIN_CHURN)
+
+    def weight(self, date: str, now: Optional[float] = None, newest_days: Optional[int] = None) -> float:
+        """
+        Важность опроса даты
+
+        Args:
+            date: Дата в формате YYYY-MM-DD
+            now: Текущее время (unix timestamp)
+            newest_days: Дней вперед до только что открытой даты (самая дальняя
+                         из отслеживаемых); None - открытой считается любая дата
+        """
+        now = now or self.clock.now()
+        moment = self.moment(now)
+        days_ahead = self._days_ahead(date, moment)
+
+        factor = FAR_FACTOR
+        for max_days, proximity in PROXIMITY_FACTORS:
+            if days_ahead <= max_days:
+                factor = proximity
+                break
+
+        # Сразу после открытия бронирования новую дату разбирают быстрее всего
+        released = newest_days is None or days_ahead >= newest_days
+        if moment.hour == RELEASE_HOUR and moment.minute < RELEASE_WINDOW_MINUTES and released:
+            factor = max(factor, 1.0) * RELEASE_FACTOR
+        # Вечером чаще отменяют игры на сегодня и завтра
+        elif moment.hour in EVENING_HOURS and days_ahead <= 1:
+            factor *= EVENING_FACTOR
+
+        return self.churn(date, now) * factor
+
+    def _allocate(self, dates: List[str], now: float) -> Dict[str, float]:
+        """
+        Делит бюджет между датами пропорционально весу
+
+        Даты, которым досталось реже раза в max_interval, опрашиваются раз в
+        max_interval; их запросы вычитаются из бюджета, остаток делится заново -
+        суммарное число запросов в час остается равным бюджету.
+        """
+        moment = self.moment(now)
+        newest_days = max((self._days_ahead(date, moment) for date in dates), default=None)
+        remaining = {date: self.weight(date, now, newest_days) for date in dates}
+        budget = self.budget_per_hour
+        intervals = {}
+
+        while remaining:
+            total = sum(remaining.values())
+            shares = {date: 3600 * total / (budget * weight) if budget > 0 else float('inf')
+                      for date, weight in remaining.items()}
+            slow = [date for date, value in shares.items() if value >= self.max_interval]
+            if not slow:
+                intervals.update(shares)
+                break
+            for date in slow:
+                intervals[date] = self.max_interval
+                budget -= 3600 / self.max_interval
+                del remaining[date]
+
+        return {date: max(self.min_interval, value) for date, value in intervals.items()}
+
+    def interval(self, date: str, now: Optional[float] = None) -> float:
+        """
+        Секунды до следующего опроса даты
+
+        Дата регистрируется как отслеживаемая; бюджет делится между датами,
+        запрошенными за последние max_interval секунд.
+        """
+        return self.intervals([date], now)[date]
+
+    def intervals(self, dates: Iterable[str], now: Optional[float] = None) -> Dict[str, float]:
+        """Интервалы для набора дат (все регистрируются до расчета)"""
+        now = now or self.clock.now()
+        dates = list(dates)
+        with self._lock:
+            for date in dates:
+                self.watched[date] = now
+            self.watched = {watched: seen for watched, seen in self.watched.items()
+                            if now - seen <= self.max_interval}
+            watched = list(self.watched)
+
+        allocation = self._allocate(watched, now)
+        return {date: allocation[date] for date in dates}
+
+
+def main():
+    """Интервалы опроса ближайших двух недель при текущей истории"""
+    from datetime import timedelta
+
+    print("🎾 АДАПТИВНАЯ ЧАСТОТА ОПРОСА")
+    print("=" * 60)
+
+    policy = PollPolicy()
+    policy.clock.sync()
+    today = policy.moment()
+    dates = [(today + timedelta(days=i)).strftime('%Y-%m-%d') for i in range(14)]
+    intervals = policy.intervals(dates)
+
+    print(f"💰 Бюджет: {policy.budget_per_hour:.0f} запросов в час")
+    for date in dates:
+        print(f"  {date}: каждые {intervals[date] / 60:5.1f} мин "
+              f"(изменений в час: {policy.churn(date):.2f})")
+    total = sum(3600 / value for value in intervals.values())
+    print(f"📊 Итого: {total:.0f} запросов в час")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
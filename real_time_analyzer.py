@@ -4,13 +4,14 @@
 Реальный анализатор свободных кортов на основе time_blocked данных
 """
 
-import requests
-import json
-import re
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import List, Dict, Optional
 import logging
 
+from schedule_client import get_schedule_client
+from async_fetcher import consecutive_dates, fetch_schedules
+from occupancy import OccupancyGrid
+
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -18,51 +19,26 @@ logger = logging.getLogger(__name__)
 class RealTimeTennisAnalyzer:
     def __init__(self):
         self.base_url = "https://x19.spb.ru"
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
+        self.client = get_schedule_client(cached=True)
+        self.session = self.client.session
     
     def get_real_api_data(self, date: str) -> Optional[Dict]:
         """Получает реальные данные от API"""
-        try:
-            # Получаем HTML страницу для timestamp
-            page_url = f"{self.base_url}/bronirovanie/?date={date}"
-            page_response = self.session.get(page_url, timeout=10)
-            page_response.raise_for_status()
-            
-            # Извлекаем timestamp
-            timestamp_match = re.search(r'initialize\?date=[^&]+&_=(\d+)', page_response.text)
-            timestamp = timestamp_match.group(1) if timestamp_match else str(int(datetime.now().timestamp()))
-            
-            # Запрашиваем данные API
-            api_url = f"{self.base_url}/bronirovanie/initialize?date={date}&_={timestamp}"
-            response = self.session.get(api_url, timeout=10)
-            response.raise_for_status()
-            
-            # Парсим JavaScript код
-            content = response.text
-            initial_match = re.search(r'var initial = ({.*?});', content, re.DOTALL)
-            
-            if initial_match:
-                json_str = initial_match.group(1)
-                data = json.loads(json_str)
-                return data
-            
-            return None
-                
-        except Exception as e:
-            logger.error(f"Ошибка при получении данных для даты {date}: {e}")
-            return None
+        return self.client.get_schedule(date)
     
-    def analyze_ground_courts_22h_real(self, date: str) -> List[Dict]:
+    def analyze_ground_courts_22h_real(self, date: str, data: Optional[Dict] = None) -> List[Dict]:
         """
         Реально анализирует свободные грунтовые корты в 22:00-00:00 (2 часа)
+        
+        Args:
+            date: Дата в формате YYYY-MM-DD
+            data: Уже загруженные данные API (если None - загружаются)
         """
         print(f"🔍 Реальный анализ грунтовых кортов в 22:00-00:00 на {date}")
         
         # Получаем данные от API
-        data = self.get_real_api_data(date)
+        if data is None:
+            data = self.get_real_api_data(date)
         if not data:
             print(f"❌ Не удалось получить данные для {date}")
             return []
@@ -92,42 +68,15 @@ class RealTimeTennisAnalyzer:
         print(f"🚫 Найдено {len(time_blocked)} занятых слотов в time_blocked")
         
         # Анализируем свободные 2-часовые слоты в 22:00-00:00
+        grid = OccupancyGrid(time_blocked, set_data.get('time_list'))
         free_courts = []
         
         for court in ground_courts:
             court_id = court['court_id']
             court_number = court['court_number']
             
-            # Проверяем, свободен ли корт в 22:00-23:00 и 23:00-00:00
-            slot_22_23_occupied = False
-            slot_23_24_occupied = False
-            
-            for blocked in time_blocked:
-                if blocked.get('court_id') == court_id:
-                    time_from = blocked.get('time_from', {})
-                    time_to = blocked.get('time_to', {})
-                    
-                    # Получаем часы начала и окончания
-                    from_hours = time_from.get('hours', 0)
-                    to_hours = time_to.get('hours', 0)
-                    
-                    # Проверяем пересечение с нашими слотами
-                    # Слот 22:00-23:00 (hours 22-23)
-                    if (from_hours <= 22 and to_hours > 22) or (from_hours < 23 and to_hours >= 23):
-                        slot_22_23_occupied = True
-                    
-                    # Слот 23:00-00:00 (hours 23-0)
-                    if (from_hours <= 23 and to_hours > 23) or (from_hours < 24 and to_hours >= 24):
-                        slot_23_24_occupied = True
-                    
-                    # Также проверяем точные совпадения
-                    if from_hours == 22:
-                        slot_22_23_occupied = True
-                    if from_hours == 23:
-                        slot_23_24_occupied = True
-            
-            # Если оба слота свободны, то есть 2-часовой слот
-            if not slot_22_23_occupied and not slot_23_24_occupied:
+            # Корт свободен, если не занята ни одна ячейка 22:00-00:00
+            if grid.is_free_at(court_id, 22, 0, duration_minutes=120):
                 free_courts.append({
                     'court_number': court_number,
                     'court_type': 'Грунт',
@@ -152,17 +101,17 @@ class RealTimeTennisAnalyzer:
         print("=" * 70)
         
         results = {}
-        start_dt = datetime.strptime(start_date, '%Y-%m-%d')
         
-        for i in range(7):  # Анализируем 7 дней
-            current_date = start_dt + timedelta(days=i)
-            date_str = current_date.strftime('%Y-%m-%d')
-            date_display = current_date.strftime('%d.%m.%Y (%A)')
+        # Загружаем все 7 дней параллельно
+        schedules = fetch_schedules(consecutive_dates(start_date, 7), source=self.client)
+        
+        for date_str, data in schedules.items():
+            date_display = datetime.strptime(date_str, '%Y-%m-%d').strftime('%d.%m.%Y (%A)')
             
             print(f"\n📅 {date_display}")
             print("-" * 40)
             
-            free_courts = self.analyze_ground_courts_22h_real(date_str)
+            free_courts = self.analyze_ground_courts_22h_real(date_str, data)
             results[date_str] = {
                 'date_display': date_display,
                 'free_courts': free_courts
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Дисковый кэш ответов /bronirovanie/initialize, общий для всех процессов
+Срок жизни зависит от удаленности даты; повторная загрузка учитывает ETag/Last-Modified
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date as date_type, datetime
+from typing import Callable, Dict, Optional, Tuple
+import logging
+
+from requests.structures import CaseInsensitiveDict
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    'TENNIS_CACHE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'initialize')
+)
+
+# Срок жизни по удаленности даты: (дней вперед не больше, секунд)
+TTL_RULES = (
+    (0, 15),     # сегодня и прошедшие даты - слоты освобождаются и занимаются постоянно
+    (1, 30),     # завтра
+    (7, 120),    # ближайшая неделя
+    (14, 600),
+)
+FAR_TTL = 1800
+
+# Загрузчик: (дата, валидаторы кэша) -> (текст или None при 304, заголовки ответа)
+Loader = Callable[[str, Dict[str, str]], Tuple[Optional[str], Dict[str, str]]]
+
+
+def ttl_for(date: str, today: Optional[date_type] = None) -> int:
+    """
+    Срок жизни записи для даты в секундах
+
+    Args:
+        date: Дата в формате YYYY-MM-DD
+        today: Текущая дата (для тестов)
+    """
+    today = today or datetime.now().date()
+    try:
+        days_ahead = (datetime.strptime(date, '%Y-%m-%d').date() - today).days
+    except ValueError:
+        return TTL_RULES[0][1]
+
+    for max_days, ttl in TTL_RULES:
+        if days_ahead <= max_days:
+            return ttl
+    return FAR_TTL
+
+
+class ResponseCache:
+    """
+    Кэш ответов initialize в каталоге на диске
+
+    Запись - JSON файл на дату; запись файла атомарная (временный файл +
+    os.replace), поэтому читатели без блокировки видят либо старую, либо
+    новую версию целиком. Загрузка даты выполняется под эксклюзивной
+    блокировкой файла: если несколько процессов одновременно обнаружили
+    устаревшую запись, запрос к сайту делает только первый, остальные
+    дожидаются блокировки и читают уже свежую запись.
+    """
+
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR, ttl: Callable[[str], int] = ttl_for):
+        self.directory = directory
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self._thread_lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key: str, suffix: str = '.json') -> str:
+        safe_key = ''.join(ch if ch.isalnum() or ch in '-_' else '_' for ch in key)
+        return os.path.join(self.directory, safe_key + suffix)
+
+    def read(self, key: str) -> Optional[Dict]:
+        """Читает запись без блокировки (None, если ее нет или она повреждена)"""
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Поврежденная запись кэша {key}: {e}")
+            return None
+
+    def is_fresh(self, key: str, entry: Optional[Dict]) -> bool:
+        return bool(entry) and time.time() - entry.get('fetched_at', 0) < self.ttl(key)
+
+    def write(self, key: str, content: str, headers: Optional[Dict[str, str]] = None) -> Dict:
+        """Атомарно записывает ответ и его валидаторы"""
+        # Имена заголовков HTTP регистронезависимы: сервер может прислать etag или Etag
+        headers = CaseInsensitiveDict(headers or {})
+        entry = {
+            'key': key,
+            'fetched_at': time.time(),
+            'etag': headers.get('ETag'),
+            'last_modified': headers.get('Last-Modified'),
+            'content': content,
+        }
+
+        descriptor, temp_path = tempfile.mkstemp(dir=self.directory, prefix='.tmp-', suffix='.json')
+        try:
+            with os.fdopen(descriptor, 'w', encoding='utf-8') as f:
+                json.dump(entry, f, ensure_ascii=False)
+            # Кэш можно восстановить с сайта, поэтому fsync не нужен: важна только атомарность
+            os.replace(temp_path, self._path(key))
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+
+        return entry
+
+    @contextmanager
+    def lock(self, key: str):
+        """Эксклюзивная блокировка записи между процессами (fcntl.flock)"""
+        if fcntl is None:
+            with self._thread_lock:
+                yield
+            return
+
+        with open(self._path(key, '.lock'), 'a') as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def fetch(self, key: str, loader: Loader) -> str:
+        """
+        Возвращает ответ из кэша или загружает его
+
+        Args:
+            key: Дата в формате YYYY-MM-DD
+            loader: Функция загрузки; получает ETag/Last-Modified прошлой записи
+                    и возвращает None вместо текста, если сервер ответил 304
+
+        Returns:
+            Текст ответа initialize
+        """
+        entry = self.read(key)
+        if self.is_fresh(key, entry):
+            self.hits += 1
+            return entry['content']
+
+        with self.lock(key):
+            # Пока ждали блокировку, дату мог загрузить другой процесс
+            entry = self.read(key)
+            if self.is_fresh(key, entry):
+                self.hits += 1
+                return entry['content']
+
+            validators = {}
+            if entry:
+                validators = {name: entry[name] for name in ('etag', 'last_modified') if entry.get(name)}
+
+            content, headers = loader(key, validators)
+            headers = CaseInsensitiveDict(headers or {})
+            if content is None:
+                if not entry:
+                    raise ValueError(f"Сервер ответил 304 для {key}, но в кэше нет записи")
+                self.revalidated += 1
+                content = entry['content']
+                headers = {
+                    'ETag': headers.get('ETag') or entry.get('etag'),
+                    'Last-Modified': headers.get('Last-Modified') or entry.get('last_modified'),
+                }
+            else:
+                self.misses += 1
+
+            self.write(key, content, headers)
+            return content
+
+    def invalidate(self, key: str):
+        """Удаляет запись (например, сразу после своего бронирования)"""
+        try:
+            os.unlink(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def stats(self) -> Dict[str, int]:
+        return {'hits': self.hits, 'misses': self.misses, 'revalidated': self.revalidated}
+
+
+_shared_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """Возвращает общий для процесса кэш ответов"""
+    global _shared_cache
+    with _cache_lock:
+        if _shared_cache is None:
+            _shared_cache = ResponseCache()
+        return _shared_cache
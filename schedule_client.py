@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Общий клиент расписания x19.spb.ru
+Единый пул соединений на весь процесс и единый цикл страница -> timestamp -> initialize
+"""
+
+import requests
+from requests.adapters import HTTPAdapter
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+import logging
+
+from initial_extractor import extract_initial
+from schedule_view import LazySchedule
+from response_cache import ResponseCache, get_response_cache
+
+logger = logging.getLogger(__name__)
+
+BASE_URL = "https://x19.spb.ru"
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'application/json, text/javascript, */*; q=0.01',
+    'X-Requested-With': 'XMLHttpRequest',
+    'Referer': 'https://x19.spb.ru/bronirovanie/',
+    'Connection': 'keep-alive'
+}
+
+# Размер пула соединений к x19.spb.ru (на один хост)
+POOL_MAXSIZE = 16
+
+# Маркеры объекта с данными в ответе initialize
+INITIAL_MARKERS = ('var initial', 'window.$INITIAL')
+
+_shared_adapter = None
+_shared_client = None
+_cached_client = None
+_lock = threading.RLock()
+
+
+def get_shared_adapter() -> HTTPAdapter:
+    """
+    Возвращает общий HTTP адаптер процесса
+
+    Все сессии, смонтированные на этот адаптер, используют один пул
+    keep-alive соединений, поэтому TCP/TLS рукопожатие к сайту
+    выполняется один раз, а не в каждом классе.
+    """
+    global _shared_adapter
+    with _lock:
+        if _shared_adapter is None:
+            _shared_adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_MAXSIZE)
+        return _shared_adapter
+
+
+def create_session(headers: Optional[Dict] = None) -> requests.Session:
+    """
+    Создает сессию с собственными заголовками и cookies, но общим пулом соединений
+
+    Args:
+        headers: Дополнительные заголовки (перекрывают DEFAULT_HEADERS)
+
+    Returns:
+        Сессия requests, смонтированная на общий адаптер
+    """
+    session = requests.Session()
+    session.headers.update(DEFAULT_HEADERS)
+    if headers:
+        session.headers.update(headers)
+
+    adapter = get_shared_adapter()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+class ScheduleClient:
+    def __init__(self, session: Optional[requests.Session] = None,
+                 base_url: str = BASE_URL, timeout: int = 10, fast_path: bool = True,
+                 cache: Optional[ResponseCache] = None):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.session = session or create_session()
+        # Быстрый путь: initialize напрямую, без загрузки HTML страницы
+        self.fast_path = fast_path
+        # Дисковый кэш ответов initialize, общий для процессов (None - без кэша)
+        self.cache = cache
+        # Задержки последних запросов по датам (для сравнения путей)
+        self.timings = deque(maxlen=500)
+
+    def get_booking_page(self, date: str) -> str:
+        """
+        Загружает HTML страницу бронирования на дату
+
+        Args:
+            date: Дата в формате YYYY-MM-DD
+
+        Returns:
+            HTML код страницы
+        """
+        page_url = f"{self.base_url}/bronirovanie/?date={date}"
+        response = self.session.get(page_url, timeout=self.timeout)
+        response.raise_for_status()
+        return response.text
+
+    def get_cache_buster(self, date: str) -> str:
+        """Извлекает timestamp `_=` для initialize со страницы бронирования"""
+        page = self.get_booking_page(date)
+        timestamp_match = re.search(r'initialize\?date=[^&]+&_=(\d+)', page)
+        if timestamp_match:
+            return timestamp_match.group(1)
+
+        logger.warning(f"Не удалось найти timestamp на странице для даты {date}")
+        return str(int(datetime.now().timestamp()))
+
+    @staticmethod
+    def make_cache_buster() -> str:
+        """Генерирует `_=` локально, как это делает jQuery при cache: false"""
+        return str(int(time.time()))
+
+    def get_initialize_response(self, date: str, timestamp: str,
+                                headers: Optional[Dict[str, str]] = None) -> requests.Response:
+        """Запрашивает /bronirovanie/initialize для даты с указанным timestamp"""
+        api_url = f"{self.base_url}/bronirovanie/initialize?date={date}&_={timestamp}"
+        logger.info(f"Запрос к API: {api_url}")
+
+        response = self.session.get(api_url, headers=headers, timeout=self.timeout)
+        response.raise_for_status()
+        return response
+
+    def get_initialize_fast(self, date: str) -> Optional[str]:
+        """
+        Запрашивает initialize напрямую с локальным timestamp
+
+        Returns:
+            Текст ответа или None, если сервер отклонил запрос
+        """
+        try:
+            response = self.get_initialize_response(date, self.make_cache_buster())
+        except requests.RequestException as e:
+            logger.info(f"Быстрый путь отклонен для даты {date}: {e}")
+            return None
+
+        if not any(marker in response.text for marker in INITIAL_MARKERS):
+            logger.info(f"Быстрый путь вернул ответ без данных для даты {date}")
+            return None
+
+        return response.text
+
+    def get_initialize_via_page(self, date: str) -> str:
+        """Запрашивает initialize с timestamp, извлеченным со страницы бронирования"""
+        timestamp = self.get_cache_buster(date)
+        return self.get_initialize_response(date, timestamp).text
+
+    def get_initialize_text(self, date: str, fresh: bool = False) -> str:
+        """
+        Возвращает сырой JavaScript ответ initialize для даты
+
+        Сначала пробует быстрый путь (один запрос), к загрузке страницы
+        возвращается только если сервер отклонил прямой запрос.
+
+        Args:
+            date: Дата в формате YYYY-MM-DD
+            fresh: Не брать ответ из кэша (например, непосредственно перед бронированием)
+        """
+        if self.cache is not None and not fresh:
+            return self.cache.fetch(date, self._load_initialize)
+
+        content, _ = self._load_initialize(date, {})
+        return content
+
+    def _load_initialize(self, date: str, validators: Dict[str, str]) -> Tuple[Optional[str], Dict[str, str]]:
+        """
+        Загружает initialize с учетом валидаторов кэша
+
+        Returns:
+            (текст ответа или None, если сервер ответил 304 Not Modified; заголовки ответа)
+        """
+        started = time.perf_counter()
+        path = 'page'
+
+        if self.fast_path:
+            conditional = {}
+            if validators.get('etag'):
+                conditional['If-None-Match'] = validators['etag']
+            if validators.get('last_modified'):
+                conditional['If-Modified-Since'] = validators['last_modified']
+
+            try:
+                response = self.get_initialize_response(date, self.make_cache_buster(), conditional or None)
+                if response.status_code == 304:
+                    self._record_timing(date, 'not_modified', started)
+                    return None, response.headers
+                if any(marker in response.text for marker in INITIAL_MARKERS):
+                    self._record_timing(date, 'fast', started)
+                    return response.text, response.headers
+                logger.info(f"Быстрый путь вернул ответ без данных для даты {date}")
+            except requests.RequestException as e:
+                logger.info(f"Быстрый путь отклонен для даты {date}: {e}")
+            path = 'fallback'
+
+        timestamp = self.get_cache_buster(date)
+        response = self.get_initialize_response(date, timestamp)
+        self._record_timing(date, path, started)
+        return response.text, response.headers
+
+    def _record_timing(self, date: str, path: str, started: float):
+        """Сохраняет задержку получения данных для даты"""
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.timings.append({'date': date, 'path': path, 'elapsed_ms': elapsed_ms})
+        logger.info(f"initialize {date}: путь {path}, {elapsed_ms:.0f} мс")
+
+    def latency_summary(self) -> Dict[str, Dict]:
+        """
+        Сводка задержек по путям получения данных
+
+        Returns:
+            Словарь path -> {'count', 'avg_ms', 'max_ms'}
+        """
+        summary = {}
+        for timing in self.timings:
+            stats = summary.setdefault(timing['path'], {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+            stats['count'] += 1
+            stats['total_ms'] += timing['elapsed_ms']
+            stats['max_ms'] = max(stats['max_ms'], timing['elapsed_ms'])
+
+        for stats in summary.values():
+            stats['avg_ms'] = stats.pop('total_ms') / stats['count']
+
+        return summary
+
+    def get_polling(self, date: str, timestamp: int, booking_type: int = 0) -> Optional[Dict]:
+        """
+        Запрашивает изменения расписания с момента timestamp (/bronirovanie/polling)
+
+        Args:
+            date: Дата в формате YYYY-MM-DD
+            timestamp: polling.timestamp из предыдущего ответа
+            booking_type: Тип бронирования (как type в app.js)
+
+        Returns:
+            Ответ с инструкциями add/update/delete/set или None при ошибке
+        """
+        try:
+            response = self.session.get(
+                f"{self.base_url}/bronirovanie/polling",
+                params={'date': date, 'type': booking_type, 'timestamp': timestamp,
+                        '_': self.make_cache_buster()},
+                timeout=self.timeout
+            )
+            response.raise_for_status()
+            return response.json()
+
+        except (requests.RequestException, ValueError) as e:
+            logger.warning(f"Ошибка polling для даты {date}: {e}")
+            return None
+
+    def get_schedule(self, date: str, lazy: bool = False, fresh: bool = False) -> Optional[Dict]:
+        """
+        Получает данные расписания (объект initial) для указанной даты
+
+        Args:
+            date: Дата в формате YYYY-MM-DD
+            lazy: Вернуть LazySchedule - разделы set разбираются при первом обращении
+                  (меньше пик памяти; по CPU полный разбор orjson быстрее)
+            fresh: Не брать ответ из кэша
+
+        Returns:
+            Словарь с данными или None при ошибке
+        """
+        try:
+            content = self.get_initialize_text(date, fresh)
+            data = LazySchedule.from_response(content) if lazy else extract_initial(content)
+            if data is None:
+                logger.error(f"Не удалось найти данные initial в ответе API для даты {date}")
+            return data
+
+        except Exception as e:
+            logger.error(f"Ошибка при получении данных для даты {date}: {e}")
+            return None
+
+    def warm_up(self) -> bool:
+        """
+        Открывает keep-alive соединение к сайту заранее
+
+        Returns:
+            True если соединение установлено
+        """
+        try:
+            response = self.session.get(f"{self.base_url}/bronirovanie/time_now/", timeout=self.timeout)
+            response.raise_for_status()
+            return True
+        except requests.RequestException as e:
+            logger.warning(f"Не удалось прогреть соединение: {e}")
+            return False
+
+
+def get_schedule_client(cached: bool = False) -> ScheduleClient:
+    """
+    Возвращает общий для процесса клиент расписания
+
+    Args:
+        cached: Клиент с общим дисковым кэшем ответов - только для отчетов и
+                анализа, где данные возрастом до нескольких минут допустимы.
+                Бронирование и мониторинг используют клиент без кэша.
+    """
+    global _shared_client, _cached_client
+    with _lock:
+        if _shared_client is None:
+            _shared_client = ScheduleClient()
+        if not cached:
+            return _shared_client
+        if _cached_client is None:
+            # Та же сессия (cookies и пул соединений), но ответы идут через кэш
+            _cached_client = ScheduleClient(session=_shared_client.session, cache=get_response_cache())
+        return _cached_client
+
+
+def compare_fetch_paths(dates: List[str], client: Optional[ScheduleClient] = None) -> List[Dict]:
+    """
+    Измеряет задержку обоих путей получения данных для каждой даты
+
+    Args:
+        dates: Список дат в формате YYYY-MM-DD
+        client: Клиент (по умолчанию общий)
+
+    Returns:
+        Список {'date', 'fast_ms', 'page_ms'} (None если путь не сработал)
+    """
+    client = client or get_schedule_client()
+    results = []
+
+    for date in dates:
+        row = {'date': date, 'fast_ms': None, 'page_ms': None}
+
+        started = time.perf_counter()
+        if client.get_initialize_fast(date) is not None:
+            row['fast_ms'] = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        try:
+            client.get_initialize_via_page(date)
+            row['page_ms'] = (time.perf_counter() - started) * 1000
+        except requests.RequestException as e:
+            logger.error(f"Ошибка загрузки через страницу для даты {date}: {e}")
+
+        results.append(row)
+
+    return results
+
+
+def main():
+    """Сравнение задержки быстрого пути и пути через HTML страницу"""
+    print("🎾 СРАВНЕНИЕ ПУТЕЙ ПОЛУЧЕНИЯ РАСПИСАНИЯ")
+    print("=" * 60)
+
+    today = datetime.now()
+    dates = [(today + timedelta(days=i)).strftime('%Y-%m-%d') for i in range(7)]
+
+    client = get_schedule_client()
+    client.warm_up()
+    results = compare_fetch_paths(dates, client)
+
+    def fmt(value):
+        return f"{value:8.0f} мс" if value is not None else "     ошибка"
+
+    print(f"{'Дата':<12} {'initialize':>11} {'страница+initialize':>20}")
+    print("-" * 60)
+    for row in results:
+        print(f"{row['date']:<12} {fmt(row['fast_ms']):>11} {fmt(row['page_ms']):>20}")
+
+    fast = [row['fast_ms'] for row in results if row['fast_ms'] is not None]
+    page = [row['page_ms'] for row in results if row['page_ms'] is not None]
+    if fast and page:
+        print("-" * 60)
+        print(f"📊 Среднее: {sum(fast) / len(fast):.0f} мс против {sum(page) / len(page):.0f} мс")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Структурное сравнение расписаний
+Типизированные события (освободилась/занята ячейка, бронь перенесена/удалена)
+по ключу (дата, корт, ячейка) вместо сравнения строк времени свободных слотов
+"""
+
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+import logging
+
+from occupancy import OccupancyGrid, is_blocking, to_seconds
+
+logger = logging.getLogger(__name__)
+
+SLOT_FREED = 'slot_freed'
+SLOT_TAKEN = 'slot_taken'
+BOOKING_MOVED = 'booking_moved'
+BOOKING_DELETED = 'booking_deleted'
+
+# Бронь: (court_id, первая ячейка, ячейка после последней, moved_at)
+Placement = Tuple[int, int, int, Optional[str]]
+
+
+class ScheduleEvent:
+    """
+    Изменение расписания
+
+    Для slot_freed/slot_taken - одна ячейка корта; для booking_moved и
+    booking_deleted - бронь целиком: cell..end_cell на court_id (для переноса -
+    новое место, прежнее в previous), at - moved_at/deleted_at с сайта.
+    """
+
+    __slots__ = ('kind', 'date', 'court_id', 'cell', 'end_cell', 'booking_id', 'at', 'previous')
+
+    def __init__(self, kind: str, date: str, court_id: int, cell: int, end_cell: Optional[int] = None,
+                 booking_id=None, at: Optional[str] = None, previous: Optional[Tuple[int, int, int]] = None):
+        self.kind = kind
+        self.date = date
+        self.court_id = court_id
+        self.cell = cell
+        self.end_cell = cell + 1 if end_cell is None else end_cell
+        self.booking_id = booking_id
+        self.at = at
+        self.previous = previous
+
+    @property
+    def key(self) -> Tuple[str, int, int]:
+        return self.date, self.court_id, self.cell
+
+    def to_dict(self) -> Dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self) -> str:
+        return f"ScheduleEvent({self.kind}, {self.date}, court={self.court_id}, cells={self.cell}-{self.end_cell})"
+
+
+class DateState:
+    """Брони одной даты и занятость ячеек (счетчики пересекающихся броней)"""
+
+    def __init__(self, date: str, data: Dict):
+        set_data = data.get('instructions', {}).get('set', {})
+        self.date = date
+        # Только геометрия сетки (начало дня, число ячеек); маски ведутся здесь
+        self.grid = OccupancyGrid((), set_data.get('time_list'))
+        self.courts: Dict[int, Dict] = {}
+        for court_type in set_data.get('court_types', []):
+            for court in court_type.get('courts', []):
+                self.courts[court.get('id')] = {'number': court.get('number'), 'type': court_type.get('name')}
+        self.bookings: Dict[object, Tuple[Tuple, Optional[Placement]]] = {}
+        self.counts: Dict[Tuple[int, int], int] = {}
+        # polling.timestamp снимка, с которым согласовано состояние
+        self.timestamp = polling_timestamp(data)
+
+    def placement(self, blocked: Dict) -> Optional[Placement]:
+        """Место брони в сетке (None - удалена или вне сетки)"""
+        if not is_blocking(blocked):
+            return None
+        court_id = blocked.get('court_id')
+        cells = self.grid.cells_for(blocked.get('time_from', {}), blocked.get('time_to', {}))
+        if court_id is None or cells is None:
+            return None
+        return court_id, cells.start, cells.stop, blocked.get('moved_at')
+
+    def occupied(self, court_id: int, cell: int) -> bool:
+        return self.counts.get((court_id, cell), 0) > 0
+
+    def court_title(self, court_id: int) -> str:
+        court = self.courts.get(court_id)
+        if court is None:
+            return f"Корт id {court_id}"
+        return f"{court['type']} (Корт №{court['number']})"
+
+
+def polling_timestamp(data) -> Optional[int]:
+    polling = data.get('polling')
+    return polling.get('timestamp') if polling else None
+
+
+def booking_key(blocked: Dict):
+    """ID брони; у записей без id - корт и интервал"""
+    booking_id = blocked.get('id')
+    if booking_id is not None:
+        return booking_id
+    return (blocked.get('court_id'), to_seconds(blocked.get('time_from', {})),
+            to_seconds(blocked.get('time_to', {})))
+
+
+def fingerprint(blocked: Dict) -> Tuple:
+    """Поля, изменение которых означает изменение брони"""
+    return (blocked.get('updated_at'), blocked.get('deleted_at'), blocked.get('delete_sharing'),
+            blocked.get('moved_at'), blocked.get('court_id'), to_seconds(blocked.get('time_from', {})),
+            to_seconds(blocked.get('time_to', {})))
+
+
+class ScheduleDiff:
+    """
+    Сравнение последовательных снимков дат
+
+    Первый снимок даты становится базой (событий нет). Дальше update()
+    берет у источника изменений (changes, например IncrementalScheduleSync)
+    дельту polling между timestamp базы и снимка и передает ее в apply() -
+    это O(изменений). Если источника нет или его журнал не покрывает интервал
+    (первая загрузка, refresh, база из истории снимков), работает diff():
+    сравнивает отпечатки всех броней снимка (updated_at, deleted_at,
+    delete_sharing, moved_at, корт, время) - O(броней) - и пересчитывает
+    ячейки лишь для изменившихся.
+    Ячейка, которую в одном снимке освободила одна бронь и заняла другая,
+    событий не дает.
+    """
+
+    def __init__(self, changes=None):
+        """
+        Args:
+            changes: Источник дельт с методом changes(date, since) -> (timestamp, записи, id удаленных)
+        """
+        self.changes = changes
+        self.states: Dict[str, DateState] = {}
+        self._lock = threading.Lock()
+
+    def has_baseline(self, date: str) -> bool:
+        return date in self.states
+
+    def baseline(self, date: str, data: Dict) -> DateState:
+        """Запоминает снимок как базу без событий"""
+        state = DateState(date, data)
+        with self._lock:
+            self.states[date] = state
+            self._apply(state, {booking_key(blocked): blocked for blocked in self._blocks(data)}, ())
+        return state
+
+    @staticmethod
+    def _blocks(data: Dict) -> List[Dict]:
+        return data.get('instructions', {}).get('set', {}).get('time_blocked', []) or []
+
+    def diff(self, date: str, data: Dict) -> List[ScheduleEvent]:
+        """
+        События между предыдущим и новым снимком даты (новый становится базой)
+
+        Args:
+            date: Дата в формате YYYY-MM-DD
+            data: Данные initialize
+
+        Returns:
+            События; пустой список для первого снимка даты
+        """
+        state = self.states.get(date)
+        if state is None:
+            self.baseline(date, data)
+            return []
+
+        with self._lock:
+            upserts, seen = {}, set()
+            for blocked in self._blocks(data):
+                key = booking_key(blocked)
+                seen.add(key)
+                known = state.bookings.get(key)
+                if known is None or known[0] != fingerprint(blocked):
+                    upserts[key] = blocked
+            removed = [key for key in state.bookings if key not in seen]
+            state.timestamp = polling_timestamp(data)
+            return self._apply(state, upserts, removed)
+
+    def update(self, date: str, data: Dict) -> List[ScheduleEvent]:
+        """
+        События нового снимка даты: дельта источника через apply(), иначе diff()
+
+        Args:
+            date: Дата в формате YYYY-MM-DD
+            data: Данные initialize (polling.timestamp определяет дельту)
+        """
+        state = self.states.get(date)
+        timestamp = polling_timestamp(data)
+        if state is not None and self.changes is not None and state.timestamp and timestamp:
+            delta = self.changes.changes(date, state.timestamp)
+            if delta is not None and delta[0] == timestamp:
+                _, upserts, removed = delta
+                with self._lock:
+                    events = self._apply(state, {booking_key(blocked): blocked for blocked in upserts}, removed)
+                    state.timestamp = timestamp
+                return events
+            logger.info(f"Дельта {date} недоступна, полное сравнение снимка")
+        return self.diff(date, data)
+
+    def apply(self, date: str, upserts: Iterable[Dict], removed: Iterable = ()) -> List[ScheduleEvent]:
+        """
+        Применяет изменения напрямую (например, инструкции polling): O(изменений)
+
+        Args:
+            date: Дата с уже построенной базой
+            upserts: Добавленные и измененные записи time_blocked
+            removed: ID удаленных броней
+        """
+        state = self.states[date]
+        with self._lock:
+            return self._apply(state, {booking_key(blocked): blocked for blocked in upserts}, list(removed))
+
+    def _apply(self, state: DateState, upserts: Dict, removed: Iterable) -> List[ScheduleEvent]:
+        events: List[ScheduleEvent] = []
+        # Занятость затронутых ячеек до изменений
+        before: Dict[Tuple[int, int], bool] = {}
+
+        def touch(placement: Placement, delta: int):
+            court_id, start, stop, _ = placement
+            for cell in range(start, stop):
+                key = (court_id, cell)
+                count = state.counts.get(key, 0)
+                before.setdefault(key, count > 0)
+                if count + delta > 0:
+                    state.counts[key] = count + delta
+                else:
+                    state.counts.pop(key, None)
+
+        for key in removed:
+            known = state.bookings.pop(key, None)
+            if known is not None and known[1] is not None:
+                touch(known[1], -1)
+                court_id, start, stop, _ = known[1]
+                events.append(ScheduleEvent(BOOKING_DELETED, state.date, court_id, start, stop, key))
+
+        for key, blocked in upserts.items():
+            known = state.bookings.get(key)
+            old = known[1] if known is not None else None
+            new = state.placement(blocked)
+            state.bookings[key] = (fingerprint(blocked), new)
+            if old == new:
+                continue
+            if old is not None:
+                touch(old, -1)
+            if new is not None:
+                touch(new, +1)
+            if old is not None and new is None:
+                events.append(ScheduleEvent(BOOKING_DELETED, state.date, old[0], old[1], old[2], key,
+                                            at=blocked.get('deleted_at')))
+            elif old is not None and old[:3] != new[:3]:
+                events.append(ScheduleEvent(BOOKING_MOVED, state.date, new[0], new[1], new[2], key,
+                                            at=new[3], previous=old[:3]))
+
+        masks = state.grid.masks
+        for (court_id, cell), was_occupied in sorted(before.items()):
+            occupied = state.occupied(court_id, cell)
+            if occupied == was_occupied:
+                continue
+            if occupied:
+                masks[court_id] = masks.get(court_id, 0) | (1 << cell)
+            else:
+                masks[court_id] = masks.get(court_id, 0) & ~(1 << cell)
+            events.append(ScheduleEvent(SLOT_TAKEN if occupied else SLOT_FREED, state.date, court_id, cell))
+        return events
+
+    def state(self, date: str) -> Optional[DateState]:
+        """
+        Состояние даты для другого потока (например, таймера уведомлений)
+
+        Геометрия сетки и список кортов после создания состояния не меняются,
+        поэтому названия кортов и ячеек можно брать из него без блокировки.
+        """
+        with self._lock:
+            return self.states.get(date)
+
+    def grid(self, date: str) -> Optional[OccupancyGrid]:
+        """Сетка занятости даты, согласованная с последним снимком"""
+        state = self.states.get(date)
+        return state.grid if state is not None else None
+
+    def forget(self, date: str):
+        with self._lock:
+            self.states.pop(date, None)
+
+    def restore(self, store, dates: Optional[Iterable[str]] = None) -> int:
+        """
+        Восстанавливает базы из истории снимков (SnapshotStore) после перезапуска
+
+        Args:
+            store: SnapshotStore
+            dates: Даты (по умолчанию - все сегодняшние и будущие даты истории)
+
+        Returns:
+            Количество восстановленных дат
+        """
+        if dates is None:
+            today = datetime.now().strftime('%Y-%m-%d')
+            dates = [date for date in store.dates() if date >= today]
+        restored = 0
+        for date in dates:
+            data = store.get(date)
+            if isinstance(data, dict):
+                self.baseline(date, data)
+                restored += 1
+        return restored
+
+
+def cell_runs(events: Iterable[ScheduleEvent], kind: str = SLOT_FREED) -> List[Tuple[str, int, int, int]]:
+    """
+    Склеивает события ячеек в интервалы
+
+    Returns:
+        [(дата, court_id, первая ячейка, ячейка после последней)]
+    """
+    cells = sorted(event.key for event in events if event.kind == kind)
+    runs = []
+    for date, court_id, cell in cells:
+        if runs and runs[-1][:2] == (date, court_id) and runs[-1][3] == cell:
+            runs[-1] = (date, court_id, runs[-1][2], cell + 1)
+        else:
+            runs.append((date, court_id, cell, cell + 1))
+    return runs
+
+
+def main():
+    """
+    Изменения между двумя последними снимками даты из истории
+
+    Использование: python schedule_diff.py ДАТА
+    """
+    import sys
+    from snapshot_store import get_snapshot_store
+
+    print("🎾 ИЗМЕНЕНИЯ РАСПИСАНИЯ")
+    print("=" * 60)
+
+    if len(sys.argv) < 2:
+        print("Использование: python schedule_diff.py YYYY-MM-DD")
+        return
+
+    date = sys.argv[1]
+    diff = ScheduleDiff()
+    for fetched_at, data in get_snapshot_store().history(date):
+        moment = datetime.fromtimestamp(fetched_at).strftime('%d.%m %H:%M:%S')
+        events = diff.diff(date, data)
+        if not events:
+            continue
+        state = diff.states[date]
+        print(f"\n📸 {moment}")
+        for event in events:
+            if event.kind in (BOOKING_MOVED, BOOKING_DELETED):
+                print(f"  {event.kind}: {state.court_title(event.court_id)} "
+                      f"{state.grid.cell_title(event.cell)}-{state.grid.cell_title(event.end_cell)}")
+        for kind, icon in ((SLOT_FREED, '🟢'), (SLOT_TAKEN, '🔴')):
+            for _, court_id, start, stop in cell_runs(events, kind):
+                print(f"  {icon} {state.court_title(court_id)} "
+                      f"{state.grid.cell_title(start)}-{state.grid.cell_title(stop)}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Инкрементальная синхронизация расписания через /bronirovanie/polling
+Полный initialize загружается один раз на дату, дальше применяются только изменения
+"""
+
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+import logging
+
+from schedule_client import ScheduleClient, get_schedule_client
+
+logger = logging.getLogger(__name__)
+
+# Сколько последних ответов polling помнить для потребителей дельт (ScheduleDiff.update)
+CHANGE_LOG_SIZE = 256
+
+# Изменения time_blocked: (timestamp после, добавленные и измененные записи, id удаленных)
+Changes = Tuple[int, List[Dict], List]
+
+
+class DateSchedule:
+    """Расписание одной даты в памяти"""
+
+    def __init__(self, date: str, data: Dict):
+        self.date = date
+        self.set_data = {}
+        self.blocked = {}
+        self.timestamp = 0
+        self._blocked_list = None
+        # Журнал ответов polling: (timestamp до, timestamp после, {id: запись}, {id удаленных})
+        self.log = deque(maxlen=CHANGE_LOG_SIZE)
+        self.load(data)
+
+    def load(self, data: Dict):
+        """Загружает полный ответ initialize (журнал изменений начинается заново)"""
+        set_data = data.get('instructions', {}).get('set', {})
+        self.set_data = {key: value for key, value in set_data.items() if key != 'time_blocked'}
+        self.blocked = {entry.get('id'): entry for entry in set_data.get('time_blocked', [])}
+        self._blocked_list = None
+        self.log.clear()
+        self._update_timestamp(data)
+
+    def _update_timestamp(self, response: Dict):
+        timestamp = response.get('polling', {}).get('timestamp')
+        if timestamp:
+            self.timestamp = timestamp
+
+    def apply(self, response: Dict) -> int:
+        """
+        Применяет ответ polling к расписанию
+
+        Args:
+            response: Ответ /bronirovanie/polling
+
+        Returns:
+            Количество измененных записей time_blocked
+        """
+        changed = 0
+        before = self.timestamp
+        upserts, removed = {}, set()
+        replaced = False
+
+        for name, data in response.get('instructions', {}).items():
+            if name == 'set':
+                for key, value in data.items():
+                    if key == 'time_blocked':
+                        self.blocked = {entry.get('id'): entry for entry in value}
+                        changed += len(value)
+                        replaced = True
+                    else:
+                        self.set_data[key] = value
+                continue
+
+            if name not in ('add', 'update', 'delete', 'remove'):
+                continue
+
+            for key, items in data.items():
+                items = items if isinstance(items, list) else [items]
+                if key == 'time_blocked':
+                    changed += self._apply_blocked(name, items, upserts, removed)
+                else:
+                    self._apply_list(name, key, items)
+
+        if changed:
+            self._blocked_list = None
+
+        self._update_timestamp(response)
+        if replaced:
+            # Список заменен целиком - дельты нет, потребители пересинхронизируются
+            self.log.clear()
+        else:
+            self._log_changes(before, upserts, removed)
+        return changed
+
+    def _apply_blocked(self, name: str, items: List[Dict], upserts: Dict, removed: set) -> int:
+        """Применяет add/update/delete к time_blocked по id (изменения - в upserts и removed)"""
+        changed = 0
+        for element in items:
+            blocked_id = element.get('id')
+            if name == 'add':
+                self.blocked[blocked_id] = element
+            elif name == 'update':
+                if blocked_id not in self.blocked:
+                    continue
+                self.blocked[blocked_id] = element
+            else:
+                if blocked_id is None:
+                    blocked_id = next((existing_id for existing_id, entry in self.blocked.items()
+                                       if all(entry.get(k) == v for k, v in element.items())), None)
+                if blocked_id is None or self.blocked.pop(blocked_id, None) is None:
+                    continue
+                upserts.pop(blocked_id, None)
+                removed.add(blocked_id)
+                changed += 1
+                continue
+            upserts[blocked_id] = element
+            removed.discard(blocked_id)
+            changed += 1
+        return changed
+
+    def _log_changes(self, before: int, upserts: Dict, removed: set):
+        if not before or before == self.timestamp and not upserts and not removed:
+            return
+        last = self.log[-1] if self.log else None
+        if not upserts and not removed and last is not None and last[1] == before and not last[2] and not last[3]:
+            # Подряд идущие пустые ответы - одна запись
+            self.log[-1] = (last[0], self.timestamp, last[2], last[3])
+            return
+        self.log.append((before, self.timestamp, upserts, removed))
+
+    def changes_since(self, timestamp: int) -> Optional[Changes]:
+        """
+        Изменения time_blocked после состояния с polling.timestamp == timestamp
+
+        Returns:
+            (текущий timestamp, записи, id удаленных) или None, если журнал
+            не покрывает интервал (нужно полное сравнение)
+        """
+        if timestamp == self.timestamp:
+            return self.timestamp, [], []
+        entries = list(self.log)
+        start = next((index for index, entry in enumerate(entries) if entry[0] == timestamp), None)
+        if start is None:
+            return None
+
+        upserts, removed, current = {}, set(), timestamp
+        for before, after, added, deleted in entries[start:]:
+            if before != current:
+                return None
+            for blocked_id in deleted:
+                upserts.pop(blocked_id, None)
+                removed.add(blocked_id)
+            for blocked_id, entry in added.items():
+                upserts[blocked_id] = entry
+                removed.discard(blocked_id)
+            current = after
+        return current, list(upserts.values()), list(removed)
+
+    def _apply_list(self, name: str, key: str, items: List[Dict]):
+        """Применяет инструкцию к прочим спискам набора (редкие изменения)"""
+        target = self.set_data.setdefault(key, [])
+        for element in items:
+            if name == 'add':
+                target.append(element)
+                continue
+
+            for index, entry in enumerate(target):
+                if name == 'update' and entry.get('id') == element.get('id'):
+                    target[index] = element
+                    break
+                if name != 'update' and all(entry.get(k) == v for k, v in element.items()):
+                    del target[index]
+                    break
+
+    @property
+    def time_blocked(self) -> List[Dict]:
+        if self._blocked_list is None:
+            self._blocked_list = list(self.blocked.values())
+        return self._blocked_list
+
+    def to_data(self) -> Dict:
+        """Возвращает расписание в формате ответа initialize"""
+        set_data = dict(self.set_data)
+        set_data['time_blocked'] = self.time_blocked
+        return {
+            'instructions': {'set': set_data},
+            'polling': {'timestamp': self.timestamp}
+        }
+
+
+class IncrementalScheduleSync:
+    def __init__(self, client: Optional[ScheduleClient] = None):
+        self.client = client or get_schedule_client()
+        self.schedules = {}
+        self._lock = threading.Lock()
+
+    def _full_load(self, date: str, fresh: bool = False) -> Optional[DateSchedule]:
+        data = self.client.get_schedule(date, fresh=fresh)
+        if not data:
+            return None
+
+        schedule = DateSchedule(date, data)
+        with self._lock:
+            self.schedules[date] = schedule
+        logger.info(f"Полная загрузка расписания {date}: {len(schedule.blocked)} записей time_blocked")
+        return schedule
+
+    def sync(self, date: str) -> Optional[DateSchedule]:
+        """
+        Синхронизирует расписание даты
+
+        Первый вызов загружает полный initialize, последующие запрашивают
+        только изменения с polling.timestamp.
+
+        Args:
+            date: Дата в формате YYYY-MM-DD
+
+        Returns:
+            Актуальное расписание даты или None при ошибке
+        """
+        with self._lock:
+            schedule = self.schedules.get(date)
+
+        if schedule is None or not schedule.timestamp:
+            return self._full_load(date)
+
+        response = self.client.get_polling(date, schedule.timestamp)
+        if response is None:
+            logger.info(f"Polling недоступен для {date}, выполняем полную загрузку")
+            return self._full_load(date)
+
+        if 'refresh' in response.get('instructions', {}):
+            # Сервер просит перезагрузку - ответ из кэша для этого не подходит
+            return self._full_load(date, fresh=True)
+
+        changed = schedule.apply(response)
+        if changed:
+            logger.info(f"Расписание {date}: применено {changed} изменений time_blocked")
+        return schedule
+
+    def get_schedule(self, date: str, lazy: bool = False) -> Optional[Dict]:
+        """Совместимо с ScheduleClient.get_schedule (lazy не нужен: данные уже в памяти)"""
+        schedule = self.sync(date)
+        return schedule.to_data() if schedule else None
+
+    def changes(self, date: str, since: int) -> Optional[Changes]:
+        """Изменения time_blocked даты после polling.timestamp since (см. DateSchedule.changes_since)"""
+        with self._lock:
+            schedule = self.schedules.get(date)
+        return schedule.changes_since(since) if schedule is not None else None
+
+    def forget(self, date: str):
+        """Удаляет дату из памяти (например, после того как она прошла)"""
+        with self._lock:
+            self.schedules.pop(date, None)
+
+
+_shared_sync = None
+_sync_lock = threading.Lock()
+
+
+def get_schedule_sync() -> IncrementalScheduleSync:
+    """Возвращает общий для процесса синхронизатор расписания"""
+    global _shared_sync
+    with _sync_lock:
+        if _shared_sync is None:
+            _shared_sync = IncrementalScheduleSync()
+        return _shared_sync
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Ленивое представление ответа initialize
+Разделы instructions.set разбираются только при первом обращении: меньше пик
+памяти, но по CPU полный разбор orjson быстрее (замер - python schedule_view.py),
+поэтому мониторинг и анализаторы используют полный разбор
+"""
+
+import json
+import re
+import time
+import tracemalloc
+from collections.abc import Mapping
+from typing import Any, Dict, Optional
+import logging
+
+from initial_extractor import decode_object, find_initial_offset, orjson
+
+logger = logging.getLogger(__name__)
+
+# Ожидаемые типы разделов, которые можно разбирать по отдельности
+SECTION_TYPES = {
+    'court_types': list,
+    'time_blocked': list,
+    'time_list': list,
+    'dateList': list,
+    'inflates': list,
+    'time_price': list,
+    'time_stock': list,
+    'settings': dict,
+    'polling': dict,
+}
+
+_decoder = json.JSONDecoder()
+_SPACE = re.compile(r'\s*')
+_STRING = re.compile(r'"(?:[^"\\]|\\.)*"')
+_SCALAR = re.compile(r'[^,}\]\s]*')
+# Строки пропускаются целиком, поэтому скобки внутри них не считаются
+_TOKEN = re.compile(r'"(?:[^"\\]|\\.)*"|[\[\]{}]')
+
+
+class LazySchedule(Mapping):
+    """
+    Ответ initialize, совместимый со словарем
+
+    data.get('instructions', {}).get('set', {}).get('time_blocked') разбирает
+    только time_blocked; остальные разделы (dateList, time_price, time_stock,
+    settings ...) не материализуются, пока к ним не обратились.
+    """
+
+    def __init__(self, content: str, offset: int = 0):
+        self.content = content
+        self.offset = offset
+        self._sections = {}
+        self._full = None
+        # Найденные члены объектов по позиции объекта и незавершенные обходы
+        self._members: Dict[int, Dict[str, int]] = {}
+        self._walkers: Dict[int, Any] = {}
+        self._set_start: Optional[int] = None
+        self.set = LazySet(self)
+
+    @classmethod
+    def from_response(cls, content: str) -> Optional['LazySchedule']:
+        """Создает представление из текста ответа initialize"""
+        offset = find_initial_offset(content)
+        if offset < 0:
+            return None
+        return cls(content, offset)
+
+    def section(self, key: str) -> Any:
+        """
+        Возвращает раздел по ключу, разбирая его при первом обращении
+
+        Ключ ищется структурно: среди членов instructions.set (для polling -
+        верхнего уровня), значения других ключей пропускаются без разбора,
+        поэтому одноименный вложенный ключ не подменит раздел. Значение
+        принимается, только если имеет ожидаемый тип, иначе раздел берется
+        из полного разбора.
+        """
+        if key in self._sections:
+            return self._sections[key]
+
+        value = self._decode_section(key)
+        if value is None:
+            value = self._full_section(key)
+
+        self._sections[key] = value
+        return value
+
+    def _decode_section(self, key: str) -> Any:
+        expected = SECTION_TYPES.get(key)
+        if expected is None:
+            return None
+
+        try:
+            start = self._locate(key)
+            if start is None:
+                return None
+            value, _ = _decoder.raw_decode(self.content, start)
+        except (ValueError, IndexError):
+            return None
+
+        return value if isinstance(value, expected) else None
+
+    def _locate(self, key: str) -> Optional[int]:
+        """Начало значения раздела в тексте (None - ключа нет)"""
+        if key == 'polling':
+            return self._member(self.offset, 'polling')
+        if self._set_start is None:
+            instructions = self._member(self.offset, 'instructions')
+            self._set_start = -1 if instructions is None else self._member(instructions, 'set') or -1
+        if self._set_start < 0:
+            return None
+        return self._member(self._set_start, key)
+
+    def _member(self, position: int, key: str) -> Optional[int]:
+        """Начало значения ключа key объекта, который начинается в position"""
+        positions = self._members.get(position)
+        if positions is None:
+            positions = self._members[position] = {}
+            members = self._walk(position)
+            self._walkers[position] = members
+        if key in positions:
+            return positions[key]
+
+        members = self._walkers.get(position)
+        if members is not None:
+            for name, start in members:
+                positions[name] = start
+                if name == key:
+                    return start
+            del self._walkers[position]
+        return None
+
+    def _walk(self, position: int):
+        """(ключ, начало значения) членов объекта: только этого уровня, значения пропускаются"""
+        content = self.content
+        if content[position] != '{':
+            raise ValueError(f"Ожидался объект в позиции {position}")
+        position = _SPACE.match(content, position + 1).end()
+        while content[position] != '}':
+            match = _STRING.match(content, position)
+            if match is None:
+                raise ValueError(f"Ожидался ключ в позиции {position}")
+            name = match.group()[1:-1]
+            if '\\' in name:
+                name = json.loads(match.group())
+            position = _SPACE.match(content, match.end()).end()
+            if content[position] != ':':
+                raise ValueError(f"Ожидалось ':' в позиции {position}")
+            start = _SPACE.match(content, position + 1).end()
+            yield name, start
+            position = _SPACE.match(content, self._value_end(start)).end()
+            if content[position] == ',':
+                position = _SPACE.match(content, position + 1).end()
+
+    def _value_end(self, position: int) -> int:
+        """Позиция сразу после значения, которое начинается в position (без разбора)"""
+        content = self.content
+        char = content[position]
+        if char == '"':
+            return _STRING.match(content, position).end()
+        if char not in '{[':
+            return _SCALAR.match(content, position).end()
+        depth = 0
+        for match in _TOKEN.finditer(content, position):
+            token = match.group()
+            if token[0] == '"':
+                continue
+            depth += 1 if token in '{[' else -1
+            if depth == 0:
+                return match.end()
+        raise ValueError(f"Незакрытое значение в позиции {position}")
+
+    def _full_section(self, key: str) -> Any:
+        full = self.full()
+        if key == 'polling':
+            return full.get('polling')
+        return full.get('instructions', {}).get('set', {}).get(key)
+
+    def full(self) -> Dict:
+        """Полный разбор объекта (один раз)"""
+        if self._full is None:
+            logger.info("Полный разбор объекта initial")
+            self._full = decode_object(self.content, self.offset)
+        return self._full
+
+    def __getitem__(self, key: str) -> Any:
+        if key == 'instructions':
+            return {'set': self.set}
+        if key == 'polling':
+            return self.section('polling')
+        return self.full()[key]
+
+    def __iter__(self):
+        return iter(self.full())
+
+    def __len__(self) -> int:
+        return len(self.full())
+
+
+class LazySet(Mapping):
+    """Раздел instructions.set с ленивой материализацией подразделов"""
+
+    def __init__(self, schedule: LazySchedule):
+        self._schedule = schedule
+
+    def __getitem__(self, key: str) -> Any:
+        value = self._schedule.section(key)
+        if value is None and key not in self._full_set():
+            raise KeyError(key)
+        return value
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = self._schedule.section(key)
+        return default if value is None else value
+
+    def _full_set(self) -> Dict:
+        return self._schedule.full().get('instructions', {}).get('set', {})
+
+    def __iter__(self):
+        return iter(self._full_set())
+
+    def __len__(self) -> int:
+        return len(self._full_set())
+
+
+def measure_tick(content: str, repeats: int = 20) -> Dict[str, Dict[str, float]]:
+    """
+    Сравнивает полный разбор и ленивый доступ к court_types + time_blocked
+
+    Args:
+        content: Текст ответа (JSON или JavaScript initialize)
+        repeats: Количество повторов для замера CPU
+
+    Returns:
+        {'full': {'cpu_ms', 'peak_kb'}, 'lazy': {...}[, 'orjson': {...}]}
+    """
+    offset = find_initial_offset(content)
+    if offset < 0:
+        offset = content.find('{')
+
+    def full_tick():
+        data, _ = _decoder.raw_decode(content, offset)
+        set_data = data['instructions']['set']
+        return set_data['court_types'], set_data['time_blocked']
+
+    def lazy_tick():
+        set_data = LazySchedule(content, offset)['instructions']['set']
+        return set_data['court_types'], set_data['time_blocked']
+
+    ticks = {'full': full_tick, 'lazy': lazy_tick}
+    if orjson is not None:
+        def orjson_tick():
+            set_data = decode_object(content, offset)['instructions']['set']
+            return set_data['court_types'], set_data['time_blocked']
+
+        ticks['orjson'] = orjson_tick
+
+    results = {}
+    for name, tick in ticks.items():
+        started = time.perf_counter()
+        for _ in range(repeats):
+            tick()
+        cpu_ms = (time.perf_counter() - started) * 1000 / repeats
+
+        tracemalloc.start()
+        kept = tick()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del kept
+
+        results[name] = {'cpu_ms': cpu_ms, 'peak_kb': peak / 1024}
+
+    return results
+
+
+def main():
+    """Замер CPU и памяти на тик монитора по full_data_analysis.json"""
+    print("🎾 ЛЕНИВЫЙ РАЗБОР instructions.set")
+    print("=" * 60)
+
+    with open('full_data_analysis.json', 'r', encoding='utf-8') as f:
+        content = f.read()
+
+    results = measure_tick(content)
+    for name, stats in results.items():
+        print(f"{name:<8} CPU: {stats['cpu_ms']:6.2f} мс   пик памяти: {stats['peak_kb']:8.1f} КБ")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -29,6 +29,8 @@ except ImportError:
     from selenium.webdriver.support import expected_conditions as EC
     from selenium.common.exceptions import TimeoutException, WebDriverException
 
+from snapshot_store import get_snapshot_store
+
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -80,9 +82,8 @@ class SeleniumTennisAnalyzer:
             html_content = self.driver.page_source
             
             # Сохраняем для анализа
-            with open(f'rendered_schedule_{date}.html', 'w', encoding='utf-8') as f:
-                f.write(html_content)
-            print(f"💾 Отрендеренный HTML сохранен в: rendered_schedule_{date}.html")
+            get_snapshot_store().put_text(date, 'rendered_html', html_content)
+            print(f"💾 Отрендеренный HTML сохранен в историю снимков")
             
             return html_content
             
@@ -84,7 +84,7 @@ def main():
         message += '\n📝 <i>Данные исправлены с учетом 30-минутных ячеек</i>'
         
         print('📤 Отправка исправленного уведомления в Telegram...')
-        success = notifier.send_message(message)
+        success = notifier.send_message(message, wait=True)
         
         if success:
             print('✅ Исправленное уведомление успешно отправлено в Telegram!')
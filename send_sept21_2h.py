@@ -80,7 +80,7 @@ def main():
         message += '\n📝 <i>Показаны только корты с полным 2-часовым слотом</i>'
         
         print('📤 Отправка уведомления в Telegram...')
-        success = notifier.send_message(message)
+        success = notifier.send_message(message, wait=True)
         
         if success:
             print('✅ Уведомление успешно отправлено в Telegram!')
@@ -101,7 +101,7 @@ def main():
         message += '  • 30 мин (23:30-00:00)\n\n'
         message += '🔗 Проверить: https://x19.spb.ru/bronirovanie/'
         
-        success = notifier.send_message(message)
+        success = notifier.send_message(message, wait=True)
         if success:
             print('✅ Уведомление об отсутствии 2-часовых слотов отправлено')
         else:
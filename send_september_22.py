@@ -74,7 +74,7 @@ def main():
         message += '🔗 <a href="https://x19.spb.ru/bronirovanie/">Забронировать</a>'
         
         print('📤 Отправка уведомления в Telegram...')
-        success = notifier.send_message(message)
+        success = notifier.send_message(message, wait=True)
         
         if success:
             print('✅ Уведомление успешно отправлено в Telegram!')
@@ -88,7 +88,7 @@ def main():
         message = f'❌ Свободных грунтовых кортов в 22:00-00:00 на {date_display} не найдено\n\n'
         message += '🔗 Проверить: https://x19.spb.ru/bronirovanie/'
         
-        success = notifier.send_message(message)
+        success = notifier.send_message(message, wait=True)
         if success:
             print('✅ Уведомление об отсутствии слотов отправлено')
         else:
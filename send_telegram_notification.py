@@ -252,7 +252,7 @@ def main():
                     print("✅ Соединение с Telegram работает")
                     # Отправляем тестовое сообщение
                     test_message = "🎾 Тест уведомлений теннисного монитора\n✅ Соединение работает корректно"
-                    if notifier.send_message(test_message):
+                    if notifier.send_message(test_message, wait=True):
                         print("✅ Тестовое сообщение отправлено")
                     else:
                         print("❌ Ошибка отправки тестового сообщения")
@@ -15,6 +15,7 @@ import logging
 sys.path.insert(0, '/root/tennis-monitor')
 
 from corrected_30min_analyzer import Corrected30MinAnalyzer
+from availability_query import AvailabilityQuery
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -23,6 +24,7 @@ logger = logging.getLogger(__name__)
 class SimpleAutoBooking:
     def __init__(self):
         self.analyzer = Corrected30MinAnalyzer()
+        self.query = AvailabilityQuery(self.analyzer.source)
         
         # Данные пользователя
         self.user_data = {
@@ -36,31 +38,27 @@ class SimpleAutoBooking:
         """Поиск доступного корта используя существующий анализатор"""
         logger.info(f"Поиск доступного корта на {date} в {time_from}:00 ({duration_hours}ч)")
         
-        # Используем существующий анализатор
-        free_courts = self.analyzer.analyze_ground_courts_22h_corrected(date)
-        
-        if not free_courts:
-            logger.warning("Свободных кортов не найдено")
-            return None
-        
-        # Ищем корт с нужной длительностью
+        # Грунтовый корт, свободный ровно с time_from на duration_hours (любой час, не только 22:00)
         target_duration = f"{time_from:02d}:00-{(time_from + duration_hours) % 24:02d}:00"
+        matches = self.query.find([date], surfaces=['grunt'], start_window=(time_from, time_from),
+                                  min_duration=duration_hours * 60, max_duration=duration_hours * 60)
         
-        for court in free_courts:
-            if court['time_display'] == target_duration:
-                logger.info(f"Найден свободный корт №{court['court_number']}")
-                return {
-                    'court_id': court['court_number'],  # Используем номер как ID
-                    'court_number': court['court_number'],
-                    'court_type': 'Грунт',
-                    'time_from': time_from,
-                    'time_to': (time_from + duration_hours) % 24,
-                    'date': date,
-                    'time_display': court['time_display']
-                }
+        if not matches:
+            logger.warning(f"Корт с длительностью {target_duration} не найден")
+            return None
         
-        logger.warning(f"Корт с длительностью {target_duration} не найден")
-        return None
+        court = matches[0]
+        logger.info(f"Найден свободный корт №{court['court_number']}")
+        return {
+            'court_id': court['court_id'],
+            'court_number': court['court_number'],
+            'court_type': court['court_type'],
+            'inflate_id': court['inflate_id'],
+            'time_from': time_from,
+            'time_to': (time_from + duration_hours) % 24,
+            'date': date,
+            'time_display': court['time_display']
+        }
     
     def prepare_booking_form_data(self, court_data: Dict) -> Dict:
         """Подготовка данных формы для бронирования"""
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Объединение одновременных запросов одной даты (single-flight)
+Пока дата загружается, остальные вызовы ждут тот же результат; внутри
+области запроса (scope) результат переиспользуется до ее завершения.
+Область принадлежит потоку, который ее открыл: другие потоки ее результаты
+не видят
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Hashable, Optional
+import logging
+
+from schedule_client import get_schedule_client
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    """Один выполняющийся или завершенный вызов"""
+
+    __slots__ = ('event', 'result', 'error', 'finished_at')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.finished_at = None
+
+
+class SingleFlight:
+    def __init__(self, recent_ttl: float = 0.0):
+        """
+        Args:
+            recent_ttl: Сколько секунд после завершения результат отдается
+                        новым вызовам вне области запроса (0 - только ожидающим)
+        """
+        self.recent_ttl = recent_ttl
+        self.executed = 0
+        self.shared = 0
+        self._calls: Dict[Hashable, _Call] = {}
+        self._scope = threading.local()
+        self._lock = threading.Lock()
+
+    def _reusable(self, call: _Call) -> bool:
+        """Можно ли отдать результат вызова новому запросу"""
+        if not call.event.is_set():
+            return True
+        if call.error is not None or call.result is None:
+            return False
+        return time.monotonic() - call.finished_at < self.recent_ttl
+
+    def _scope_results(self) -> Optional[Dict[Hashable, Any]]:
+        """Результаты открытой области текущего потока (None - вне области)"""
+        return getattr(self._scope, 'results', None)
+
+    def do(self, key: Hashable, func: Callable[[], Any]) -> Any:
+        """
+        Выполняет func один раз на ключ среди одновременных вызовов
+
+        Args:
+            key: Ключ запроса (например, дата)
+            func: Функция загрузки
+
+        Returns:
+            Результат func (общий для всех объединенных вызовов)
+        """
+        results = self._scope_results()
+        if results is not None and key in results:
+            with self._lock:
+                self.shared += 1
+            return results[key]
+
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None or not self._reusable(call)
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self.executed += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            if results is not None and call.result is not None:
+                results[key] = call.result
+            return call.result
+
+        try:
+            call.result = func()
+            if results is not None and call.result is not None:
+                results[key] = call.result
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            call.finished_at = time.monotonic()
+            call.event.set()
+            with self._lock:
+                if not self._reusable(call) and self._calls.get(key) is call:
+                    del self._calls[key]
+
+    @contextmanager
+    def scope(self):
+        """
+        Область запроса: завершенные результаты переиспользуются до выхода из нее
+
+        Область действует только в открывшем ее потоке. Области могут быть
+        вложенными; результаты сбрасываются при выходе из самой внешней.
+        """
+        outer = self._scope_results() is None
+        if outer:
+            self._scope.results = {}
+        try:
+            yield self
+        finally:
+            if outer:
+                del self._scope.results
+
+    def stats(self) -> Dict[str, int]:
+        return {'executed': self.executed, 'shared': self.shared}
+
+
+class SingleFlightSource:
+    """
+    Источник расписания с объединением запросов
+
+    Совместим с ScheduleClient.get_schedule. Общий результат - полный словарь
+    initialize, поэтому параметр lazy игнорируется: словарь подходит всем
+    вызывающим.
+    """
+
+    def __init__(self, source=None, recent_ttl: float = 0.0):
+        self.source = source or get_schedule_client()
+        self.flight = SingleFlight(recent_ttl)
+
+    def get_schedule(self, date: str, lazy: bool = False) -> Optional[Dict]:
+        return self.flight.do(date, lambda: self.source.get_schedule(date))
+
+    def scope(self):
+        return self.flight.scope()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Компактное представление свободных слотов
+Данные корта хранятся один раз, слот - небольшая запись с __slots__
+"""
+
+import json
+import sys
+import tracemalloc
+from typing import Any, Dict, Iterable, List, Tuple, Union
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Порядок ключей совпадает с прежними словарями find_available_slots
+SLOT_KEYS = (
+    'date', 'court_id', 'court_number', 'court_type', 'court_type_short',
+    'time_from', 'time_to', 'time_from_value', 'time_to_value', 'status'
+)
+
+
+class CourtInfo:
+    """Неизменяемые данные корта, общие для всех его слотов"""
+
+    __slots__ = ('court_id', 'court_number', 'court_type', 'court_type_short')
+
+    _interned: Dict[Tuple, 'CourtInfo'] = {}
+
+    def __init__(self, court_id: int, court_number: Any, court_type: str, court_type_short: str):
+        self.court_id = court_id
+        self.court_number = court_number
+        self.court_type = court_type
+        self.court_type_short = court_type_short
+
+    @classmethod
+    def intern(cls, court_id: int, court_number: Any, court_type: str, court_type_short: str) -> 'CourtInfo':
+        """Возвращает общий экземпляр для одинаковых данных корта"""
+        key = (court_id, court_number, court_type, court_type_short)
+        info = cls._interned.get(key)
+        if info is None:
+            info = cls(court_id, court_number, sys.intern(court_type), sys.intern(court_type_short))
+            cls._interned[key] = info
+        return info
+
+
+class SlotRecord:
+    """
+    Свободный слот: дата, корт и часовой интервал
+
+    Поддерживает чтение как словарь (slot['court_type'], slot.get(...)), поэтому
+    подходит коду, который работал со словарями find_available_slots.
+    """
+
+    __slots__ = ('date', 'court', 'time_from', 'time_to', 'time_from_value', 'time_to_value')
+
+    status = 'available'
+
+    def __init__(self, date: str, court: CourtInfo, time_from: Any, time_to: Any,
+                 time_from_value: str, time_to_value: str):
+        self.date = sys.intern(date)
+        self.court = court
+        self.time_from = time_from
+        self.time_to = time_to
+        self.time_from_value = sys.intern(time_from_value)
+        self.time_to_value = sys.intern(time_to_value)
+
+    def __getitem__(self, key: str) -> Any:
+        if key in CourtInfo.__slots__:
+            return getattr(self.court, key)
+        if key in SLOT_KEYS:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def to_dict(self) -> Dict:
+        """Словарь в прежнем формате find_available_slots (без потерь)"""
+        court = self.court
+        return {
+            'date': self.date,
+            'court_id': court.court_id,
+            'court_number': court.court_number,
+            'court_type': court.court_type,
+            'court_type_short': court.court_type_short,
+            'time_from': self.time_from,
+            'time_to': self.time_to,
+            'time_from_value': self.time_from_value,
+            'time_to_value': self.time_to_value,
+            'status': self.status
+        }
+
+    @classmethod
+    def from_dict(cls, slot: Dict) -> 'SlotRecord':
+        """Обратное преобразование словаря слота"""
+        court = CourtInfo.intern(slot['court_id'], slot['court_number'], slot['court_type'],
+                                 slot['court_type_short'])
+        return cls(slot['date'], court, slot['time_from'], slot['time_to'],
+                   slot['time_from_value'], slot['time_to_value'])
+
+    def __repr__(self) -> str:
+        return (f"SlotRecord({self.date} корт №{self.court.court_number} "
+                f"{self.time_from_value}-{self.time_to_value})")
+
+
+def to_dicts(slots: Iterable[Union[SlotRecord, Dict]]) -> List[Dict]:
+    """Приводит список записей и/или словарей к словарям"""
+    return [slot.to_dict() if isinstance(slot, SlotRecord) else slot for slot in slots]
+
+
+def measure_memory(records: List[SlotRecord]) -> Dict[str, float]:
+    """
+    Сравнивает память записей и эквивалентных словарей
+
+    Returns:
+        {'records_kb', 'dicts_kb', 'json_kb'}
+    """
+    def traced(factory) -> Tuple[Any, float]:
+        tracemalloc.start()
+        value = factory()
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return value, current / 1024
+
+    source = [slot.to_dict() for slot in records]
+    copied, records_kb = traced(lambda: [SlotRecord.from_dict(slot) for slot in source])
+    dicts, dicts_kb = traced(lambda: [dict(slot) for slot in source])
+    del copied, dicts
+
+    return {
+        'records_kb': records_kb,
+        'dicts_kb': dicts_kb,
+        'json_kb': len(json.dumps(source, ensure_ascii=False, indent=2).encode('utf-8')) / 1024,
+    }
+
+
+def main():
+    """Память полного горизонта (37 дней) на сохраненном ответе initialize"""
+    from initial_extractor import extract_initial
+    from final_monitor import FinalTennisMonitor
+
+    print("🎾 КОМПАКТНЫЕ ЗАПИСИ СЛОТОВ")
+    print("=" * 60)
+
+    with open('api_response_2025-09-16.js', 'r', encoding='utf-8') as f:
+        data = extract_initial(f.read())
+
+    monitor = FinalTennisMonitor()
+    date_list = data['instructions']['set'].get('dateList', [])
+    dates = [item['date'][:10] for item in date_list if item.get('date')] or ['2025-09-16']
+
+    # Горизонт без занятости: худший случай по количеству слотов
+    empty = {'instructions': {'set': dict(data['instructions']['set'], time_blocked=[])}}
+    records = []
+    for date in dates:
+        records.extend(monitor.find_available_records(date, empty))
+
+    results = measure_memory(records)
+    print(f"📅 Дат: {len(dates)}, слотов: {len(records)}")
+    print(f"📦 Словари:  {results['dicts_kb']:8.1f} КБ")
+    print(f"🚀 Записи:   {results['records_kb']:8.1f} КБ")
+    print(f"💾 JSON:     {results['json_kb']:8.1f} КБ")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
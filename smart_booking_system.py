@@ -5,8 +5,6 @@
 """
 
 import sys
-import os
-import json
 from datetime import datetime, timedelta
 import time
 
@@ -15,67 +13,60 @@ sys.path.insert(0, '/root/tennis-monitor')
 
 from corrected_30min_analyzer import Corrected30MinAnalyzer
 from simple_auto_booking import SimpleAutoBooking
+from availability_query import AvailabilityQuery
+from single_flight import SingleFlightSource
+from booking_store import get_booking_store
 
 class SmartBookingSystem:
     def __init__(self):
         self.analyzer = Corrected30MinAnalyzer()
         self.booking = SimpleAutoBooking()
-        self.booking_requests_file = "booking_requests.json"
+        
+        # Анализатор, поиск и модуль бронирования получают дату через один источник:
+        # в рамках обработки запроса дата загружается и разбирается один раз
+        self.source = SingleFlightSource(self.analyzer.source)
+        self.analyzer.source = self.source
+        self.booking.analyzer.source = self.source
+        self.query = AvailabilityQuery(self.source)
+        self.booking.query = self.query
+        # Запросы хранятся в SQLite (booking_requests.json импортируется один раз)
+        self.store = get_booking_store()
         
     def load_booking_requests(self):
         """Загрузка отложенных запросов на бронирование"""
         try:
-            if os.path.exists(self.booking_requests_file):
-                with open(self.booking_requests_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+            return self.store.list()
         except Exception as e:
             print(f"⚠️ Ошибка загрузки запросов: {e}")
         return []
     
-    def save_booking_requests(self, requests):
-        """Сохранение отложенных запросов"""
-        try:
-            with open(self.booking_requests_file, 'w', encoding='utf-8') as f:
-                json.dump(requests, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            print(f"⚠️ Ошибка сохранения запросов: {e}")
-    
     def add_booking_request(self, date, time_from, duration_hours, description=""):
         """Добавление нового запроса на бронирование"""
-        requests = self.load_booking_requests()
-        
-        new_request = {
-            'id': len(requests) + 1,
-            'date': date,
-            'time_from': time_from,
-            'duration_hours': duration_hours,
-            'description': description,
-            'status': 'pending',
-            'created_at': datetime.now().isoformat(),
-            'last_check': None,
-            'attempts': 0
-        }
-        
-        requests.append(new_request)
-        self.save_booking_requests(requests)
+        request_id = self.store.add(date, time_from, duration_hours, description)
         
         print(f"✅ Запрос на бронирование добавлен:")
         print(f"  📅 Дата: {date}")
         print(f"  ⏰ Время: {time_from}:00-{(time_from + duration_hours) % 24}:00")
         print(f"  📝 Описание: {description}")
         
-        return new_request['id']
+        return request_id
     
     def is_date_available(self, date):
         """Проверка доступности даты (в пределах 7 дней)"""
+        # Дата открыта, если сайт отдает для нее сетку кортов; свободные корты на
+        # конкретный час ищет AvailabilityQuery, а не анализатор 22:00
         try:
-            free_courts = self.analyzer.analyze_ground_courts_22h_corrected(date)
-            return free_courts is not None and len(free_courts) > 0
+            data = self.source.get_schedule(date)
+            return bool(data and data.get('instructions', {}).get('set', {}).get('court_types'))
         except:
             return False
     
     def process_booking_request(self, request):
         """Обработка запроса на бронирование"""
+        with self.source.scope():
+            return self._process_booking_request(request)
+    
+    def _process_booking_request(self, request):
         date = request['date']
         time_from = request['time_from']
         duration_hours = request['duration_hours']
@@ -94,22 +85,12 @@ class SmartBookingSystem:
         
         print(f"  ✅ Дата {date} доступна, ищем свободные корты...")
         
-        # Ищем доступные корты
-        free_courts = self.analyzer.analyze_ground_courts_22h_corrected(date)
-        
-        if not free_courts:
-            print(f"  ❌ Свободных кортов не найдено")
-            request['status'] = 'failed'
-            return False, "Свободных кортов не найдено"
-        
-        # Ищем корт с нужной длительностью
+        # Ищем корт, свободный ровно с time_from на duration_hours (анализатор 22:00 здесь
+        # не решает: запрос может быть на любой час)
         target_duration = f"{time_from:02d}:00-{(time_from + duration_hours) % 24:02d}:00"
-        target_court = None
-        
-        for court in free_courts:
-            if court['time_display'] == target_duration:
-                target_court = court
-                break
+        matches = self.query.find([date], surfaces=['grunt'], start_window=(time_from, time_from),
+                                  min_duration=duration_hours * 60, max_duration=duration_hours * 60)
+        target_court = matches[0] if matches else None
         
         if not target_court:
             print(f"  ⚠️ Корт с длительностью {target_duration} не найден")
@@ -140,7 +121,7 @@ class SmartBookingSystem:
     
     def check_and_process_requests(self):
         """Проверка и обработка всех отложенных запросов"""
-        requests = self.load_booking_requests()
+        requests = self.store.active()
         
         if not requests:
             print("📋 Отложенных запросов нет")
@@ -149,16 +130,25 @@ class SmartBookingSystem:
         print(f"📋 Найдено {len(requests)} отложенных запросов")
         
         for request in requests:
-            if request['status'] in ['pending', 'waiting']:
+            # Запрос может уже обрабатывать другой процесс (меню или демон мониторинга)
+            request = self.store.claim(request['id'])
+            if request is None:
+                continue
+            
+            try:
                 success, message = self.process_booking_request(request)
-                
-                # Сохраняем обновленный запрос
-                self.save_booking_requests(requests)
-                
-                if success:
-                    print(f"🎉 Запрос #{request['id']} выполнен успешно!")
-                else:
-                    print(f"⚠️ Запрос #{request['id']}: {message}")
+            except Exception as e:
+                self.store.transition(request['id'], 'pending', error=str(e))
+                raise
+            
+            # Сохраняем только итог этого запроса
+            self.store.transition(request['id'], request['status'],
+                                  result=request.get('result'), error=request.get('error'))
+            
+            if success:
+                print(f"🎉 Запрос #{request['id']} выполнен успешно!")
+            else:
+                print(f"⚠️ Запрос #{request['id']}: {message}")
     
     def show_requests_status(self):
         """Показ статуса всех запросов"""
@@ -175,6 +165,7 @@ class SmartBookingSystem:
             status_emoji = {
                 'pending': '⏳',
                 'waiting': '🕐', 
+                'processing': '🔄',
                 'completed': '✅',
                 'failed': '❌'
             }.get(request['status'], '❓')
@@ -182,9 +173,9 @@ class SmartBookingSystem:
             print(f"{status_emoji} #{request['id']} | {request['date']} | {request['time_from']}:00-{(request['time_from'] + request['duration_hours']) % 24}:00")
             print(f"    Статус: {request['status']} | Попыток: {request['attempts']}")
             
-            if request['status'] == 'completed' and 'result' in request:
+            if request['status'] == 'completed' and request.get('result'):
                 print(f"    Результат: {request['result']}")
-            elif request['status'] == 'failed' and 'error' in request:
+            elif request['status'] == 'failed' and request.get('error'):
                 print(f"    Ошибка: {request['error']}")
             
             if request['last_check']:
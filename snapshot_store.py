@@ -0,0 +1,436 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+История снимков расписания (только добавление, сжатие, дедупликация)
+Вместо api_response_*.js, initial_data_*.json, html_debug_*.html и т.п.:
+содержимое хранится один раз по sha256 в сжатом виде, а для initialize
+между соседними загрузками даты записываются только изменения time_blocked;
+поля, меняющиеся при каждой загрузке (polling, execute), хранятся при снимке
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from collections.abc import Mapping
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SNAPSHOT_FILE = os.environ.get(
+    'TENNIS_SNAPSHOT_FILE',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'snapshots.db')
+)
+
+# Вид снимка с данными initialize (остальные виды - произвольный текст)
+INITIALIZE = 'initialize'
+# Полный список броней записывается каждые N снимков даты: восстановление
+# снимка читает не больше N дельт
+KEYFRAME_INTERVAL = 64
+COMPRESSION_LEVEL = 9
+# Сколько распакованных объектов держать в памяти при чтении истории
+OBJECT_CACHE_SIZE = 32
+# Поля ответа initialize, меняющиеся при каждой загрузке (метка polling, время
+# генерации): в основу не попадают, иначе одинаковые расписания не дедуплицируются
+VOLATILE_FIELDS = ('polling', 'execute')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS objects (
+    hash TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    data BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    date TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    object TEXT NOT NULL REFERENCES objects (hash),
+    parent INTEGER,
+    delta BLOB,
+    meta BLOB
+);
+CREATE INDEX IF NOT EXISTS idx_snapshots_date ON snapshots (date, kind, fetched_at);
+"""
+
+
+def _canonical(value) -> bytes:
+    return json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+
+def _block_id(block: Dict) -> str:
+    """Идентификатор брони: хэш ее канонического JSON (любое изменение поля - другая бронь)"""
+    return hashlib.sha1(_canonical(block)).hexdigest()[:16]
+
+
+def _index_blocks(blocks: List[Dict]) -> 'OrderedDict[str, Dict]':
+    """Брони по идентификатору; повторы одной брони получают суффикс '#n'"""
+    indexed: 'OrderedDict[str, Dict]' = OrderedDict()
+    for block in blocks:
+        block_id = _block_id(block)
+        key, repeat = block_id, 1
+        while key in indexed:
+            key = f"{block_id}#{repeat}"
+            repeat += 1
+        indexed[key] = block
+    return indexed
+
+
+def split_blocks(data: Mapping) -> Tuple[Dict, List[Dict]]:
+    """
+    Делит данные initialize на основу (без time_blocked) и список броней
+
+    Копируются только словари на пути к time_blocked, остальное разделяется с data.
+    Принимает любой Mapping (в том числе LazySchedule).
+    """
+    instructions = data.get('instructions')
+    settings = instructions.get('set') if isinstance(instructions, Mapping) else None
+    if not isinstance(settings, Mapping) or 'time_blocked' not in settings:
+        return dict(data), []
+    blocks = list(settings.get('time_blocked') or [])
+    base = dict(data)
+    base['instructions'] = dict(instructions)
+    base['instructions']['set'] = dict(settings)
+    base['instructions']['set']['time_blocked'] = []
+    return base, blocks
+
+
+def split_volatile(base: Dict) -> Tuple[Dict, Dict]:
+    """Отделяет от основы поля VOLATILE_FIELDS (хранятся при снимке, а не в объекте)"""
+    volatile = {key: base[key] for key in VOLATILE_FIELDS if key in base}
+    if not volatile:
+        return base, {}
+    return {key: value for key, value in base.items() if key not in volatile}, volatile
+
+
+def join_blocks(base: Dict, blocks: List[Dict]) -> Dict:
+    """Обратная операция к split_blocks"""
+    if 'instructions' not in base:
+        return base
+    data = dict(base)
+    data['instructions'] = dict(base['instructions'])
+    data['instructions']['set'] = dict(base['instructions']['set'])
+    data['instructions']['set']['time_blocked'] = blocks
+    return data
+
+
+class SnapshotStore:
+    """
+    Снимки по (дата, время загрузки) в SQLite
+
+    Объекты (основа initialize без броней и VOLATILE_FIELDS, HTML, JS)
+    адресуются sha256 и сжимаются zlib - одинаковые загрузки занимают место
+    один раз; VOLATILE_FIELDS хранятся в meta снимка. Брони
+    initialize хранятся дельтами к предыдущему снимку той же даты (parent):
+    добавленные брони целиком, удаленные - по идентификатору (хэш брони). Каждый
+    KEYFRAME_INTERVAL-й снимок даты содержит полный список. Таблица снимков
+    только пополняется; индекс (date, kind, fetched_at) дает чтение диапазона
+    без просмотра чужих дат.
+    """
+
+    def __init__(self, path: str = DEFAULT_SNAPSHOT_FILE, keyframe_interval: int = KEYFRAME_INTERVAL):
+        self.path = path
+        self.keyframe_interval = keyframe_interval
+        self._local = threading.local()
+        self._objects: 'OrderedDict[str, bytes]' = OrderedDict()
+        self._objects_lock = threading.Lock()
+        # Последнее известное состояние броней по (дата, вид): (id снимка, брони, дельт с ключевого)
+        self._heads: Dict[Tuple[str, str], Tuple[int, 'OrderedDict[str, Dict]', int]] = {}
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        connection = self._connection()
+        connection.executescript(SCHEMA)
+        # Базы, созданные до появления meta
+        if 'meta' not in {row[1] for row in connection.execute("PRAGMA table_info(snapshots)")}:
+            connection.execute("ALTER TABLE snapshots ADD COLUMN meta BLOB")
+
+    def _connection(self) -> sqlite3.Connection:
+        """Соединение текущего потока"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    @contextmanager
+    def transaction(self):
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    # --- объекты ---
+
+    @staticmethod
+    def _put_object(connection: sqlite3.Connection, payload: bytes) -> str:
+        digest = hashlib.sha256(payload).hexdigest()
+        if connection.execute("SELECT 1 FROM objects WHERE hash = ?", (digest,)).fetchone() is None:
+            connection.execute("INSERT INTO objects (hash, size, data) VALUES (?, ?, ?)",
+                               (digest, len(payload), zlib.compress(payload, COMPRESSION_LEVEL)))
+        return digest
+
+    def _get_object(self, digest: str) -> bytes:
+        with self._objects_lock:
+            payload = self._objects.get(digest)
+            if payload is not None:
+                self._objects.move_to_end(digest)
+                return payload
+        row = self._connection().execute("SELECT data FROM objects WHERE hash = ?", (digest,)).fetchone()
+        if row is None:
+            raise KeyError(f"Объект {digest} не найден")
+        payload = zlib.decompress(row[0])
+        with self._objects_lock:
+            self._objects[digest] = payload
+            while len(self._objects) > OBJECT_CACHE_SIZE:
+                self._objects.popitem(last=False)
+        return payload
+
+    # --- запись ---
+
+    def put_text(self, date: str, kind: str, text: str, fetched_at: Optional[float] = None) -> int:
+        """
+        Сохраняет текстовый снимок (HTML, JS, отчет анализа)
+
+        Args:
+            date: Дата расписания YYYY-MM-DD
+            kind: Вид снимка ('html', 'js', 'analysis', ...)
+            text: Содержимое
+            fetched_at: Время загрузки (unix timestamp, по умолчанию сейчас)
+
+        Returns:
+            ID снимка
+        """
+        with self.transaction() as connection:
+            digest = self._put_object(connection, text.encode('utf-8'))
+            cursor = connection.execute(
+                "INSERT INTO snapshots (date, kind, fetched_at, object) VALUES (?, ?, ?, ?)",
+                (date, kind, fetched_at or time.time(), digest))
+            return cursor.lastrowid
+
+    def put_json(self, date: str, kind: str, value, fetched_at: Optional[float] = None) -> int:
+        """Сохраняет произвольный JSON (например, детальный анализ даты)"""
+        return self.put_text(date, kind, json.dumps(value, ensure_ascii=False, sort_keys=True), fetched_at)
+
+    def put(self, date: str, data: Mapping, fetched_at: Optional[float] = None, kind: str = INITIALIZE) -> int:
+        """
+        Сохраняет снимок initialize: основа - объектом, брони - дельтой к предыдущему снимку даты,
+        VOLATILE_FIELDS - в meta снимка
+
+        Returns:
+            ID снимка
+        """
+        fetched_at = fetched_at or time.time()
+        base, blocks = split_blocks(data)
+        base, volatile = split_volatile(base)
+        current = _index_blocks(blocks)
+        base_payload = _canonical(base)
+        meta = _canonical(volatile) if volatile else None
+
+        with self.transaction() as connection:
+            digest = self._put_object(connection, base_payload)
+            head = connection.execute(
+                "SELECT MAX(id) FROM snapshots WHERE date = ? AND kind = ?", (date, kind)).fetchone()[0]
+            previous = self._head_state(head, date, kind) if head is not None else None
+
+            if previous is None or previous[1] >= self.keyframe_interval - 1:
+                delta = {'full': list(current.values())}
+                parent, depth = None, 0
+            else:
+                known = previous[0]
+                delta = {'add': [[block_id, block] for block_id, block in current.items() if block_id not in known],
+                         'remove': [block_id for block_id in known if block_id not in current]}
+                parent, depth = head, previous[1] + 1
+
+            cursor = connection.execute(
+                "INSERT INTO snapshots (date, kind, fetched_at, object, parent, delta, meta) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (date, kind, fetched_at, digest, parent,
+                 zlib.compress(_canonical(delta), COMPRESSION_LEVEL), meta))
+            snapshot_id = cursor.lastrowid
+
+        self._heads[(date, kind)] = (snapshot_id, current, depth)
+        return snapshot_id
+
+    def _head_state(self, head: int, date: str, kind: str) -> Optional[Tuple['OrderedDict[str, Dict]', int]]:
+        """Брони последнего снимка даты и число дельт после ключевого снимка"""
+        cached = self._heads.get((date, kind))
+        if cached is not None and cached[0] == head:
+            return cached[1], cached[2]
+        # Последний снимок записал другой процесс - восстанавливаем по цепочке
+        chain = self._chain(head)
+        return self._replay_chain(chain), len(chain) - 1
+
+    # --- чтение ---
+
+    def _chain(self, snapshot_id: int) -> List[Tuple]:
+        """Снимки от ближайшего ключевого до snapshot_id включительно (по возрастанию)"""
+        rows = self._connection().execute(
+            """
+            WITH RECURSIVE chain (id, parent, delta) AS (
+                SELECT id, parent, delta FROM snapshots WHERE id = ?
+                UNION ALL
+                SELECT s.id, s.parent, s.delta FROM snapshots s JOIN chain c ON s.id = c.parent
+            )
+            SELECT id, parent, delta FROM chain ORDER BY id
+            """, (snapshot_id,)).fetchall()
+        return rows
+
+    @staticmethod
+    def _apply(blocks: 'OrderedDict[str, Dict]', delta_blob: bytes) -> 'OrderedDict[str, Dict]':
+        delta = json.loads(zlib.decompress(delta_blob))
+        if 'full' in delta:
+            return _index_blocks(delta['full'])
+        for block_id in delta['remove']:
+            blocks.pop(block_id, None)
+        for block_id, block in delta['add']:
+            blocks[block_id] = block
+        return blocks
+
+    def _replay_chain(self, chain: List[Tuple]) -> 'OrderedDict[str, Dict]':
+        blocks: 'OrderedDict[str, Dict]' = OrderedDict()
+        for _, _, delta in chain:
+            blocks = self._apply(blocks, delta)
+        return blocks
+
+    @staticmethod
+    def _restore(payload: bytes, meta: Optional[bytes], blocks: 'OrderedDict[str, Dict]') -> Dict:
+        base = json.loads(payload)
+        if meta:
+            base.update(json.loads(meta))
+        return join_blocks(base, list(blocks.values()))
+
+    def history(self, date: str, since: Optional[float] = None, until: Optional[float] = None,
+                kind: str = INITIALIZE) -> Iterator[Tuple[float, object]]:
+        """
+        Снимки даты за период (включительно) в порядке загрузки
+
+        Для initialize возвращаются восстановленные данные: цепочка дельт
+        применяется один раз на весь диапазон, а не заново для каждого снимка.
+        Для остальных видов - текст.
+
+        Yields:
+            (fetched_at, данные)
+        """
+        query = "SELECT id, parent, delta, fetched_at, object, meta FROM snapshots WHERE date = ? AND kind = ?"
+        params: List = [date, kind]
+        if since is not None:
+            query += " AND fetched_at >= ?"
+            params.append(since)
+        if until is not None:
+            query += " AND fetched_at <= ?"
+            params.append(until)
+        query += " ORDER BY id"
+
+        blocks: 'OrderedDict[str, Dict]' = OrderedDict()
+        last_id = None
+        rows = self._connection().execute(query, params).fetchall()
+        for snapshot_id, parent, delta, fetched_at, digest, meta in rows:
+            payload = self._get_object(digest)
+            if delta is None:
+                yield fetched_at, payload.decode('utf-8')
+                continue
+            if parent is None or parent == last_id:
+                blocks = self._apply(blocks, delta)
+            else:
+                blocks = self._replay_chain(self._chain(snapshot_id))
+            last_id = snapshot_id
+            yield fetched_at, self._restore(payload, meta, blocks)
+
+    def get(self, date: str, at: Optional[float] = None, kind: str = INITIALIZE) -> Optional[object]:
+        """Последний снимок даты на момент at (по умолчанию - самый свежий)"""
+        query = "SELECT id, delta, object, meta FROM snapshots WHERE date = ? AND kind = ?"
+        params: List = [date, kind]
+        if at is not None:
+            query += " AND fetched_at <= ?"
+            params.append(at)
+        row = self._connection().execute(query + " ORDER BY fetched_at DESC, id DESC LIMIT 1", params).fetchone()
+        if row is None:
+            return None
+        snapshot_id, delta, digest, meta = row
+        payload = self._get_object(digest)
+        if delta is None:
+            return payload.decode('utf-8')
+        return self._restore(payload, meta, self._replay_chain(self._chain(snapshot_id)))
+
+    def dates(self, kind: str = INITIALIZE) -> List[str]:
+        rows = self._connection().execute(
+            "SELECT DISTINCT date FROM snapshots WHERE kind = ? ORDER BY date", (kind,))
+        return [row[0] for row in rows]
+
+    def stats(self) -> Dict[str, int]:
+        """Снимков, объектов, байт до сжатия и на диске"""
+        connection = self._connection()
+        snapshots, deltas = connection.execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(delta)), 0) + COALESCE(SUM(LENGTH(meta)), 0) "
+            "FROM snapshots").fetchone()
+        objects, raw, stored = connection.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(LENGTH(data)), 0) FROM objects").fetchone()
+        return {'snapshots': snapshots, 'objects': objects, 'object_bytes': raw,
+                'stored_bytes': stored + deltas}
+
+
+_shared_store = None
+_store_lock = threading.Lock()
+
+
+def get_snapshot_store() -> SnapshotStore:
+    """Возвращает общее для процесса хранилище снимков"""
+    global _shared_store
+    with _store_lock:
+        if _shared_store is None:
+            _shared_store = SnapshotStore()
+        return _shared_store
+
+
+def main():
+    """
+    Сводка по истории снимков или история одной даты
+
+    Использование: python snapshot_store.py [дата]
+    """
+    from poll_policy import block_keys
+
+    print("🎾 ИСТОРИЯ СНИМКОВ РАСПИСАНИЯ")
+    print("=" * 60)
+
+    store = get_snapshot_store()
+    stats = store.stats()
+    print(f"🗄️ База: {store.path}")
+    print(f"📸 Снимков: {stats['snapshots']}, объектов: {stats['objects']}")
+    print(f"💾 Объекты до сжатия: {stats['object_bytes'] / 1024:.1f} КБ, "
+          f"на диске: {stats['stored_bytes'] / 1024:.1f} КБ")
+
+    if len(sys.argv) < 2:
+        for date in store.dates():
+            print(f"  📅 {date}")
+        return
+
+    date = sys.argv[1]
+    previous = None
+    for fetched_at, data in store.history(date):
+        keys = set(block_keys(data))
+        moment = datetime.fromtimestamp(fetched_at).strftime('%d.%m %H:%M:%S')
+        if previous is None:
+            print(f"  {moment}: {len(keys)} броней")
+        elif keys != previous:
+            print(f"  {moment}: +{len(keys - previous)} -{len(previous - keys)}")
+        previous = keys
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
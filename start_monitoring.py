@@ -9,6 +9,9 @@ import os
 import time
 from datetime import datetime
 
+# Один процесс: отложенные запросы и слоты на завтра (monitor_daemon.py)
+MONITOR_SCRIPT = 'monitor_daemon.py'
+
 def start_monitoring():
     """Запуск мониторинга в фоновом режиме"""
     print("🚀 ЗАПУСК АВТОМАТИЧЕСКОГО МОНИТОРИНГА")
@@ -17,13 +20,13 @@ def start_monitoring():
     # Проверяем, не запущен ли уже мониторинг
     try:
         result = subprocess.run(['ps', 'aux'], capture_output=True, text=True)
-        if 'auto_monitor_requests.py' in result.stdout:
+        if MONITOR_SCRIPT in result.stdout:
             print("⚠️ Мониторинг уже запущен")
             
             # Показываем PID
             lines = result.stdout.split('\n')
             for line in lines:
-                if 'auto_monitor_requests.py' in line and 'grep' not in line:
+                if MONITOR_SCRIPT in line and 'grep' not in line:
                     parts = line.split()
                     if len(parts) > 1:
                         pid = parts[1]
@@ -32,7 +35,7 @@ def start_monitoring():
             
             choice = input("Остановить текущий мониторинг и запустить новый? (y/n): ").strip().lower()
             if choice == 'y':
-                subprocess.run(['pkill', '-f', 'auto_monitor_requests.py'])
+                subprocess.run(['pkill', '-f', MONITOR_SCRIPT])
                 print("🛑 Старый мониторинг остановлен")
                 time.sleep(2)
             else:
@@ -47,7 +50,7 @@ def start_monitoring():
     try:
         # Запускаем с nohup для работы в фоне
         process = subprocess.Popen([
-            'nohup', 'python', 'auto_monitor_requests.py'
+            'nohup', 'python', MONITOR_SCRIPT
         ], stdout=open('monitoring.log', 'w'), stderr=subprocess.STDOUT)
         
         print(f"✅ Мониторинг запущен!")
@@ -59,11 +62,12 @@ def start_monitoring():
         print(f"  • Проверяет отложенные запросы каждые 2 часа")
         print(f"  • Автоматически выполняет бронирование, когда дата становится доступна")
         print(f"  • Отправляет уведомления о результатах")
+        print(f"  • Проверяет свободные слоты на завтра с адаптивной частотой (poll_policy.py)")
         
         print(f"\n🔍 КОМАНДЫ ДЛЯ УПРАВЛЕНИЯ:")
-        print(f"  • Проверить статус: ps aux | grep auto_monitor_requests")
+        print(f"  • Проверить статус: ps aux | grep {MONITOR_SCRIPT}")
         print(f"  • Посмотреть лог: tail -f monitoring.log")
-        print(f"  • Остановить: pkill -f auto_monitor_requests.py")
+        print(f"  • Остановить: pkill -f {MONITOR_SCRIPT}")
         
     except Exception as e:
         print(f"❌ Ошибка запуска: {e}")
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Живая сводка в Telegram: одно закрепленное сообщение на наблюдение
+Вместо нового сообщения на каждую проверку сообщение редактируется
+(editMessageText), и только если изменился его текст
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+import logging
+
+from telegram_dispatcher import FLUSH_TIMEOUT, TelegramDispatcher, get_telegram_dispatcher
+
+logger = logging.getLogger(__name__)
+
+STATE_FILE = 'telegram_digest.json'
+# Ограничение Telegram на текст сообщения (в UTF-16 единицах)
+MESSAGE_LIMIT = 4096
+
+
+def text_length(text: str) -> int:
+    """Длина так, как ее считает Telegram (эмодзи вне BMP - две единицы)"""
+    return len(text.encode('utf-16-le')) // 2
+
+
+def split_message(text: str, limit: int = MESSAGE_LIMIT) -> List[str]:
+    """
+    Делит текст на части не длиннее limit
+
+    Разрез идет по границам строк (HTML теги в сообщениях не переходят
+    через строку); строка длиннее limit режется по символам.
+    """
+    parts: List[str] = []
+    current, current_length = [], 0
+    for line in text.split('\n'):
+        line_length = text_length(line)
+        while line_length > limit:
+            # Очень длинная строка: сначала отдаем накопленное, потом режем строку
+            if current:
+                parts.append('\n'.join(current))
+                current, current_length = [], 0
+            cut = limit
+            while text_length(line[:cut]) > limit:
+                cut -= 1
+            parts.append(line[:cut])
+            line = line[cut:]
+            line_length = text_length(line)
+
+        added = line_length + (1 if current else 0)
+        if current and current_length + added > limit:
+            parts.append('\n'.join(current))
+            current, current_length = [line], line_length
+        else:
+            current.append(line)
+            current_length += added
+    if current:
+        parts.append('\n'.join(current))
+    return [part for part in parts if part.strip()] or ['—']
+
+
+def content_hash(text: str, parse_mode: Optional[str] = None) -> str:
+    return hashlib.sha256(f"{parse_mode}\0{text}".encode('utf-8')).hexdigest()
+
+
+class LiveDigest:
+    """
+    Закрепленные сообщения-сводки по наблюдениям
+
+    Для каждого наблюдения (например, 'monitor:2025-09-22:22:2') хранятся ID
+    его сообщений и хэши частей. update() не ждет Telegram: последний текст
+    наблюдения запоминается, а отдельный поток приводит сообщения к нему -
+    редактирует изменившиеся части, дописывает новые, удаляет лишние и
+    закрепляет первое сообщение. Одинаковый текст не вызывает Bot API вовсе.
+    Состояние сохраняется в JSON и переживает перезапуск.
+    """
+
+    def __init__(self, dispatcher: TelegramDispatcher, chat_id, state_file: Optional[str] = STATE_FILE,
+                 pin: bool = True):
+        self.dispatcher = dispatcher
+        self.chat_id = str(chat_id)
+        self.state_file = state_file
+        self.pin = pin
+        self.watches: Dict[str, Dict] = {}
+        self._desired: Dict[str, Tuple[str, Optional[str], Future]] = {}
+        self._syncing = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='telegram-digest')
+        self.edits = 0
+        self.skipped = 0
+        self.load()
+
+    def load(self):
+        if not self.state_file:
+            return
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            self.watches = state.get(self.chat_id, {})
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.warning(f"Поврежденное состояние сводок: {e}")
+
+    def save(self):
+        """Атомарно сохраняет состояние (сводки других чатов в файле сохраняются)"""
+        if not self.state_file:
+            return
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = {}
+        with self._lock:
+            state[self.chat_id] = self.watches
+            directory = os.path.dirname(os.path.abspath(self.state_file))
+            descriptor, temp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix='.json')
+            try:
+                with os.fdopen(descriptor, 'w', encoding='utf-8') as f:
+                    json.dump(state, f, ensure_ascii=False, indent=2)
+                os.replace(temp_path, self.state_file)
+            except BaseException:
+                if os.path.exists(temp_path):
+                    os.unlink(temp_path)
+                raise
+
+    def update(self, watch: str, text: str, parse_mode: Optional[str] = 'HTML') -> Future:
+        """
+        Приводит сводку наблюдения к тексту (не блокирует)
+
+        Returns:
+            Future: True - сводка актуальна, False - Telegram не принял изменения
+        """
+        digest = content_hash(text, parse_mode)
+        with self._lock:
+            known = self.watches.get(watch)
+            idle = watch not in self._desired and watch not in self._syncing
+            if known is not None and known.get('hash') == digest and idle:
+                self.skipped += 1
+                future: Future = Future()
+                future.set_result(True)
+                return future
+
+            pending = self._desired.get(watch)
+            if pending is not None:
+                # Синхронизация еще не началась - достаточно заменить текст
+                self._desired[watch] = (text, parse_mode, pending[2])
+                return pending[2]
+            future = Future()
+            self._desired[watch] = (text, parse_mode, future)
+
+        self._executor.submit(self._sync, watch)
+        return future
+
+    def _call(self, method: str, payload: Dict):
+        payload = dict(payload, chat_id=self.chat_id)
+        return self.dispatcher.call(method, payload).result(FLUSH_TIMEOUT * 2)
+
+    def _sync(self, watch: str):
+        with self._lock:
+            text, parse_mode, future = self._desired.pop(watch)
+            self._syncing.add(watch)
+            state = self.watches.setdefault(watch, {'message_ids': [], 'hashes': []})
+
+        try:
+            ok = self._apply(state, text, parse_mode)
+            if ok:
+                state['hash'] = content_hash(text, parse_mode)
+                state['updated_at'] = time.time()
+            self.save()
+            future.set_result(ok)
+        except Exception as e:
+            logger.error(f"Ошибка обновления сводки {watch}: {e}")
+            future.set_result(False)
+        finally:
+            with self._lock:
+                self._syncing.discard(watch)
+
+    def _apply(self, state: Dict, text: str, parse_mode: Optional[str]) -> bool:
+        parts = split_message(text)
+        message_ids: List[int] = state['message_ids']
+        hashes: List[str] = state['hashes']
+        ok = True
+
+        for index, part in enumerate(parts):
+            part_hash = content_hash(part, parse_mode)
+            payload = {'text': part, 'disable_web_page_preview': True}
+            if parse_mode:
+                payload['parse_mode'] = parse_mode
+
+            if index < len(message_ids):
+                if hashes[index] == part_hash:
+                    continue
+                result = self._call('editMessageText', dict(payload, message_id=message_ids[index]))
+                if result is not None:
+                    hashes[index] = part_hash
+                    self.edits += 1
+                    continue
+                # Сообщение удалено вручную или слишком старое - отправляем заново
+                logger.info(f"Сообщение {message_ids[index]} не отредактировано, отправляем новое")
+
+            result = self._call('sendMessage', payload)
+            if not result:
+                ok = False
+                break
+            if index < len(message_ids):
+                message_ids[index], hashes[index] = result['message_id'], part_hash
+            else:
+                message_ids.append(result['message_id'])
+                hashes.append(part_hash)
+            if index == 0 and self.pin:
+                self._call('pinChatMessage', {'message_id': result['message_id'], 'disable_notification': True})
+
+        if ok:
+            # Текст стал короче - лишние части удаляются
+            for message_id in message_ids[len(parts):]:
+                self._call('deleteMessage', {'message_id': message_id})
+            del message_ids[len(parts):]
+            del hashes[len(parts):]
+        return ok
+
+    def flush(self, timeout: Optional[float] = None):
+        """Ждет применения всех обновлений"""
+        self._executor.submit(lambda: None).result(timeout)
+
+
+_digests: Dict[Tuple[str, str], LiveDigest] = {}
+_digests_lock = threading.Lock()
+
+
+def get_live_digest(bot_token: str, chat_id) -> LiveDigest:
+    """Возвращает общую для процесса сводку чата"""
+    key = (bot_token, str(chat_id))
+    with _digests_lock:
+        digest = _digests.get(key)
+        if digest is None:
+            digest = _digests[key] = LiveDigest(get_telegram_dispatcher(bot_token), chat_id)
+        return digest
+
+
+def main():
+    """Обновление тестовой сводки дважды: второй раз без вызова Bot API"""
+    from datetime import datetime
+    from telegram_notifier import get_telegram_config
+
+    print("🎾 ЖИВАЯ СВОДКА TELEGRAM")
+    print("=" * 60)
+
+    config = get_telegram_config()
+    if not config:
+        print("❌ Конфигурация Telegram не найдена")
+        return
+
+    digest = get_live_digest(config['bot_token'], config['chat_id'])
+    text = f"🎾 <b>Тестовая сводка</b>\n🕐 {datetime.now().strftime('%d.%m.%Y %H:%M')}"
+    print("✅ Сводка обновлена" if digest.update('test', text).result() else "❌ Ошибка обновления")
+    digest.update('test', text).result()
+    print(f"📊 Редактирований: {digest.edits}, пропущено без изменений: {digest.skipped}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
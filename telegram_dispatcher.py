@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Фоновая очередь отправки в Telegram
+Один пул keep-alive соединений к api.telegram.org, ограничения частоты
+Bot API (на чат и общее), повтор с учетом retry_after; enqueue не блокирует
+"""
+
+import atexit
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Deque, Dict, List, Optional, Tuple
+import logging
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+API_URL = 'https://api.telegram.org'
+
+# Ограничения Bot API: около 30 сообщений в секунду всего,
+# 1 в секунду в личный чат и 20 в минуту в группу
+GLOBAL_INTERVAL = 1 / 30
+CHAT_INTERVAL = 1.0
+GROUP_INTERVAL = 3.0
+
+MAX_ATTEMPTS = 5
+BACKOFF_SECONDS = 1.0
+MAX_BACKOFF = 60.0
+REQUEST_TIMEOUT = 10
+# Сколько ждать отправки очереди при завершении процесса
+FLUSH_TIMEOUT = 30
+
+
+class Delivery:
+    """Сообщение в очереди"""
+
+    __slots__ = ('chat_id', 'method', 'payload', 'future', 'attempts')
+
+    def __init__(self, chat_id: str, method: str, payload: Dict):
+        self.chat_id = chat_id
+        self.method = method
+        self.payload = payload
+        self.future: Future = Future()
+        self.attempts = 0
+
+
+def chat_interval(chat_id) -> float:
+    """Минимальный интервал между сообщениями в чат (группы и каналы имеют отрицательный ID)"""
+    return GROUP_INTERVAL if str(chat_id).startswith('-') else CHAT_INTERVAL
+
+
+class TelegramDispatcher:
+    """
+    Очередь вызовов Bot API с одним фоновым потоком
+
+    Сообщения одного чата уходят по порядку, не чаще chat_interval; все
+    чаты вместе - не чаще GLOBAL_INTERVAL. Ответ 429 откладывает чат на
+    retry_after секунд, сетевые ошибки и 5xx повторяются с растущей паузой.
+    enqueue возвращает Future сразу: результат - поле result ответа Bot API
+    или None, если сообщение доставить не удалось (ошибка в логе).
+    """
+
+    def __init__(self, bot_token: str, api_url: str = API_URL, session: Optional[requests.Session] = None,
+                 global_interval: float = GLOBAL_INTERVAL, max_attempts: int = MAX_ATTEMPTS):
+        self.base_url = f"{api_url}/bot{bot_token}"
+        self.global_interval = global_interval
+        self.max_attempts = max_attempts
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=2)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+        self.session = session
+
+        self._pending: Dict[str, Deque[Delivery]] = {}
+        # Куча (время готовности чата, порядок, chat_id). Действительна только последняя
+        # запись чата (_scheduled[chat_id] == порядок), устаревшие пропускаются при извлечении
+        self._ready: List[Tuple[float, int, str]] = []
+        self._scheduled: Dict[str, int] = {}
+        self._chat_next: Dict[str, float] = {}
+        self._counter = itertools.count()
+        self._global_next = 0.0
+        self._in_flight = 0
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self.sent = 0
+        self.failed = 0
+
+    # --- очередь ---
+
+    def enqueue(self, chat_id, text: str, parse_mode: Optional[str] = 'HTML', **params) -> Future:
+        """Ставит sendMessage в очередь и сразу возвращает Future"""
+        payload = {'chat_id': chat_id, 'text': text}
+        if parse_mode:
+            payload['parse_mode'] = parse_mode
+        payload.update(params)
+        return self.call('sendMessage', payload)
+
+    def call(self, method: str, payload: Dict) -> Future:
+        """Ставит в очередь любой метод Bot API (payload обязательно содержит chat_id)"""
+        chat_id = str(payload['chat_id'])
+        delivery = Delivery(chat_id, method, payload)
+        with self._condition:
+            self._ensure_thread()
+            queue = self._pending.get(chat_id)
+            if queue is None:
+                queue = self._pending[chat_id] = deque()
+                self._push(chat_id)
+            queue.append(delivery)
+            self._condition.notify()
+        return delivery.future
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping = False
+            self._thread = threading.Thread(target=self._worker, name='telegram-dispatcher', daemon=True)
+            self._thread.start()
+
+    def _push(self, chat_id: str):
+        """Ставит чат в кучу по его времени готовности; прежняя запись чата устаревает"""
+        order = next(self._counter)
+        self._scheduled[chat_id] = order
+        heapq.heappush(self._ready, (self._chat_next.get(chat_id, 0.0), order, chat_id))
+
+    def _next_delivery(self) -> Optional[Delivery]:
+        """Ждет, пока первый по готовности чат и общий лимит позволят отправку"""
+        with self._condition:
+            while True:
+                while self._ready and self._scheduled.get(self._ready[0][2]) != self._ready[0][1]:
+                    heapq.heappop(self._ready)
+                if self._stopping and not self._ready:
+                    return None
+                if not self._ready:
+                    self._condition.wait()
+                    continue
+                now = time.monotonic()
+                ready_at = max(self._ready[0][0], self._global_next)
+                if ready_at > now:
+                    self._condition.wait(ready_at - now)
+                    continue
+
+                _, _, chat_id = heapq.heappop(self._ready)
+                del self._scheduled[chat_id]
+                queue = self._pending[chat_id]
+                delivery = queue.popleft()
+                if not queue:
+                    del self._pending[chat_id]
+                self._global_next = now + self.global_interval
+                self._chat_next[chat_id] = now + chat_interval(chat_id)
+                self._in_flight += 1
+                return delivery
+
+    def _reschedule(self, delivery: Delivery, delay: float):
+        """Возвращает сообщение в начало очереди чата и откладывает чат"""
+        chat_id = delivery.chat_id
+        with self._condition:
+            ready_at = time.monotonic() + delay
+            self._chat_next[chat_id] = max(self._chat_next.get(chat_id, 0.0), ready_at)
+            self._pending.setdefault(chat_id, deque()).appendleft(delivery)
+            # Если чат уже в куче со старым временем, новая запись делает ее устаревшей
+            self._push(chat_id)
+
+    def _finished(self, chat_id: str):
+        with self._condition:
+            self._in_flight -= 1
+            queue = self._pending.get(chat_id)
+            if queue and chat_id not in self._scheduled:
+                self._push(chat_id)
+            self._condition.notify_all()
+
+    # --- отправка ---
+
+    def _worker(self):
+        while True:
+            delivery = self._next_delivery()
+            if delivery is None:
+                return
+            try:
+                self._send(delivery)
+            except Exception as e:
+                logger.error(f"Ошибка очереди Telegram: {e}")
+                self._complete(delivery, None)
+            finally:
+                self._finished(delivery.chat_id)
+
+    def _send(self, delivery: Delivery):
+        delivery.attempts += 1
+        retry_after = None
+        try:
+            response = self.session.post(f"{self.base_url}/{delivery.method}", data=delivery.payload,
+                                         timeout=REQUEST_TIMEOUT)
+            try:
+                result = response.json()
+            except ValueError:
+                result = {'ok': False, 'description': response.text[:200]}
+
+            if result.get('ok'):
+                self.sent += 1
+                self._complete(delivery, result.get('result'))
+                return
+
+            if response.status_code == 429:
+                retry_after = float(result.get('parameters', {}).get('retry_after', 1))
+                logger.warning(f"Telegram: лимит для чата {delivery.chat_id}, повтор через {retry_after:.0f} с")
+            elif 'message is not modified' in str(result.get('description', '')):
+                # editMessageText с тем же текстом: сообщение уже такое, как нужно
+                self._complete(delivery, True)
+                return
+            elif response.status_code < 500:
+                # Ошибка запроса (неверный HTML, чат не найден) - повтор не поможет
+                logger.error(f"Telegram {delivery.method}: {result.get('description', response.status_code)}")
+                self.failed += 1
+                self._complete(delivery, None)
+                return
+            else:
+                logger.warning(f"Telegram {delivery.method}: HTTP {response.status_code}")
+        except requests.RequestException as e:
+            logger.warning(f"Telegram {delivery.method}: {e}")
+
+        # Ответ 429 не считается неудачной попыткой: сообщение ждет, сколько попросил сервер
+        if retry_after is not None:
+            delivery.attempts -= 1
+        elif delivery.attempts >= self.max_attempts:
+            logger.error(f"Telegram {delivery.method}: не доставлено за {delivery.attempts} попыток")
+            self.failed += 1
+            self._complete(delivery, None)
+            return
+        delay = retry_after if retry_after is not None else min(BACKOFF_SECONDS * 2 ** (delivery.attempts - 1),
+                                                                  MAX_BACKOFF)
+        self._reschedule(delivery, delay)
+
+    @staticmethod
+    def _complete(delivery: Delivery, result):
+        if not delivery.future.done():
+            delivery.future.set_result(result)
+
+    # --- управление ---
+
+    def pending(self) -> int:
+        """Сообщений в очереди и в отправке"""
+        with self._condition:
+            return sum(len(queue) for queue in self._pending.values()) + self._in_flight
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Ждет отправки всей очереди
+
+        Returns:
+            True, если очередь опустела до таймаута
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self._pending or self._in_flight:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def stop(self, timeout: Optional[float] = FLUSH_TIMEOUT):
+        """Отправляет оставшееся (не дольше timeout) и останавливает поток"""
+        self.flush(timeout)
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+
+
+_dispatchers: Dict[str, TelegramDispatcher] = {}
+_dispatchers_lock = threading.Lock()
+
+
+def get_telegram_dispatcher(bot_token: str) -> TelegramDispatcher:
+    """Возвращает общую для процесса очередь бота"""
+    with _dispatchers_lock:
+        dispatcher = _dispatchers.get(bot_token)
+        if dispatcher is None:
+            dispatcher = _dispatchers[bot_token] = TelegramDispatcher(bot_token)
+        return dispatcher
+
+
+@atexit.register
+def _flush_on_exit():
+    """Короткие скрипты завершаются сразу после enqueue - дожидаемся отправки"""
+    for dispatcher in list(_dispatchers.values()):
+        if dispatcher.pending():
+            logger.info(f"Отправка оставшихся сообщений Telegram: {dispatcher.pending()}")
+            if not dispatcher.flush(FLUSH_TIMEOUT):
+                logger.warning("Не все сообщения Telegram отправлены до завершения")
+
+
+def main():
+    """Отправка тестового сообщения через очередь (telegram_config.json или переменные окружения)"""
+    from telegram_notifier import get_telegram_config
+
+    print("🎾 ОЧЕРЕДЬ TELEGRAM")
+    print("=" * 60)
+
+    config = get_telegram_config()
+    if not config:
+        print("❌ Конфигурация Telegram не найдена")
+        return
+
+    dispatcher = get_telegram_dispatcher(config['bot_token'])
+    started = time.perf_counter()
+    future = dispatcher.enqueue(config['chat_id'], "🎾 Тест очереди уведомлений")
+    print(f"⚡ enqueue: {(time.perf_counter() - started) * 1000:.2f} мс")
+    result = future.result(FLUSH_TIMEOUT)
+    print("✅ Отправлено" if result else "❌ Не отправлено")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -4,63 +4,92 @@
 Модуль для отправки уведомлений в Telegram
 """
 
-import requests
 import json
 import logging
+from concurrent.futures import Future
 from typing import List, Dict, Optional
 from datetime import datetime, timedelta
 
-# Настройка логирования
-logging.basicConfig(level=logging.INFO)
+from telegram_dispatcher import FLUSH_TIMEOUT, get_telegram_dispatcher
+from telegram_digest import get_live_digest
+
 logger = logging.getLogger(__name__)
 
 class TelegramNotifier:
-    def __init__(self, bot_token: str, chat_id: str):
+    def __init__(self, bot_token: str, chat_id: str, live_digest: bool = False):
         """
         Инициализация Telegram уведомлений
         
         Args:
             bot_token: Токен Telegram бота
             chat_id: ID чата для отправки сообщений
+            live_digest: Сводки (publish) редактируют одно закрепленное сообщение
+                         на наблюдение вместо отправки нового
         """
         self.bot_token = bot_token
         self.chat_id = chat_id
-        self.base_url = f"https://api.telegram.org/bot{bot_token}"
+        # Общая очередь бота: пул соединений, лимиты Bot API, повторы в фоне
+        self.dispatcher = get_telegram_dispatcher(bot_token)
+        self.base_url = self.dispatcher.base_url
+        self.digest = get_live_digest(bot_token, chat_id) if live_digest else None
         
-    def send_message(self, text: str, parse_mode: str = "HTML") -> bool:
+    def send_message(self, text: str, parse_mode: str = "HTML", wait: bool = False) -> bool:
         """
-        Отправляет сообщение в Telegram
+        Отправляет сообщение в Telegram через фоновую очередь
         
         Args:
             text: Текст сообщения
             parse_mode: Режим парсинга (HTML или Markdown)
+            wait: Дождаться доставки (по умолчанию только поставить в очередь,
+                  мониторинг и бронирование не ждут Telegram)
             
         Returns:
-            True если сообщение отправлено успешно
+            True если сообщение поставлено в очередь (при wait - доставлено)
         """
         try:
-            url = f"{self.base_url}/sendMessage"
-            data = {
-                'chat_id': self.chat_id,
-                'text': text,
-                'parse_mode': parse_mode
-            }
-            
-            response = requests.post(url, data=data, timeout=10)
-            response.raise_for_status()
+            future = self.dispatcher.enqueue(self.chat_id, text, parse_mode)
+            if not wait:
+                return True
             
-            result = response.json()
-            if result.get('ok'):
+            if future.result(FLUSH_TIMEOUT) is not None:
                 logger.info("Сообщение успешно отправлено в Telegram")
                 return True
-            else:
-                logger.error(f"Ошибка отправки в Telegram: {result}")
-                return False
+            return False
                 
         except Exception as e:
             logger.error(f"Ошибка при отправке сообщения в Telegram: {e}")
             return False
     
+    def enqueue_message(self, text: str, parse_mode: str = "HTML") -> Future:
+        """
+        Ставит сообщение в очередь и возвращает Future доставки
+        
+        Результат Future - None, если сообщение так и не доставлено (для
+        отправителей, которым нужно узнать о неудаче без ожидания).
+        """
+        return self.dispatcher.enqueue(self.chat_id, text, parse_mode)
+    
+    def publish(self, text: str, watch: str, parse_mode: str = "HTML", wait: bool = False) -> bool:
+        """
+        Публикует сводку наблюдения
+        
+        В режиме живой сводки сообщение наблюдения редактируется (и только
+        если текст изменился), иначе отправляется новое сообщение.
+        
+        Args:
+            text: Текст сводки
+            watch: Ключ наблюдения (например, 'monitor:2025-09-22:22:2')
+            parse_mode: Режим парсинга
+            wait: Дождаться применения
+        """
+        if self.digest is None:
+            return self.send_message(text, parse_mode, wait)
+        
+        future = self.digest.update(watch, text, parse_mode)
+        if not wait:
+            return True
+        return bool(future.result(FLUSH_TIMEOUT * 2))
+    
     def send_tennis_slots_notification(self, slots: List[Dict], date: str, court_type: str = None, time_filter: str = None) -> bool:
         """
         Отправляет уведомление о свободных теннисных слотах
@@ -74,19 +103,20 @@ class TelegramNotifier:
         Returns:
             True если уведомление отправлено успешно
         """
+        watch = f"slots:{date}:{court_type or ''}:{time_filter or ''}"
         if not slots:
-            return self.send_message(f"❌ Свободных слотов не найдено на {date}")
+            return self.publish(f"❌ Свободных слотов не найдено на {date}", watch)
         
         # Фильтруем слоты по типу корта и времени
         filtered_slots = self._filter_slots(slots, court_type, time_filter)
         
         if not filtered_slots:
-            return self.send_message(f"❌ Свободных слотов {court_type} в {time_filter} не найдено на {date}")
+            return self.publish(f"❌ Свободных слотов {court_type} в {time_filter} не найдено на {date}", watch)
         
         # Формируем сообщение
         message = self._format_slots_message(filtered_slots, date, court_type, time_filter)
         
-        return self.send_message(message)
+        return self.publish(message, watch)
     
     def _filter_slots(self, slots: List[Dict], court_type: str = None, time_filter: str = None) -> List[Dict]:
         """
@@ -178,7 +208,7 @@ class TelegramNotifier:
         """
         try:
             url = f"{self.base_url}/getMe"
-            response = requests.get(url, timeout=10)
+            response = self.dispatcher.session.get(url, timeout=10)
             response.raise_for_status()
             
             result = response.json()
@@ -253,6 +283,7 @@ def create_telegram_config_template():
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     # Тестирование модуля
     config = get_telegram_config()
     
@@ -267,7 +298,7 @@ if __name__ == "__main__":
             
             # Тестовое сообщение
             test_message = "🎾 Тест уведомлений теннисного монитора\n✅ Система работает корректно"
-            if notifier.send_message(test_message):
+            if notifier.send_message(test_message, wait=True):
                 print("✅ Тестовое сообщение отправлено")
             else:
                 print("❌ Ошибка отправки тестового сообщения")
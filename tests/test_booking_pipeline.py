@@ -0,0 +1,38 @@
+"""Конвейер не кодирует заявку без CSRF токена"""
+
+import pytest
+
+from booking_pipeline import BookingPipeline
+
+COURT = {'court_id': 4, 'court_number': 4, 'time_from': 22, 'time_to': 0, 'date': '2099-01-01'}
+
+
+class StubBooking:
+    def __init__(self, tokens):
+        self.tokens = list(tokens)
+        self.fetched = 0
+
+    def get_csrf_token(self, date):
+        self.fetched += 1
+        return self.tokens.pop(0) if self.tokens else None
+
+    def prepare_submission(self, court, test_mode, csrf_token):
+        form_data = {'court_id': court['court_id']}
+        if csrf_token:
+            form_data['_token'] = csrf_token
+        return 'https://example.invalid/order', form_data, {}
+
+
+def test_missing_token_raises_instead_of_encoding():
+    pipeline = BookingPipeline(StubBooking([]))
+    with pytest.raises(RuntimeError):
+        pipeline.prebuild([COURT])
+    assert pipeline.prepared([COURT]) == []
+
+
+def test_token_is_fetched_on_a_cache_miss():
+    booking = StubBooking([None, 'fresh'])
+    pipeline = BookingPipeline(booking)
+    [(court, (url, body, headers))] = pipeline.prebuild([COURT])
+    assert b'_token=fresh' in body
+    assert booking.fetched == 2
@@ -0,0 +1,48 @@
+"""BookingRace против локального StandInOrderServer: не больше одного корта"""
+
+from booking_race import BookingRace, StandInOrderServer
+from final_auto_booking import FinalAutoBooking
+
+DATE = '2025-09-22'
+
+
+def make_courts(*court_ids):
+    return [{'court_id': court_id, 'court_number': court_id, 'court_type': 'Грунт', 'inflate_id': 2,
+             'time_from': 22, 'time_to': 0, 'date': DATE} for court_id in court_ids]
+
+
+def race_on(server, **kwargs):
+    race = BookingRace(server.attach(FinalAutoBooking()), top_n=3, **kwargs)
+    prepared = race.prepare(DATE, courts=make_courts(5, 4, 6), preferred_courts=(4, 5, 6))
+    return race, race.run(prepared)
+
+
+def test_default_race_books_one_preferred_court():
+    with StandInOrderServer(delay=0.01) as server:
+        race, (success, _, winner) = race_on(server)
+
+    assert success
+    assert winner['court_number'] == 4
+    assert len(server.orders) == 1
+    assert [result['status'] for result in race.results] == ['won', 'skipped', 'skipped']
+
+
+def test_default_race_falls_back_after_refusal():
+    with StandInOrderServer(delay=0.01, taken={4}) as server:
+        race, (success, _, winner) = race_on(server)
+
+    assert success
+    assert winner['court_number'] == 5
+    assert len(server.orders) == 1
+    assert [result['status'] for result in race.results] == ['lost', 'won', 'skipped']
+
+
+def test_hedged_race_keeps_best_ranked_and_cancels_surplus():
+    with StandInOrderServer(delay=0.01) as server:
+        race, (success, _, winner) = race_on(server, stagger=0.0, cancel=server.cancel)
+
+    assert success
+    assert winner['court_number'] == 4
+    assert len(server.orders) == 1
+    assert race.results[0]['status'] == 'won'
+    assert all(result['status'] in ('cancelled', 'skipped') for result in race.results[1:])
@@ -0,0 +1,58 @@
+"""NotificationCoalescer: при неудачной отправке события не подавляются"""
+
+from concurrent.futures import Future
+
+import pytest
+
+from notification_coalescer import NotificationCoalescer, NotifiedIndex
+from schedule_diff import SLOT_FREED, ScheduleEvent
+
+DATE = '2099-01-01'
+
+
+def freed(*cells):
+    return [ScheduleEvent(SLOT_FREED, DATE, 4, cell) for cell in cells]
+
+
+@pytest.fixture
+def index(tmp_path):
+    return NotifiedIndex(str(tmp_path / 'notified.db'))
+
+
+def deliver_twice(index, first):
+    """Первая отправка - first(), вторая успешная; возвращает размеры отправленных пачек"""
+    calls = []
+
+    def send(watch, date, events):
+        calls.append(len(events))
+        return first() if len(calls) == 1 else None
+
+    coalescer = NotificationCoalescer(send, window=60, index=index)
+    for _ in range(2):
+        coalescer.add('watch', DATE, freed(30, 31))
+        coalescer.flush('watch', DATE)
+    return calls
+
+
+def test_sent_events_are_suppressed(index):
+    assert deliver_twice(index, lambda: None) == [2]
+
+
+def test_keys_released_when_send_raises(index):
+    def fail():
+        raise RuntimeError('telegram down')
+
+    assert deliver_twice(index, fail) == [2, 2]
+
+
+def test_keys_released_when_send_returns_false(index):
+    assert deliver_twice(index, lambda: False) == [2, 2]
+
+
+def test_keys_released_when_delivery_future_fails(index):
+    def undelivered():
+        future = Future()
+        future.set_result(None)
+        return future
+
+    assert deliver_twice(index, undelivered) == [2, 2]
@@ -0,0 +1,113 @@
+"""Сетка занятости и другие представления time_blocked дают одинаковую занятость"""
+
+import pytest
+
+from final_monitor import FinalTennisMonitor
+from occupancy import CELL_COUNT, CELL_SECONDS, DAY_START_SECONDS, OccupancyGrid, is_blocking
+
+
+def moment(seconds):
+    return {'value': f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:00", 'totalSeconds': seconds,
+            'hours': seconds // 3600, 'minutes': seconds % 3600 // 60}
+
+
+def cell_time(cell):
+    return moment(DAY_START_SECONDS + cell * CELL_SECONDS)
+
+
+def booking(booking_id, court_id, start_cell, end_cell, **fields):
+    entry = {'id': booking_id, 'court_id': court_id,
+             'time_from': cell_time(start_cell), 'time_to': cell_time(end_cell)}
+    entry.update(fields)
+    return entry
+
+
+BOOKINGS = [
+    booking(1, 4, 0, 4),
+    booking(2, 4, 26, 30, deleted_at='2099-01-01 10:00:00'),
+    booking(3, 5, 26, 30, deleted_at='2099-01-01 10:00:00', delete_sharing=1),
+    booking(4, 5, 30, 34),
+    booking(5, 6, 10, 12, deleted_at=None),
+]
+
+
+def schedule(bookings=BOOKINGS):
+    return {'instructions': {'set': {
+        'court_types': [{'name': 'Грунт', 'label': 'grunt', 'courts': [
+            {'id': court_id, 'number': court_id, 'inflate_id': 2} for court_id in (4, 5, 6)]}],
+        'time_list': [{'time_from': cell_time(cell), 'time_to': cell_time(cell + 1)} for cell in range(CELL_COUNT)],
+        'time_blocked': list(bookings),
+    }}}
+
+
+def ranges_masks(data):
+    masks = {}
+    for court_id, start_cell, end_cell in FinalTennisMonitor().extract_occupied_ranges(data):
+        for cell in range(start_cell, end_cell):
+            masks[court_id] = masks.get(court_id, 0) | 1 << cell
+    return masks
+
+
+def grid_masks(data):
+    return {court_id: mask for court_id, mask in OccupancyGrid.from_data(data).masks.items() if mask}
+
+
+@pytest.mark.parametrize('entry, expected', [
+    ({}, True),
+    ({'deleted_at': '2099-01-01'}, False),
+    ({'deleted_at': '2099-01-01', 'delete_sharing': 1}, True),
+    ({'deleted_at': None, 'delete_sharing': 0}, True),
+])
+def test_is_blocking_matches_app_js(entry, expected):
+    assert is_blocking(entry) is expected
+
+
+def test_grid_and_occupied_ranges_agree():
+    data = schedule()
+    masks = grid_masks(data)
+    assert masks == ranges_masks(data)
+    # Удаленная бронь на корте 4 вечером не занимает, удаленная доля совместной на корте 5 - занимает
+    assert not masks[4] >> 26 & 1
+    assert masks[5] >> 26 & 1
+
+
+def cube_masks(cube, date_index=0):
+    if cube.backend == 'numpy':
+        rows = [sum(1 << int(cell) for cell in row.nonzero()[0]) for row in cube.occupied[date_index]]
+    else:
+        rows = cube.masks[date_index]
+    return {cube.courts[index]['court_id']: mask for index, mask in enumerate(rows) if mask}
+
+
+def test_cube_agrees_with_grid_and_occupied_ranges():
+    from occupancy_cube import OccupancyCube
+
+    data = schedule()
+    cube = OccupancyCube({'2099-01-01': data}, backend='python')
+    assert cube_masks(cube) == grid_masks(data) == ranges_masks(data)
+
+
+def test_cube_find_adjacent_matches_loops():
+    from occupancy_cube import OccupancyCube, find_adjacent_loops
+
+    schedules = {'2099-01-01': schedule()}
+    cube = OccupancyCube(schedules, backend='python')
+    for hour in (7, 10, 12, 15):
+        found = {date: [item['courts'] for item in items] for date, items in cube.find_adjacent(hour, 60).items()}
+        assert found == find_adjacent_loops(schedules, hour, 60)
+
+
+def test_numpy_cube_matches_python_fallback():
+    pytest.importorskip('numpy')
+    from occupancy_cube import OccupancyCube, synthetic_horizon
+
+    schedules = synthetic_horizon(30, template=schedule())
+    schedules['2099-01-01'] = schedule()
+    python_cube = OccupancyCube(schedules, backend='python')
+    numpy_cube = OccupancyCube(schedules, backend='numpy')
+
+    for date_index in range(len(python_cube.dates)):
+        assert cube_masks(numpy_cube, date_index) == cube_masks(python_cube, date_index)
+    for start, duration in ((7, 60), (20, 120), ('18:30', 90)):
+        assert numpy_cube.find_adjacent(start, duration, latest_start=22) == \
+            python_cube.find_adjacent(start, duration, latest_start=22)
@@ -0,0 +1,35 @@
+"""PollPolicy пишет историю периодически и считает открытие бронирования по часам сервера"""
+
+import os
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from booking_sniper import ServerClock
+from poll_policy import RELEASE_FACTOR, RELEASE_HOUR, PollPolicy
+
+
+def server_clock(tz='Europe/Moscow'):
+    clock = ServerClock()
+    clock.tz = tz
+    return clock
+
+
+def test_observe_does_not_rewrite_history_every_poll(tmp_path):
+    path = str(tmp_path / 'poll_history.json')
+    policy = PollPolicy(path, clock=server_clock(), save_interval=3600)
+    for index in range(5):
+        policy.observe('2099-01-01', {'instructions': {'set': {'time_blocked': []}}}, now=1000.0 + index)
+    assert not os.path.exists(path)
+
+    policy.save()
+    assert PollPolicy(path, clock=server_clock()).dates['2099-01-01']['seen'] == 1004.0
+
+
+def test_release_hour_uses_server_time_zone():
+    release = datetime(2099, 1, 1, RELEASE_HOUR, 5, tzinfo=ZoneInfo('Europe/Moscow')).timestamp()
+    moscow = PollPolicy(None, clock=server_clock('Europe/Moscow'))
+    tokyo = PollPolicy(None, clock=server_clock('Asia/Tokyo'))
+
+    assert moscow.moment(release).hour == RELEASE_HOUR
+    assert moscow.weight('2099-01-02', release) == moscow.churn('2099-01-02', release) * 4.0 * RELEASE_FACTOR
+    assert tokyo.weight('2099-01-02', release) < moscow.weight('2099-01-02', release)
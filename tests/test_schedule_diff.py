@@ -0,0 +1,70 @@
+"""ScheduleDiff.update: дельты polling дают те же события, что полное сравнение"""
+
+import copy
+
+from schedule_diff import ScheduleDiff
+from schedule_sync import IncrementalScheduleSync
+
+DATE = '2099-01-01'
+
+
+def blocked(booking_id, court_id, hour_from, hour_to):
+    return {'id': booking_id, 'court_id': court_id,
+            'time_from': {'hours': hour_from, 'minutes': 0}, 'time_to': {'hours': hour_to, 'minutes': 0}}
+
+
+INITIAL = {
+    'instructions': {'set': {
+        'court_types': [{'name': 'Грунт', 'courts': [{'id': 4, 'number': 4}, {'id': 5, 'number': 5}]}],
+        'time_blocked': [blocked(1, 4, 22, 24), blocked(2, 5, 20, 22)],
+    }},
+    'polling': {'timestamp': 100},
+}
+
+
+class PollingClient:
+    def __init__(self, responses):
+        self.responses = list(responses)
+
+    def get_schedule(self, date, fresh=False):
+        return copy.deepcopy(INITIAL)
+
+    def get_polling(self, date, timestamp):
+        return self.responses.pop(0)
+
+
+def test_update_applies_polling_delta():
+    client = PollingClient([
+        {'instructions': {}, 'polling': {'timestamp': 101}},
+        {'instructions': {'delete': {'time_blocked': [{'id': 1}]}}, 'polling': {'timestamp': 102}},
+        {'instructions': {'add': {'time_blocked': [blocked(3, 4, 23, 24)]},
+                          'update': {'time_blocked': [blocked(2, 5, 21, 23)]}},
+         'polling': {'timestamp': 103}},
+    ])
+    sync = IncrementalScheduleSync(client)
+    incremental, full = ScheduleDiff(changes=sync), ScheduleDiff()
+    full_compares = []
+    diff = incremental.diff
+    incremental.diff = lambda date, data: full_compares.append(date) or diff(date, data)
+
+    for tick in range(4):
+        data = sync.get_schedule(DATE)
+        if tick == 1:
+            # Обработчик вызывается не на каждом опросе: дельта накапливается
+            continue
+        events = incremental.update(DATE, data)
+        assert sorted(map(repr, events)) == sorted(map(repr, full.diff(DATE, data)))
+
+    assert full_compares == [DATE]
+
+
+def test_update_resyncs_when_log_does_not_cover():
+    sync = IncrementalScheduleSync(PollingClient([]))
+    data = sync.get_schedule(DATE)
+    schedule_diff = ScheduleDiff(changes=sync)
+    stale = copy.deepcopy(INITIAL)
+    stale['polling']['timestamp'] = 50
+    schedule_diff.baseline(DATE, stale)
+
+    assert schedule_diff.update(DATE, data) == []
+    assert schedule_diff.state(DATE).timestamp == 100
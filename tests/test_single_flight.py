@@ -0,0 +1,47 @@
+"""Область SingleFlight.scope действует только в своем потоке и очищается при выходе"""
+
+import threading
+
+from single_flight import SingleFlight
+
+
+class Loader:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return {'call': self.calls}
+
+
+def test_scope_reuses_results_until_exit():
+    flight, load = SingleFlight(), Loader()
+    with flight.scope():
+        first = flight.do('2099-01-01', load)
+        with flight.scope():
+            assert flight.do('2099-01-01', load) is first
+        assert flight.do('2099-01-01', load) is first
+    assert flight.do('2099-01-01', load) is not first
+    assert load.calls == 2
+
+
+def test_scope_is_not_shared_with_other_threads():
+    flight, load = SingleFlight(), Loader()
+    entered, done = threading.Event(), threading.Event()
+
+    def hold_scope():
+        with flight.scope():
+            flight.do('2099-01-01', load)
+            entered.set()
+            done.wait(5)
+
+    worker = threading.Thread(target=hold_scope)
+    worker.start()
+    try:
+        assert entered.wait(5)
+        flight.do('2099-01-01', load)
+        flight.do('2099-01-01', load)
+        assert load.calls == 3
+    finally:
+        done.set()
+        worker.join(5)
@@ -0,0 +1,43 @@
+"""SnapshotStore: одинаковые расписания хранятся один раз"""
+
+import json
+
+from schedule_view import LazySchedule
+from snapshot_store import SnapshotStore
+
+DATE = '2099-01-01'
+
+
+def schedule(timestamp, blocked=()):
+    return {
+        'instructions': {'set': {
+            'court_types': [{'name': 'Грунт', 'label': 'grunt', 'courts': [{'id': 4, 'number': 4}]}],
+            'time_blocked': [{'id': booking_id, 'court_id': 4,
+                              'time_from': {'hours': 22, 'minutes': 0},
+                              'time_to': {'hours': 23, 'minutes': 0}} for booking_id in blocked],
+        }},
+        'polling': {'timestamp': timestamp},
+        'execute': f"0,{timestamp}s",
+    }
+
+
+def test_identical_schedules_share_one_object(tmp_path):
+    store = SnapshotStore(str(tmp_path / 'snapshots.db'))
+    for index in range(20):
+        store.put(DATE, schedule(1757944938 + index, blocked=[1]), fetched_at=1000 + index)
+
+    stats = store.stats()
+    assert stats['snapshots'] == 20
+    assert stats['objects'] == 1
+
+    history = list(store.history(DATE))
+    assert [data['polling']['timestamp'] for _, data in history] == [1757944938 + i for i in range(20)]
+    assert store.get(DATE) == schedule(1757944957, blocked=[1])
+
+
+def test_lazy_schedule_is_accepted(tmp_path):
+    store = SnapshotStore(str(tmp_path / 'snapshots.db'))
+    data = schedule(1757944938, blocked=[1, 2])
+    store.put(DATE, LazySchedule(json.dumps(data, ensure_ascii=False)))
+
+    assert store.get(DATE) == data
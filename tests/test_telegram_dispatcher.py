@@ -0,0 +1,50 @@
+"""Повтор после 429 сохраняет порядок сообщений чата и не оставляет чат в куче дважды"""
+
+import threading
+
+import telegram_dispatcher
+from telegram_dispatcher import TelegramDispatcher
+
+
+class Response:
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self.body = body
+        self.text = str(body)
+
+    def json(self):
+        return self.body
+
+
+class LimitedSession:
+    """Первый запрос каждого чата получает 429 с retry_after=0"""
+
+    def __init__(self):
+        self.limited = set()
+        self.delivered = []
+        self.lock = threading.Lock()
+
+    def post(self, url, data, timeout):
+        with self.lock:
+            if data['chat_id'] not in self.limited:
+                self.limited.add(data['chat_id'])
+                return Response(429, {'ok': False, 'parameters': {'retry_after': 0}})
+            self.delivered.append((data['chat_id'], data['text']))
+        return Response(200, {'ok': True, 'result': {'text': data['text']}})
+
+
+def test_retry_after_keeps_order_and_one_live_entry_per_chat(monkeypatch):
+    monkeypatch.setattr(telegram_dispatcher, 'CHAT_INTERVAL', 0.0)
+    session = LimitedSession()
+    dispatcher = TelegramDispatcher('token', session=session, global_interval=0.0)
+
+    futures = [dispatcher.enqueue(chat_id, f"{chat_id}-{index}")
+               for index in range(3) for chat_id in ('1', '2')]
+    assert dispatcher.flush(5)
+    dispatcher.stop(0)
+
+    assert all(future.result(1) for future in futures)
+    for chat_id in ('1', '2'):
+        assert [text for chat, text in session.delivered if chat == chat_id] == \
+            [f"{chat_id}-{index}" for index in range(3)]
+    assert dispatcher._scheduled == {}
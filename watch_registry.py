@@ -0,0 +1,429 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Реестр наблюдений: диапазон дат, покрытие, окно начала, длительность, действие
+Наблюдения проиндексированы по дате и ячейкам окна: одна загрузка даты
+проверяет все подходящие наблюдения, а не отдельный скрипт на каждое
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+import logging
+
+from availability_query import AvailabilityQuery, SURFACES, expand_dates, parse_time
+from occupancy import CELL_SECONDS, OccupancyGrid
+from notification_coalescer import NotificationCoalescer
+from schedule_diff import SLOT_FREED, ScheduleDiff, ScheduleEvent
+from telegram_notifier import TelegramNotifier, get_telegram_config
+
+logger = logging.getLogger(__name__)
+
+WATCHES_FILE = 'watches.json'
+
+NOTIFY = 'notify'
+BOOK = 'book'
+ACTIONS = (NOTIFY, BOOK)
+
+# Обработчик действия: (наблюдение, дата, найденные варианты)
+Handler = Callable[['Watch', str, List[Dict]], Any]
+
+
+class Watch:
+    """Наблюдение за свободными кортами"""
+
+    __slots__ = ('id', 'name', 'date_from', 'date_to', 'surfaces', 'start_from', 'start_to',
+                 'min_duration', 'action', 'test_mode', 'status', 'created_at', 'checked')
+
+    FIELDS = __slots__
+
+    def __init__(self, date_from: str, date_to: Optional[str] = None, surfaces: Iterable[str] = (),
+                 start_from: str = '07:00', start_to: Optional[str] = None, min_duration: int = 60,
+                 action: str = NOTIFY, name: str = '', test_mode: bool = True, id: Optional[int] = None,
+                 status: str = 'active', created_at: Optional[str] = None, checked: Iterable[str] = ()):
+        """
+        Args:
+            date_from, date_to: Даты YYYY-MM-DD включительно (date_to по умолчанию = date_from)
+            surfaces: Покрытия ('grunt', 'hard', 'Грунт' ...), пусто - любые
+            start_from, start_to: Допустимое начало 'HH:MM' включительно (start_to по умолчанию = start_from)
+            min_duration: Минимальная длительность в минутах (для book - точная)
+            action: 'notify' - уведомить, 'book' - забронировать первый вариант
+            test_mode: Тестовый режим оплаты для book
+            checked: Даты, по которым наблюдение уже проверено целиком (дальше - только по изменениям)
+        """
+        if action not in ACTIONS:
+            raise ValueError(f"Неизвестное действие: {action}")
+        self.id = id
+        self.name = name
+        self.date_from = date_from
+        self.date_to = date_to or date_from
+        self.surfaces = [surface.lower() for surface in surfaces]
+        self.start_from = start_from
+        self.start_to = start_to or start_from
+        self.min_duration = int(min_duration)
+        self.action = action
+        self.test_mode = test_mode
+        self.status = status
+        self.created_at = created_at or datetime.now().isoformat()
+        self.checked = sorted(checked)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Watch':
+        return cls(**{field: data[field] for field in cls.FIELDS if field in data})
+
+    def to_dict(self) -> Dict:
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    def dates(self) -> List[str]:
+        return expand_dates((self.date_from, self.date_to))
+
+    def cells(self, grid: OccupancyGrid) -> range:
+        """Ячейки, которые может занять подходящий вариант: от первого начала до конца последнего"""
+        first = max(0, grid.cell_at(parse_time(self.start_from)))
+        last = grid.cell_at(parse_time(self.start_to)) + -(-self.min_duration * 60 // CELL_SECONDS)
+        return range(first, min(grid.cell_count, last))
+
+    def describe(self) -> str:
+        surfaces = ', '.join(SURFACES.get(surface, surface) for surface in self.surfaces) or 'любое покрытие'
+        dates = self.date_from if self.date_from == self.date_to else f"{self.date_from}..{self.date_to}"
+        starts = self.start_from if self.start_from == self.start_to else f"{self.start_from}-{self.start_to}"
+        return f"#{self.id} {dates} {surfaces}, начало {starts}, от {self.min_duration} мин, {self.action}"
+
+
+class WatchRegistry:
+    """
+    Наблюдения с индексами дата -> ячейка -> наблюдения
+
+    on_fetch(date, data) вызывается один раз на загрузку даты. Новое
+    наблюдение проверяется по дате целиком один раз (дата попадает в
+    checked); дальше schedule_diff дает освободившиеся ячейки, и проверяются
+    только наблюдения, чье окно их задевает. Индекс свободных серий даты
+    строится один раз на загрузку (AvailabilityQuery кэширует его по объекту
+    данных), поэтому стоимость пропорциональна числу подходящих наблюдений.
+    Базы сравнения восстанавливаются из истории снимков (restore), поэтому
+    перезапуск не повторяет уведомления, а изменения за время простоя видны.
+    """
+
+    def __init__(self, path: Optional[str] = WATCHES_FILE, handlers: Optional[Dict[str, Handler]] = None,
+                 query: Optional[AvailabilityQuery] = None, coalescer: Optional[NotificationCoalescer] = None):
+        self.path = path
+        self.handlers: Dict[str, Handler] = {NOTIFY: self.notify, BOOK: self.book}
+        self.handlers.update(handlers or {})
+        self.query = query or AvailabilityQuery()
+        self.diff = ScheduleDiff()
+        # Варианты наблюдения за окно - одним сообщением; уже отправленные не повторяются
+        self.coalescer = coalescer or NotificationCoalescer(self.deliver)
+        self.watches: Dict[int, Watch] = {}
+        self.by_date: Dict[str, Dict[int, Set[int]]] = {}
+        self.unchecked: Dict[str, Set[int]] = {}
+        self._grid = OccupancyGrid(())
+        self._next_id = 1
+        self._lock = threading.RLock()
+        self._notifier = None
+        self.load()
+
+    # --- хранение ---
+
+    def load(self):
+        if not self.path:
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                items = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"Поврежденный файл наблюдений {self.path}: {e}")
+            return
+        for item in items:
+            self._index(Watch.from_dict(item))
+
+    def save(self):
+        """Атомарно сохраняет наблюдения"""
+        if not self.path:
+            return
+        with self._lock:
+            items = [watch.to_dict() for watch in sorted(self.watches.values(), key=lambda watch: watch.id)]
+        directory = os.path.dirname(os.path.abspath(self.path))
+        descriptor, temp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix='.json')
+        try:
+            with os.fdopen(descriptor, 'w', encoding='utf-8') as f:
+                json.dump(items, f, ensure_ascii=False, indent=2)
+            os.replace(temp_path, self.path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+
+    # --- индекс ---
+
+    def _index(self, watch: Watch):
+        with self._lock:
+            if watch.id is None:
+                watch.id = self._next_id
+            self._next_id = max(self._next_id, watch.id + 1)
+            self.watches[watch.id] = watch
+            if watch.status != 'active':
+                return
+            cells = watch.cells(self._grid)
+            for date in watch.dates():
+                buckets = self.by_date.setdefault(date, {})
+                for cell in cells:
+                    buckets.setdefault(cell, set()).add(watch.id)
+                if date not in watch.checked:
+                    self.unchecked.setdefault(date, set()).add(watch.id)
+
+    def _unindex(self, watch: Watch):
+        with self._lock:
+            for date in watch.dates():
+                buckets = self.by_date.get(date, {})
+                for cell in watch.cells(self._grid):
+                    bucket = buckets.get(cell)
+                    if bucket is not None:
+                        bucket.discard(watch.id)
+                        if not bucket:
+                            del buckets[cell]
+                if not buckets:
+                    self.by_date.pop(date, None)
+                pending = self.unchecked.get(date)
+                if pending is not None:
+                    pending.discard(watch.id)
+                    if not pending:
+                        del self.unchecked[date]
+
+    def add(self, watch: Watch) -> Watch:
+        """Регистрирует наблюдение и сохраняет реестр"""
+        self._index(watch)
+        self.save()
+        logger.info(f"Наблюдение добавлено: {watch.describe()}")
+        return watch
+
+    def remove(self, watch_id: int) -> bool:
+        with self._lock:
+            watch = self.watches.pop(watch_id, None)
+            if watch is None:
+                return False
+            self._unindex(watch)
+        self.save()
+        return True
+
+    def complete(self, watch: Watch):
+        """Снимает выполненное наблюдение с проверки (например, после бронирования)"""
+        with self._lock:
+            self._unindex(watch)
+            watch.status = 'done'
+        self.save()
+
+    def dates(self, today: Optional[str] = None) -> List[str]:
+        """Даты, на которые есть активные наблюдения (сегодня и позже)"""
+        today = today or datetime.now().strftime('%Y-%m-%d')
+        with self._lock:
+            return sorted(date for date in self.by_date if date >= today)
+
+    def restore(self, store=None) -> int:
+        """
+        Восстанавливает базы сравнения дат наблюдений из истории снимков
+
+        Returns:
+            Количество восстановленных дат
+        """
+        if store is None:
+            from snapshot_store import get_snapshot_store
+            store = get_snapshot_store()
+        try:
+            return self.diff.restore(store, self.dates())
+        except Exception as e:
+            logger.warning(f"История снимков недоступна, базы наблюдений начинаются с нуля: {e}")
+            return 0
+
+    def candidates(self, date: str, cells: Optional[Iterable[Tuple[int, int]]] = None) -> List[Watch]:
+        """
+        Наблюдения даты, которые могли измениться
+
+        Args:
+            date: Дата YYYY-MM-DD
+            cells: Освободившиеся (court_id, cell); None - все наблюдения даты
+        """
+        with self._lock:
+            buckets = self.by_date.get(date, {})
+            if cells is None:
+                ids = set().union(*buckets.values()) if buckets else set()
+            else:
+                ids = set()
+                for cell in {cell for _, cell in cells}:
+                    ids |= buckets.get(cell, set())
+            return [self.watches[watch_id] for watch_id in sorted(ids)]
+
+    # --- проверка ---
+
+    def match(self, watch: Watch, date: str, data: Dict) -> List[Dict]:
+        """Варианты, подходящие наблюдению"""
+        return self.query.find([date], surfaces=watch.surfaces or None,
+                               start_window=(watch.start_from, watch.start_to),
+                               min_duration=watch.min_duration,
+                               max_duration=watch.min_duration if watch.action == BOOK else None,
+                               schedules={date: data})
+
+    def on_fetch(self, date: str, data: Dict) -> Dict[int, List[Dict]]:
+        """
+        Проверяет наблюдения после загрузки даты и выполняет их действия
+
+        Returns:
+            ID наблюдения -> найденные варианты (только наблюдения с вариантами)
+        """
+        events = self.diff.update(date, data)
+        freed = [(event.court_id, event.cell) for event in events if event.kind == SLOT_FREED]
+        watches = {watch.id: watch for watch in self.candidates(date, freed)} if freed else {}
+        with self._lock:
+            new = [self.watches[watch_id] for watch_id in sorted(self.unchecked.pop(date, ()))]
+        for watch in new:
+            watches[watch.id] = watch
+            watch.checked = sorted(set(watch.checked) | {date})
+        if new:
+            self.save()
+
+        found = {}
+        for watch in watches.values():
+            matches = self.match(watch, date, data)
+            if not matches:
+                continue
+            found[watch.id] = matches
+            try:
+                self.handlers[watch.action](watch, date, matches)
+            except Exception as e:
+                logger.error(f"Ошибка действия наблюдения #{watch.id}: {e}")
+        return found
+
+    # --- действия по умолчанию ---
+
+    def notify(self, watch: Watch, date: str, matches: List[Dict]):
+        """Передает варианты в пачку уведомлений наблюдения (отправка - по окончании окна)"""
+        events = [ScheduleEvent(SLOT_FREED, date, match['court_id'], match['start_cell'], match['end_cell'])
+                  for match in matches]
+        self.coalescer.add(f"watch:{watch.id}", date, events)
+
+    def deliver(self, key: str, date: str, events: List[ScheduleEvent]):
+        """Отправляет варианты пачки, о которых еще не сообщалось: в консоль и в Telegram"""
+        watch = self.watches.get(int(key.split(':', 1)[1]))
+        state = self.diff.state(date)
+        if watch is None or state is None:
+            return
+        grid = state.grid
+        lines = [f"🎾 Наблюдение {watch.name or watch.describe()}", f"📅 {date}: новых вариантов {len(events)}"]
+        for event in events[:20]:
+            lines.append(f"  🏟️ {state.court_title(event.court_id)} "
+                         f"{grid.cell_title(event.cell)}-{grid.cell_title(event.end_cell)}")
+        message = "\n".join(lines)
+        print(message)
+
+        if self._notifier is None:
+            config = get_telegram_config()
+            self._notifier = TelegramNotifier(config['bot_token'], config['chat_id']) if config else False
+        if self._notifier:
+            # Future доставки: если Telegram не примет сообщение, пачка вернет ключи
+            return self._notifier.enqueue_message(message, parse_mode=None)
+
+    def book(self, watch: Watch, date: str, matches: List[Dict]):
+        """Бронирование: заявки на лучшие варианты, начинающиеся ровно в час (не больше одного корта)"""
+        from booking_race import BookingRace
+
+        duration_hours = watch.min_duration // 60
+        courts = []
+        for match in matches:
+            hours, minutes = map(int, match['time_from'].split(':'))
+            if minutes or watch.min_duration % 60:
+                continue
+            courts.append({
+                'court_id': match['court_id'],
+                'court_number': match['court_number'],
+                'court_type': match['court_type'],
+                'inflate_id': match['inflate_id'],
+                'time_from': hours,
+                'time_to': (hours + duration_hours) % 24,
+                'date': date,
+            })
+        if not courts:
+            logger.info(f"Наблюдение #{watch.id}: нет вариантов с началом ровно в час")
+            return
+        # Гонка идет за один слот: кандидаты - корты с тем же началом, что и лучший вариант
+        courts = [court for court in courts if court['time_from'] == courts[0]['time_from']]
+
+        race = BookingRace()
+        success, message, winner = race.run(race.prepare(date, courts[0]['time_from'], duration_hours,
+                                                         watch.test_mode, courts=courts))
+        logger.info(f"Наблюдение #{watch.id}: {message}")
+        if success:
+            self.complete(watch)
+
+
+_shared_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_watch_registry() -> WatchRegistry:
+    """Возвращает общий для процесса реестр наблюдений"""
+    global _shared_registry
+    with _registry_lock:
+        if _shared_registry is None:
+            _shared_registry = WatchRegistry()
+        return _shared_registry
+
+
+def main():
+    """
+    Управление наблюдениями
+
+    Использование:
+        python watch_registry.py list
+        python watch_registry.py add ДАТА_С ДАТА_ПО ПОКРЫТИЕ НАЧАЛО_С НАЧАЛО_ПО МИНУТ [notify|book]
+        python watch_registry.py remove ID
+        python watch_registry.py run        # одна загрузка на дату, проверка всех наблюдений
+    """
+    from async_fetcher import fetch_schedules
+
+    print("🎾 РЕЕСТР НАБЛЮДЕНИЙ")
+    print("=" * 60)
+
+    registry = get_watch_registry()
+    command = sys.argv[1] if len(sys.argv) > 1 else 'list'
+
+    if command == 'add' and len(sys.argv) >= 8:
+        date_from, date_to, surface, start_from, start_to, minutes = sys.argv[2:8]
+        action = sys.argv[8] if len(sys.argv) > 8 else NOTIFY
+        watch = registry.add(Watch(date_from, date_to, [surface] if surface != 'any' else [],
+                                   start_from, start_to, int(minutes), action))
+        print(f"✅ Добавлено: {watch.describe()}")
+    elif command == 'remove' and len(sys.argv) > 2:
+        print("✅ Удалено" if registry.remove(int(sys.argv[2])) else "❌ Наблюдение не найдено")
+    elif command == 'run':
+        from snapshot_store import get_snapshot_store
+
+        dates = registry.dates()
+        store = get_snapshot_store()
+        registry.restore(store)
+        started = time.perf_counter()
+        schedules = fetch_schedules(dates, source=registry.query.source)
+        for date in dates:
+            if schedules.get(date):
+                found = registry.on_fetch(date, schedules[date])
+                # База для следующего запуска: он сообщит только о новых изменениях
+                store.put(date, schedules[date])
+                print(f"📅 {date}: наблюдений {len(registry.candidates(date))}, с вариантами {len(found)}")
+        registry.coalescer.flush_all()
+        print(f"⏱️ {len(dates)} загрузок на {len(registry.watches)} наблюдений: "
+              f"{time.perf_counter() - started:.2f} с")
+    else:
+        for watch in sorted(registry.watches.values(), key=lambda watch: watch.id):
+            print(f"  {'🟢' if watch.status == 'active' else '✅'} {watch.describe()}")
+        if not registry.watches:
+            print("  Наблюдений нет")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
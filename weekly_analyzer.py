@@ -4,13 +4,14 @@
 Анализатор свободных кортов на неделю
 """
 
-import requests
-import json
-import re
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import List, Dict, Optional
 import logging
 
+from schedule_client import get_schedule_client
+from async_fetcher import consecutive_dates, fetch_schedules
+from occupancy import OccupancyGrid
+
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -18,51 +19,26 @@ logger = logging.getLogger(__name__)
 class WeeklyTennisAnalyzer:
     def __init__(self):
         self.base_url = "https://x19.spb.ru"
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
+        self.client = get_schedule_client(cached=True)
+        self.session = self.client.session
         
     def get_api_data(self, date: str) -> Optional[Dict]:
         """Получает данные от API для конкретной даты"""
-        try:
-            # Получаем HTML страницу для timestamp
-            page_url = f"{self.base_url}/bronirovanie/?date={date}"
-            page_response = self.session.get(page_url, timeout=10)
-            page_response.raise_for_status()
-            
-            # Извлекаем timestamp
-            timestamp_match = re.search(r'initialize\?date=[^&]+&_=(\d+)', page_response.text)
-            timestamp = timestamp_match.group(1) if timestamp_match else str(int(datetime.now().timestamp()))
-            
-            # Запрашиваем данные API
-            api_url = f"{self.base_url}/bronirovanie/initialize?date={date}&_={timestamp}"
-            response = self.session.get(api_url, timeout=10)
-            response.raise_for_status()
-            
-            # Парсим JavaScript код
-            content = response.text
-            initial_match = re.search(r'var initial = ({.*?});', content, re.DOTALL)
-            
-            if initial_match:
-                json_str = initial_match.group(1)
-                data = json.loads(json_str)
-                return data
-            
-            return None
-                
-        except Exception as e:
-            logger.error(f"Ошибка при получении данных для даты {date}: {e}")
-            return None
+        return self.client.get_schedule(date)
     
-    def analyze_ground_courts_22h(self, date: str) -> List[Dict]:
+    def analyze_ground_courts_22h(self, date: str, data: Optional[Dict] = None) -> List[Dict]:
         """
         Анализирует свободные грунтовые корты в 22:00-00:00 (2 часа) для конкретной даты
+        
+        Args:
+            date: Дата в формате YYYY-MM-DD
+            data: Уже загруженные данные API (если None - загружаются)
         """
         print(f"🔍 Анализ грунтовых кортов в 22:00-00:00 на {date}")
         
         # Получаем данные от API
-        data = self.get_api_data(date)
+        if data is None:
+            data = self.get_api_data(date)
         if not data:
             print(f"❌ Не удалось получить данные для {date}")
             return []
@@ -87,39 +63,20 @@ class WeeklyTennisAnalyzer:
         
         print(f"🏟️ Найдено {len(ground_courts)} грунтовых кортов")
         
-        # Получаем занятые слоты
-        occupied_slots = set_data.get('occupied', [])
-        print(f"🚫 Найдено {len(occupied_slots)} занятых слотов")
+        # Получаем занятые слоты (в ответе API они лежат в time_blocked)
+        time_blocked = set_data.get('time_blocked', [])
+        print(f"🚫 Найдено {len(time_blocked)} занятых слотов")
         
         # Анализируем свободные 2-часовые слоты в 22:00-00:00
+        grid = OccupancyGrid(time_blocked, set_data.get('time_list'))
         free_courts = []
         
         for court in ground_courts:
             court_id = court['court_id']
             court_number = court['court_number']
             
-            # Проверяем, свободен ли корт в 22:00-23:00 и 23:00-00:00
-            slot_22_23_occupied = False
-            slot_23_24_occupied = False
-            
-            for occupied in occupied_slots:
-                if occupied.get('court_id') == court_id:
-                    time_from = occupied.get('time_from', {})
-                    if isinstance(time_from, dict):
-                        hours = time_from.get('hours', '')
-                        if hours == '22':
-                            slot_22_23_occupied = True
-                        elif hours == '23':
-                            slot_23_24_occupied = True
-                    elif isinstance(time_from, (int, str)):
-                        time_str = str(time_from)
-                        if time_str == '22':
-                            slot_22_23_occupied = True
-                        elif time_str == '23':
-                            slot_23_24_occupied = True
-            
-            # Если оба слота свободны, то есть 2-часовой слот
-            if not slot_22_23_occupied and not slot_23_24_occupied:
+            # Корт свободен, если не занята ни одна ячейка 22:00-00:00
+            if grid.is_free_at(court_id, 22, 0, duration_minutes=120):
                 free_courts.append({
                     'court_number': court_number,
                     'court_type': 'Грунт',
@@ -142,17 +99,17 @@ class WeeklyTennisAnalyzer:
         print("=" * 70)
         
         results = {}
-        start_dt = datetime.strptime(start_date, '%Y-%m-%d')
         
-        for i in range(7):  # Анализируем 7 дней
-            current_date = start_dt + timedelta(days=i)
-            date_str = current_date.strftime('%Y-%m-%d')
-            date_display = current_date.strftime('%d.%m.%Y (%A)')
+        # Загружаем все 7 дней параллельно
+        schedules = fetch_schedules(consecutive_dates(start_date, 7), source=self.client)
+        
+        for date_str, data in schedules.items():
+            date_display = datetime.strptime(date_str, '%Y-%m-%d').strftime('%d.%m.%Y (%A)')
             
             print(f"\n📅 {date_display}")
             print("-" * 40)
             
-            free_courts = self.analyze_ground_courts_22h(date_str)
+            free_courts = self.analyze_ground_courts_22h(date_str, data)
             results[date_str] = {
                 'date_display': date_display,
                 'free_courts': free_courts